@@ -0,0 +1,135 @@
+"""
+Timing harness of the benchmarks
+Every measurement is a record of the stage, the case and the timing statistics,
+the records are written as JSON to be compared between the commits
+"""
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable
+
+
+class Benchmark:
+    """
+    Runs the measured functions and collects the results
+
+    Attributes:
+        repeat      minimum number of the measured calls
+        min_time    minimum total time of the measured calls in seconds
+        results     collected result records
+    """
+
+    def __init__(self, repeat: int = 20, min_time: float = 0.2):
+        self.repeat = repeat
+        self.min_time = min_time
+        self.results = []
+
+    def measure(self, stage: str, case: str, function: Callable, setup: Callable = None,
+                repeat: int = None, **params) -> dict:
+        """
+        Measures the function, the setup is called before every call and not measured
+        The first call is a warm up and is not measured either
+
+        :param stage: name of the pipeline stage
+        :param case: name of the measured case
+        :param function: callable without arguments
+        :param setup: callable without arguments preparing the call
+        :param repeat: minimum number of the measured calls, overrides the default
+        :param params: additional values stored in the record
+        :return: result record
+        """
+        repeat = repeat or self.repeat
+        if setup:
+            setup()
+        function()
+
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < repeat or time.perf_counter() - started < self.min_time:
+            if setup:
+                setup()
+            call_started = time.perf_counter_ns()
+            function()
+            timings.append(time.perf_counter_ns() - call_started)
+            if len(timings) >= repeat * 100:
+                break
+
+        return self.record(stage, case, timings, **params)
+
+    def record(self, stage: str, case: str, timings: list, **params) -> dict:
+        """
+        Records the timings measured elsewhere, e.g. in the child processes
+
+        :param stage: name of the pipeline stage
+        :param case: name of the measured case
+        :param timings: durations of the calls in nanoseconds
+        :param params: additional values stored in the record
+        :return: result record
+        """
+        timings = sorted(timings)
+        record = {
+            "stage": stage,
+            "case": case,
+            **params,
+            "calls": len(timings),
+            "mean_us": statistics.mean(timings) / 1000,
+            "median_us": statistics.median(timings) / 1000,
+            "p95_us": timings[min(len(timings) - 1, int(len(timings) * 0.95))] / 1000,
+            "min_us": timings[0] / 1000,
+            "max_us": timings[-1] / 1000
+        }
+        self.results.append(record)
+        print(f"{stage:<14} {case:<40} {record['median_us']:>12.1f} us  (p95 {record['p95_us']:.1f})",
+              file=sys.stderr)
+        return record
+
+    def skip(self, stage: str, case: str, reason: str) -> dict:
+        """
+        Records a case that cannot be measured
+
+        :param stage: name of the pipeline stage
+        :param case: name of the case
+        :param reason: why the case is skipped
+        :return: result record
+        """
+        record = {"stage": stage, "case": case, "skipped": reason}
+        self.results.append(record)
+        print(f"{stage:<14} {case:<40} skipped: {reason}", file=sys.stderr)
+        return record
+
+    def get_report(self) -> dict:
+        """
+        Gets the machine-readable report
+
+        :return: dictionary with the environment description and the results
+        """
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "time": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": self.results
+        }
+
+    def write(self, path: str) -> None:
+        """
+        Writes the report as JSON
+
+        :param path: output file path, "-" for the standard output
+        :return: None
+        """
+        report = json.dumps(self.get_report(), indent=2)
+        if path == "-":
+            print(report)
+        else:
+            with open(path, "w") as f:
+                f.write(report)
@@ -0,0 +1,226 @@
+"""
+Synthetic provider payloads shaped like the recorded API answers
+Written to the fixtures, so the benchmarks run against the replay transport
+and the stub server without the network and the API keys
+"""
+import copy
+import datetime
+import json
+import random
+import time
+from typing import List
+
+from handlers.city import City
+from handlers.http_fixtures import Fixtures
+from handlers.weather_handlers.open_weather_handler import OpenWeatherHandler
+from handlers.weather_handlers.accuweather_handler import AccuWeatherHandler
+from handlers.weather_handlers.meta_weather_handler import MetaWeatherHandler
+
+
+DAY = 24 * 60 * 60
+HOUR = 60 * 60
+
+
+def make_cities(count: int) -> List[City]:
+    """
+    Makes the cities spread around the globe with both the coordinates and the woeid
+
+    :param count: number of the cities
+    :return: list of city objects
+    """
+    return [
+        City(
+            name=f"City{index:03}",
+            latitude=round(-59.9137 + 119.3 * index / max(count, 1), 4),
+            longitude=round(-169.8731 + 339.1 * index / max(count, 1), 4),
+            woeid=100000 + index,
+            state="Benchmark"
+        )
+        for index in range(count)
+    ]
+
+
+def with_source(city: City, api_name: str) -> City:
+    """Copy of the city as if it was found by the API, so the weather handler of the API accepts its woeid"""
+    city = copy.copy(city)
+    city.source = api_name
+    return city
+
+
+def open_weather_current(city: City, city_id: int, now: int) -> dict:
+    """Current weather answer of the OpenWeather API"""
+    return {
+        "coord": {"lon": city.longitude, "lat": city.latitude},
+        "weather": [{"id": 803, "main": random.choice(list(OpenWeatherHandler.STATUS_TABLE)),
+                     "description": "broken clouds", "icon": "04d"}],
+        "base": "stations",
+        "main": {"temp": random.uniform(260, 310), "feels_like": 285.1, "temp_min": 284.2, "temp_max": 287.0,
+                 "pressure": random.randint(990, 1030), "humidity": random.randint(20, 100)},
+        "visibility": 10000,
+        "wind": {"speed": random.uniform(0, 15), "deg": random.randint(0, 359)},
+        "clouds": {"all": 75},
+        "dt": now,
+        "sys": {"type": 2, "id": 2019646, "country": "BM", "sunrise": now - 20000, "sunset": now + 20000},
+        "timezone": 3600,
+        "id": city_id,
+        "name": city.name,
+        "cod": 200
+    }
+
+
+def open_weather_one_call(city: City, now: int, days: int = 8, hours: int = 48) -> dict:
+    """One Call answer of the OpenWeather API with the hourly and the daily blocks"""
+    return {
+        "lat": city.latitude,
+        "lon": city.longitude,
+        "timezone": "Etc/GMT-1",
+        "timezone_offset": 3600,
+        "hourly": [
+            {
+                "dt": now + hour * HOUR,
+                "temp": random.uniform(260, 310),
+                "feels_like": 285.1,
+                "pressure": random.randint(990, 1030),
+                "humidity": random.randint(20, 100),
+                "dew_point": 278.5,
+                "uvi": 2.1,
+                "clouds": 60,
+                "visibility": 10000,
+                "wind_speed": random.uniform(0, 15),
+                "wind_deg": random.randint(0, 359),
+                "wind_gust": 7.2,
+                "weather": [{"id": 500, "main": random.choice(list(OpenWeatherHandler.STATUS_TABLE)),
+                             "description": "light rain", "icon": "10d"}],
+                "pop": 0.4
+            }
+            for hour in range(hours)
+        ],
+        "daily": [
+            {
+                "dt": now + day * DAY,
+                "sunrise": now + day * DAY - 20000,
+                "sunset": now + day * DAY + 20000,
+                "temp": {"day": random.uniform(260, 310), "min": 280.1, "max": 290.2,
+                         "night": 281.3, "eve": 285.4, "morn": 282.5},
+                "feels_like": {"day": 285.1, "night": 280.2, "eve": 284.3, "morn": 281.4},
+                "pressure": random.randint(990, 1030),
+                "humidity": random.randint(20, 100),
+                "dew_point": 278.5,
+                "wind_speed": random.uniform(0, 15),
+                "wind_deg": random.randint(0, 359),
+                "weather": [{"id": 500, "main": random.choice(list(OpenWeatherHandler.STATUS_TABLE)),
+                             "description": "light rain", "icon": "10d"}],
+                "clouds": 60,
+                "pop": 0.4,
+                "uvi": 2.1
+            }
+            for day in range(days)
+        ]
+    }
+
+
+def accuweather_current(now: int) -> list:
+    """Hourly (1hour) answer of the AccuWeather API"""
+    return [{
+        "DateTime": datetime.datetime.fromtimestamp(now, datetime.timezone(datetime.timedelta(hours=1))).isoformat(),
+        "EpochDateTime": now,
+        "WeatherIcon": random.choice(list(AccuWeatherHandler.STATUS_TABLE)),
+        "IconPhrase": "Cloudy",
+        "IsDaylight": True,
+        "Temperature": {"Value": random.uniform(-10, 35), "Unit": "C", "UnitType": 17},
+        "Wind": {"Speed": {"Value": random.uniform(0, 50), "Unit": "km/h", "UnitType": 7},
+                 "Direction": {"Degrees": random.randint(0, 359), "Localized": "N", "English": "N"}},
+        "RelativeHumidity": random.randint(20, 100),
+        "PrecipitationProbability": 10
+    }]
+
+
+def accuweather_forecast(now: int) -> dict:
+    """Daily (5day) answer of the AccuWeather API"""
+    zone = datetime.timezone(datetime.timedelta(hours=1))
+    return {
+        "Headline": {"Text": "Benchmark"},
+        "DailyForecasts": [
+            {
+                "Date": datetime.datetime.fromtimestamp(now + day * DAY, zone).isoformat(),
+                "EpochDate": now + day * DAY,
+                "Temperature": {"Minimum": {"Value": random.uniform(-10, 20), "Unit": "C"},
+                                "Maximum": {"Value": random.uniform(0, 35), "Unit": "C"}},
+                "Day": {"Icon": random.choice(list(AccuWeatherHandler.STATUS_TABLE)), "IconPhrase": "Cloudy",
+                        "Wind": {"Speed": {"Value": random.uniform(0, 50), "Unit": "km/h"},
+                                 "Direction": {"Degrees": random.randint(0, 359)}}},
+                "Night": {"Icon": 38, "IconPhrase": "Mostly cloudy"}
+            }
+            for day in range(5)
+        ]
+    }
+
+
+def meta_weather_location(now: int) -> dict:
+    """Location answer of the MetaWeather API with the current weather and the forecast"""
+    zone = datetime.timezone(datetime.timedelta(hours=1))
+    return {
+        "time": datetime.datetime.fromtimestamp(now, zone).isoformat(),
+        "consolidated_weather": [
+            {
+                "weather_state_name": random.choice(list(MetaWeatherHandler.STATUS_TABLE)),
+                "applicable_date": datetime.date.fromtimestamp(now + day * DAY).isoformat(),
+                "the_temp": random.uniform(-10, 35),
+                "air_pressure": random.uniform(990, 1030),
+                "humidity": random.randint(20, 100),
+                "wind_speed": random.uniform(0, 15),
+                "wind_direction": random.uniform(0, 359)
+            }
+            for day in range(6)
+        ]
+    }
+
+
+def write_fixtures(cities: List[City], seed: int = 0) -> dict:
+    """
+    Writes the answers of all the providers for the cities to the fixtures
+    The OpenWeather group answers are written for the groups
+    the dashboard makes once the city ids are learned
+
+    :param cities: city objects with the coordinates and the woeid
+    :param seed: seed of the random values
+    :return: raw payloads of the first city by the name
+    """
+    random.seed(seed)
+    now = int(time.time())
+    headers = {"Content-Type": "application/json; charset=utf-8"}
+    samples = {}
+
+    def save(url: str, payload) -> bytes:
+        body = json.dumps(payload).encode("utf-8")
+        Fixtures.save("GET", url, 200, headers, body)
+        return body
+
+    currents = []
+    for index, city in enumerate(cities):
+        open_weather = OpenWeatherHandler(city)
+        accuweather = AccuWeatherHandler(with_source(city, AccuWeatherHandler.API_NAME))
+        meta_weather = MetaWeatherHandler(with_source(city, MetaWeatherHandler.API_NAME))
+        current = open_weather_current(city, 1000 + index, now)
+        currents.append(current)
+        bodies = {
+            "open_weather_current": save(open_weather.get_url_current(), current),
+            "open_weather_one_call": save(
+                open_weather.get_url_forecast(hourly=True), open_weather_one_call(city, now)
+            ),
+            "open_weather_daily": save(open_weather.get_url_forecast(), open_weather_one_call(city, now, hours=0)),
+            "accuweather_current": save(accuweather.get_url_current(), accuweather_current(now)),
+            "accuweather_forecast": save(accuweather.get_url_forecast(), accuweather_forecast(now)),
+            "meta_weather_location": save(meta_weather.get_url_current(), meta_weather_location(now))
+        }
+        if not samples:
+            samples = bodies
+
+    size = OpenWeatherHandler.GROUP_SIZE
+    for start in range(0, len(cities), size):
+        group = currents[start:start + size]
+        save(
+            OpenWeatherHandler.get_url_group([current["id"] for current in group]),
+            {"cnt": len(group), "list": group}
+        )
+    return samples
@@ -0,0 +1,214 @@
+"""
+Benchmarks of the fetch-parse-render pipeline
+Measures every stage separately against the synthetic payloads (see payloads):
+    url             URL building of the weather handlers
+    json            decoding of the raw payloads
+    http            HTTP calls to the local stub server
+    fetch           fetch_weather_* over the replay transport: reading the payload, JSON decoding,
+                    STATUS_TABLE mapping and Weather construction, 1, 4 and 8 day forecasts
+    cache           get_weather_* answered from the weather cache
+    update_state    Weather.update_state
+    render          StatusView formatting of the status screen values and the changed value diff
+    pipeline        WeatherFetcher.fetch of a city over the stub server, with and without the hourly forecast
+    watchlist       DashboardRefresher.refresh of 1, 10 and 100 cities over the stub server
+
+Usage:
+    python -m benchmarks.run [--output bench.json] [--repeat 20] [--latency 0]
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.harness import Benchmark
+from benchmarks.payloads import make_cities, with_source, write_fixtures
+from handlers.async_loop import AsyncLoop
+from handlers.city_cache import CityCache
+from handlers.city_handlers.open_weather_city_handler import OpenWeatherCityHandler
+from handlers.dashboard_refresher import DashboardRefresher
+from handlers.forecast_series import ForecastSeries
+from handlers.http_session import SessionRegistry
+from handlers.request_coalescer import RequestCoalescer
+from handlers.status_view import StatusView
+from handlers.stub_server import StubServer
+from handlers.sun_handlers.solar_sun_handler import SolarSunHandler
+from handlers.weather import Weather
+from handlers.weather_cache import WeatherCache
+from handlers.weather_fetcher import WeatherFetcher, WeatherReport
+from handlers.weather_handlers.open_weather_handler import OpenWeatherHandler
+from handlers.weather_handlers.accuweather_handler import AccuWeatherHandler
+from handlers.weather_handlers.meta_weather_handler import MetaWeatherHandler
+
+from config import Config
+
+
+PROVIDERS = OpenWeatherHandler, AccuWeatherHandler, MetaWeatherHandler
+FORECAST_DAYS = 1, 4, 8
+WATCHLIST_SIZES = 1, 10, 100
+
+
+def set_http_mode(mode: str) -> None:
+    """Switches the transport of the sessions"""
+    SessionRegistry.close()
+    Config.HTTP_MODE = mode
+
+
+def reset_caches() -> None:
+    """Drops the cached weather and the recently shared responses, so every call reaches the transport"""
+    WeatherCache.clear()
+    RequestCoalescer.pending.clear()
+
+
+def bench_url(bench: Benchmark, city) -> None:
+    for handler_class in PROVIDERS:
+        handler = handler_class(with_source(city, handler_class.API_NAME))
+        bench.measure("url", f"{handler.API_NAME} current", handler.get_url_current, provider=handler.API_NAME)
+        bench.measure("url", f"{handler.API_NAME} forecast", handler.get_url_forecast, provider=handler.API_NAME)
+
+
+def bench_json(bench: Benchmark, samples: dict) -> None:
+    for name, body in samples.items():
+        bench.measure("json", name, lambda body=body: json.loads(body), size=len(body))
+
+
+def bench_http(bench: Benchmark, city) -> None:
+    set_http_mode("stub")
+    for handler_class in PROVIDERS:
+        handler = handler_class(with_source(city, handler_class.API_NAME))
+        url = handler.get_url_current()
+        bench.measure(
+            "http", f"{handler.API_NAME} current",
+            lambda: SessionRegistry.get(handler.API_NAME, url).content,
+            provider=handler.API_NAME
+        )
+
+
+def bench_fetch(bench: Benchmark, city) -> None:
+    set_http_mode("replay")
+    for handler_class in PROVIDERS:
+        handler = handler_class(with_source(city, handler_class.API_NAME))
+        bench.measure(
+            "fetch", f"{handler.API_NAME} current", handler.fetch_weather_current,
+            setup=reset_caches, provider=handler.API_NAME, transport="replay"
+        )
+        for days in FORECAST_DAYS:
+            bench.measure(
+                "fetch", f"{handler.API_NAME} forecast {days}d", lambda: handler.fetch_weather_forecast(days),
+                setup=reset_caches, provider=handler.API_NAME, transport="replay", days=days
+            )
+        bench.measure(
+            "cache", f"{handler.API_NAME} current", handler.get_weather_current, provider=handler.API_NAME
+        )
+        bench.measure(
+            "cache", f"{handler.API_NAME} forecast 4d", lambda: handler.get_weather_forecast(4),
+            provider=handler.API_NAME, days=4
+        )
+
+
+def bench_weather(bench: Benchmark, city) -> None:
+    set_http_mode("replay")
+    weather = OpenWeatherHandler(city).fetch_weather_current()
+    sun_info = SolarSunHandler(city).get_sun_info()
+    bench.measure("update_state", "Weather.update_state", lambda: weather.update_state(sun_info))
+    bench.measure("fetch", "Weather construction", lambda: Weather(
+        location_name=city.name, status=Weather.CLEAR, temperature=20.5, pressure=1013, humidity=40,
+        wind_speed=3.2, wind_direction=180, time=time.time(), time_zone=3600
+    ))
+
+
+def bench_render(bench: Benchmark, city) -> None:
+    set_http_mode("replay")
+    handler = OpenWeatherHandler(city)
+    weather = handler.fetch_weather_current()
+    sun_info = SolarSunHandler(city).get_sun_info()
+    weather.update_state(sun_info)
+    hourly = ForecastSeries.from_weathers(Weather(
+        location_name=city.name, status=weather.status, temperature=weather.temperature, pressure=weather.pressure,
+        humidity=weather.humidity, wind_speed=weather.wind_speed, wind_direction=weather.wind_direction,
+        time=weather.time + hour * 60 * 60, time_zone=weather.time_zone
+    ) for hour in range(Config.HOURLY_FORECAST_HOURS))
+    report = WeatherReport(
+        city=city, sun_info=sun_info, weather=weather, forecast=handler.fetch_weather_forecast(4), hourly=hourly
+    )
+
+    bench.measure(
+        "render", f"StatusView.from_report {len(hourly)}h", lambda: StatusView.from_report(report, "C", 24),
+        hours=len(hourly)
+    )
+    view = StatusView.from_report(report, "C", 24)
+    bench.measure("render", "StatusView.get_changes first", lambda: view.get_changes(None))
+    bench.measure("render", "StatusView.get_changes unchanged", lambda: view.get_changes(view))
+
+
+def bench_pipeline(bench: Benchmark, city) -> None:
+    set_http_mode("stub")
+    CityCache.put(OpenWeatherCityHandler.API_NAME, city.name, city)
+    for days in FORECAST_DAYS:
+        bench.measure(
+            "pipeline", f"OpenWeather fetch {days}d",
+            lambda: WeatherFetcher.fetch(OpenWeatherCityHandler, SolarSunHandler, OpenWeatherHandler, city.name, days),
+            setup=reset_caches, provider=OpenWeatherHandler.API_NAME, days=days
+        )
+    hours = Config.HOURLY_FORECAST_HOURS
+    bench.measure(
+        "pipeline", f"OpenWeather fetch 4d {hours}h",
+        lambda: WeatherFetcher.fetch(OpenWeatherCityHandler, SolarSunHandler, OpenWeatherHandler, city.name, 4, hours),
+        setup=reset_caches, provider=OpenWeatherHandler.API_NAME, days=4, hours=hours
+    )
+
+
+def bench_watchlist(bench: Benchmark, cities: list) -> None:
+    set_http_mode("stub")
+    for city in cities:
+        CityCache.put(OpenWeatherCityHandler.API_NAME, city.name, city)
+    for size in WATCHLIST_SIZES:
+        names = [city.name for city in cities[:size]]
+        bench.measure(
+            "watchlist", f"OpenWeather {size} cities",
+            lambda: DashboardRefresher.refresh(OpenWeatherCityHandler, OpenWeatherHandler, names),
+            setup=reset_caches, repeat=5, provider=OpenWeatherHandler.API_NAME, cities=size
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks of the fetch-parse-render pipeline")
+    parser.add_argument("--output", default="-", help="JSON report path, standard output by default")
+    parser.add_argument("--repeat", type=int, default=20, help="minimum number of the measured calls")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum measuring time of a case")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of the stub server in seconds")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    directory = tempfile.mkdtemp(prefix="weather_bench_")
+    Config.FIXTURES_DIR = os.path.join(directory, "fixtures")
+    Config.CITY_CACHE_FILE = os.path.join(directory, "cities.sqlite3")
+    Config.HISTORY_DIR = os.path.join(directory, "history")
+
+    cities = make_cities(max(WATCHLIST_SIZES))
+    samples = write_fixtures(cities)
+    stub = StubServer(latency=arguments.latency)
+    Config.STUB_SERVER_ADDRESS = stub.start(("127.0.0.1", 0))
+
+    bench = Benchmark(arguments.repeat, arguments.min_time)
+    try:
+        bench_url(bench, cities[0])
+        bench_json(bench, samples)
+        bench_http(bench, cities[0])
+        bench_fetch(bench, cities[0])
+        bench_weather(bench, cities[0])
+        bench_render(bench, cities[0])
+        bench_pipeline(bench, cities[0])
+        bench_watchlist(bench, cities)
+    finally:
+        stub.stop()
+        SessionRegistry.close()
+        AsyncLoop.close()
+        shutil.rmtree(directory, ignore_errors=True)
+    bench.write(arguments.output)
+
+
+if __name__ == "__main__":
+    main()
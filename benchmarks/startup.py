@@ -0,0 +1,110 @@
+"""
+Startup timing of the application
+Every case runs in a fresh interpreter, so the imports are measured cold
+(as far as the operating system file cache allows):
+    process     wall time of the child process, the interpreter startup included
+    handlers    importing all the handler modules, as the application did before
+                the handlers were resolved by the name, against the handler registry only
+    app         importing weather_app, building the first screen and drawing the first frame
+                (requires kivy and a display)
+
+Usage:
+    python -m benchmarks.startup [--output startup.json] [--repeat 10]
+For the import breakdown of a single start:
+    python -X importtime weather_app.py
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import Benchmark
+
+
+MARKER = "STARTUP "
+CASES = "handlers eager", "handlers lazy", "app"
+
+
+def report(**timings) -> None:
+    """Prints the timings of the child process in nanoseconds"""
+    print(MARKER + json.dumps(timings), flush=True)
+
+
+def run_child(case: str) -> None:
+    """Measures the case in this process and reports the timings"""
+    started = time.perf_counter_ns()
+    if case == "handlers eager":
+        from handlers.handler_registry import HandlerRegistry
+        for kind in HandlerRegistry.HANDLERS:
+            for api_name in HandlerRegistry.get_names(kind):
+                HandlerRegistry.get(kind, api_name)
+        report(imports=time.perf_counter_ns() - started)
+
+    elif case == "handlers lazy":
+        from handlers.handler_registry import HandlerRegistry
+        HandlerRegistry.get_names("city")
+        report(imports=time.perf_counter_ns() - started)
+
+    elif case == "app":
+        import weather_app
+        from kivy.clock import Clock
+        imported = time.perf_counter_ns()
+        app = weather_app.WeatherApp()
+
+        def on_first_frame(*args) -> None:
+            now = time.perf_counter_ns()
+            report(imports=imported - started, first_frame=now - imported, total=now - started)
+            app.stop()
+
+        app.bind(on_start=lambda *args: Clock.schedule_once(on_first_frame))
+        app.run()
+
+
+def measure_case(case: str) -> dict:
+    """
+    Runs the case in a child process
+
+    :param case: name of the case
+    :return: timings reported by the child with the process wall time, None if the case cannot run
+    """
+    environment = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1")
+    started = time.perf_counter_ns()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", case],
+        capture_output=True, text=True, env=environment
+    )
+    process = time.perf_counter_ns() - started
+    for line in result.stdout.splitlines():
+        if line.startswith(MARKER):
+            return {"process": process, **json.loads(line[len(MARKER):])}
+    logging.getLogger("startup").debug(result.stderr)
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Startup timing of the application")
+    parser.add_argument("--output", default="-", help="JSON report path, standard output by default")
+    parser.add_argument("--repeat", type=int, default=10, help="number of the started processes per case")
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.child:
+        run_child(arguments.child)
+        return
+
+    bench = Benchmark()
+    for case in CASES:
+        runs = [measure_case(case) for _ in range(arguments.repeat)]
+        if None in runs:
+            bench.skip("startup", case, "the child process failed (is kivy installed?)")
+            continue
+        for phase in runs[0]:
+            bench.record("startup", f"{case} {phase}", [run[phase] for run in runs], processes=len(runs))
+    bench.write(arguments.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,3 +26,80 @@ class Config:
     LOGGING_FILE = "weather.log"
 
     PREFERENCES_FILE = "preferences.json"
+
+    HTTP_POOL_CONNECTIONS = 4
+    HTTP_POOL_SIZE = 4
+    HTTP_DEFAULT_TIMEOUT = 3.05, 10
+    HTTP_TIMEOUTS = {
+        "OpenWeather": (3.05, 10),
+        "AccuWeather": (3.05, 15),
+        "MetaWeather": (3.05, 15),
+        "Sunrise Sunset": (3.05, 5)
+    }
+
+    FETCH_WORKERS = 6
+
+    COALESCE_WINDOW = 5
+
+    CITY_CACHE_FILE = "cities.sqlite3"
+    CITY_CACHE_SIZE = 1000
+
+    WEATHER_STALE_PERIOD = 6 * 60 * 60
+    WEATHER_CACHE_WORKERS = 2
+    WEATHER_CACHE_SIZE = 1000
+
+    STREAM_CHUNK_SIZE = 4096
+
+    HOURLY_FORECAST_HOURS = 48
+
+    WATCHLIST_FILE = "watchlist.json"
+    DASHBOARD_WORKERS = 8
+
+    REFRESH_MIN_INTERVAL = 60
+    REFRESH_MAX_INTERVAL = 60 * 60
+    REFRESH_MAX_BACKOFF = 30 * 60
+
+    PROVIDER_STATS_WINDOW = 50
+    PROVIDER_STATS_MIN_SAMPLES = 10
+    FAILOVER_ERROR_PENALTY = 10
+    FAILOVER_BUDGET = 15
+    FAILOVER_WORKERS = 8
+
+    ACCURACY_RECORDING = False
+    ACCURACY_INTERVAL = 3 * 60 * 60
+    ACCURACY_FORECAST_DAYS = 4
+    ACCURACY_WINDOW_DAYS = 30
+    ACCURACY_MATCH_WINDOW = 60 * 60
+    ACCURACY_LEAD_HOURS = 24
+    ACCURACY_MIN_SAMPLES = 10
+    ACCURACY_PENALTY = 0.5
+
+    HEALTH_DECAY = 0.2
+    CIRCUIT_FAILURE_THRESHOLD = 3
+    CIRCUIT_COOLDOWN = 30
+
+    LOAD_MAX_CONCURRENT = 2
+
+    SUGGESTION_COUNT = 8
+    SUGGESTION_MIN_LENGTH = 2
+    SUGGESTION_DELAY = 0.3
+
+    GAZETTEER_FILE = "gazetteer.idx"
+    GAZETTEER_CELL_SIZE = 1.0
+
+    HTTP_MODE = "live"
+    FIXTURES_DIR = "fixtures"
+    STUB_SERVER_ADDRESS = ("127.0.0.1", 8765)
+
+    TRACE_FILE = ""
+    METRICS_FILE = "metrics.prom"
+    METRICS_LATENCY_BUCKETS = 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+    METRICS_SIZE_BUCKETS = 256, 1024, 4096, 16384, 65536, 262144, 1048576
+
+    SNAPSHOT_FILE = "snapshot.bin"
+
+    HISTORY_DIR = "history"
+    HISTORY_CHUNK_ROWS = 256
+    HISTORY_RAW_DAYS = 31
+    HISTORY_HOURLY_DAYS = 366
+    HISTORY_DAILY_DAYS = 10 * 366
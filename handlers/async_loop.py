@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from threading import Thread, Lock
+from typing import Callable, Coroutine
+
+from config import Config
+
+
+class AsyncLoop:
+    """
+    Single asyncio event loop running beside the kivy one on a daemon thread
+    Asynchronous handler methods are awaited on the loop,
+    the blocking API calls are made on the shared thread pool of the loop,
+    so no thread is started per user action and the started work can be cancelled
+
+    Class attributes:
+        loop        event loop, started on the first use
+        thread      thread running the loop
+        executor    thread pool of the blocking calls
+        lock        guards the loop creation
+        logger
+
+    Configuration (Config):
+        FETCH_WORKERS   maximum number of parallel blocking calls
+    """
+
+    loop = None
+    thread = None
+    executor = ThreadPoolExecutor(max_workers=Config.FETCH_WORKERS, thread_name_prefix="fetch")
+    lock = Lock()
+    logger = logging.getLogger("async")
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        """
+        Gets the event loop, starts it if it is not running yet
+
+        :return: running event loop
+        """
+        if cls.loop:
+            return cls.loop
+
+        with cls.lock:
+            if not cls.loop:
+                loop = asyncio.new_event_loop()
+                cls.thread = Thread(target=loop.run_forever, name="async-loop", daemon=True)
+                cls.thread.start()
+                cls.loop = loop
+                cls.logger.debug("Started the event loop")
+        return cls.loop
+
+    @classmethod
+    def submit(cls, coroutine: Coroutine) -> Future:
+        """
+        Schedules the coroutine on the loop, can be called from any thread
+
+        :param coroutine: coroutine object
+        :return: future of the result, cancelling it cancels the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, cls.get_loop())
+
+    @classmethod
+    def run(cls, coroutine: Coroutine, timeout: float = None):
+        """
+        Runs the coroutine on the loop and waits for the result
+        Used by the synchronous wrappers, should not be called on the loop thread
+
+        :param coroutine: coroutine object
+        :param timeout: maximum waiting time in seconds
+        :return: result of the coroutine
+
+        :raises:
+            any exception raised by the coroutine
+        """
+        return cls.submit(coroutine).result(timeout)
+
+    @classmethod
+    def run_blocking(cls, function: Callable, *args) -> asyncio.Future:
+        """
+        Makes a blocking call on the thread pool of the loop
+        The call runs in a copy of the current context, so it sees the current span (see Tracer)
+        Should be awaited on the loop
+
+        :param function: blocking callable
+        :param args: arguments of the callable
+        :return: awaitable result of the call
+        """
+        return asyncio.get_running_loop().run_in_executor(
+            cls.executor, partial(contextvars.copy_context().run, function, *args)
+        )
+
+    @classmethod
+    def close(cls) -> None:
+        """
+        Stops the loop and the thread pool
+
+        :return: None
+        """
+        with cls.lock:
+            if cls.loop:
+                cls.loop.call_soon_threadsafe(cls.loop.stop)
+                cls.thread.join(timeout=1)
+                cls.loop = None
+        cls.executor.shutdown(wait=False)
@@ -8,20 +8,24 @@ class City:
         latitude
         woeid       Where On Earth ID of a city
         state       country, state, region etc
+        source      API name of the city handler that found the city,
+                    the woeid is only known to the same API
     """
 
     def __init__(self, name: str, longitude: float = None,
                  latitude: float = None, woeid: int = None,
-                 state: str = None):
+                 state: str = None, source: str = None):
         self.name = name
         self.longitude = longitude
         self.latitude = latitude
         self.woeid = woeid
         self.state = state
+        self.source = source
 
     def __str__(self):
         return f"City: {self.name}\n" \
                f"Long: {self.longitude}\n" \
                f"Latd: {self.latitude}\n" \
                f"Info: {self.woeid}\n" \
-               f"Stat: {self.state}"
+               f"Stat: {self.state}\n" \
+               f"Srce: {self.source}"
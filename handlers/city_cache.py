@@ -0,0 +1,197 @@
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from handlers.city import City
+
+from config import Config
+
+
+class CityCache:
+    """
+    Persistent geocoding cache shared by all the city handlers
+    Stores found cities in the SQLite database keyed by the API name
+    and the normalized query, the coordinates and woeid of a city never change
+    All the entries are mirrored in memory, so the lookups do not touch the disk
+    Least recently used entries are evicted when the size cap is reached
+    The weather APIs store their own location ids by the location key as well,
+    so a location requested once can be batched from the first refresh of every later run
+
+    Class attributes:
+        connection  SQLite connection, opened on the first use
+        entries     in-memory mirror ordered from the least to the most recently used
+        ids         in-memory mirror of the location ids by the API name and the location key
+        touched     keys used since the last write with their access time
+        lock        guards the connection and the mirror
+        logger
+
+    Configuration (Config):
+        CITY_CACHE_FILE     database file path
+        CITY_CACHE_SIZE     maximum number of stored cities
+    """
+
+    connection = None
+    entries = OrderedDict()
+    ids = {}
+    touched = {}
+    lock = Lock()
+    logger = logging.getLogger("cty_cch")
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normalizes the query so the same location typed differently shares the entry
+
+        :param query: location name as entered
+        :return: case folded name with collapsed whitespaces
+        """
+        return " ".join(query.casefold().split())
+
+    @classmethod
+    def _connect(cls) -> None:
+        """Opens the database and loads all the entries to the memory"""
+        if cls.connection:
+            return
+        cls.connection = sqlite3.connect(Config.CITY_CACHE_FILE, check_same_thread=False)
+        cls.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cities ("
+            "api_name TEXT NOT NULL, "
+            "query TEXT NOT NULL, "
+            "city TEXT NOT NULL, "
+            "last_used REAL NOT NULL, "
+            "PRIMARY KEY (api_name, query))"
+        )
+        cls.connection.execute(
+            "CREATE TABLE IF NOT EXISTS ids ("
+            "api_name TEXT NOT NULL, "
+            "location_key TEXT NOT NULL, "
+            "id TEXT NOT NULL, "
+            "PRIMARY KEY (api_name, location_key))"
+        )
+        cls.connection.commit()
+        rows = cls.connection.execute(
+            "SELECT api_name, query, city FROM cities ORDER BY last_used"
+        )
+        for api_name, query, city in rows:
+            cls.entries[api_name, query] = json.loads(city)
+        for api_name, location_key, location_id in cls.connection.execute("SELECT * FROM ids"):
+            cls.ids[api_name, location_key] = json.loads(location_id)
+        cls.logger.debug(f"Loaded {len(cls.entries)} cached cities and {len(cls.ids)} location ids")
+
+    @classmethod
+    def get(cls, api_name: str, query: str) -> Optional[City]:
+        """
+        Gets the cached city
+
+        :param api_name: short API name of the city handler
+        :param query: location name as entered
+        :return: new City object or None if the city is not cached
+        """
+        key = api_name, cls.normalize(query)
+        with cls.lock:
+            cls._connect()
+            city_dict = cls.entries.get(key)
+            if city_dict is None:
+                return None
+            cls.entries.move_to_end(key)
+            cls.touched[key] = time.time()
+        # the cities cached before the source was recorded were found by the API they are cached for
+        return City(**{"source": api_name, **city_dict})
+
+    @classmethod
+    def put(cls, api_name: str, query: str, city: City) -> None:
+        """
+        Stores the city, evicts the least recently used entries if needed
+        Saves the pending access times in the same transaction
+
+        :param api_name: short API name of the city handler
+        :param query: location name as entered
+        :param city: found City object
+        :return: None
+        """
+        key = api_name, cls.normalize(query)
+        city_dict = dict(vars(city))
+        with cls.lock:
+            cls._connect()
+            cls.entries[key] = city_dict
+            cls.entries.move_to_end(key)
+            cls.touched.pop(key, None)
+
+            evicted = []
+            while len(cls.entries) > Config.CITY_CACHE_SIZE:
+                evicted_key, _ = cls.entries.popitem(last=False)
+                cls.touched.pop(evicted_key, None)
+                evicted.append(evicted_key)
+
+            with cls.connection:
+                cls.connection.execute(
+                    "INSERT OR REPLACE INTO cities VALUES (?, ?, ?, ?)",
+                    (*key, json.dumps(city_dict), time.time())
+                )
+                cls.connection.executemany(
+                    "DELETE FROM cities WHERE api_name = ? AND query = ?", evicted
+                )
+                cls._write_touched()
+
+    @classmethod
+    def get_ids(cls, api_name: str, location_keys: List[str]) -> Dict[str, Any]:
+        """
+        Gets the stored location ids of a weather API
+
+        :param api_name: short API name of the weather handler
+        :param location_keys: location keys of the weather handlers
+        :return: location ids by the location key, the unknown locations are left out
+        """
+        with cls.lock:
+            cls._connect()
+            return {
+                location_key: cls.ids[api_name, location_key]
+                for location_key in location_keys
+                if (api_name, location_key) in cls.ids
+            }
+
+    @classmethod
+    def put_id(cls, api_name: str, location_key: str, location_id: Any) -> None:
+        """
+        Stores the location id of a weather API, writes only new or changed ids
+
+        :param api_name: short API name of the weather handler
+        :param location_key: location key of the weather handler
+        :param location_id: JSON serializable id the API gave to the location
+        :return: None
+        """
+        key = api_name, location_key
+        with cls.lock:
+            cls._connect()
+            if cls.ids.get(key) == location_id:
+                return
+            cls.ids[key] = location_id
+            with cls.connection:
+                cls.connection.execute(
+                    "INSERT OR REPLACE INTO ids VALUES (?, ?, ?)", (*key, json.dumps(location_id))
+                )
+
+    @classmethod
+    def flush(cls) -> None:
+        """
+        Saves the pending access times of the cached cities
+
+        :return: None
+        """
+        with cls.lock:
+            if cls.connection and cls.touched:
+                with cls.connection:
+                    cls._write_touched()
+
+    @classmethod
+    def _write_touched(cls) -> None:
+        """Writes the access times, should be called in a transaction"""
+        cls.connection.executemany(
+            "UPDATE cities SET last_used = ? WHERE api_name = ? AND query = ?",
+            [(used, *key) for key, used in cls.touched.items()]
+        )
+        cls.touched.clear()
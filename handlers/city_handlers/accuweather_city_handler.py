@@ -1,9 +1,14 @@
+import copy
 import requests
 import logging
+from typing import List
 
 from handlers.city_handlers.base_city_handler import BaseCityHandler
 from handlers.errors import BadCityNameException, NoAPIConnectionException, ServiceUnavailableException
 from handlers.city import City
+from handlers.health_monitor import HealthMonitor
+from handlers.request_coalescer import RequestCoalescer
+from handlers.tracing import traced
 
 from config import Config
 
@@ -14,14 +19,19 @@ class AccuWeatherCityHandler(BaseCityHandler):
     Requires API key
     API key should be set in Config as ACCUWEATHER_API_KEY
     Gets both the city woeid and the geolocation
+    Suggests the cities while the name is typed
     url: https://developer.accuweather.com/
     Attributes:
         logger
     Constants:
-        API_NAME       short API name
+        API_NAME            short API name
+        SUGGESTION_LIMIT    maximum number of cities the API suggests
+        PREFIX_SUGGESTIONS  the autocomplete endpoint suggests the names starting with the name
     """
 
     API_NAME = "AccuWeather"
+    SUGGESTION_LIMIT = 10
+    PREFIX_SUGGESTIONS = True
 
     def __init__(self, name):
         super().__init__(name)
@@ -30,19 +40,13 @@ class AccuWeatherCityHandler(BaseCityHandler):
     def ping(self) -> bool:
         """
         AccuWeather API connection test
-        Tries to connect to the API for one second
+        Answers from the health learned from the real API calls, makes no calls
 
-        :return: whether the call was successful
+        :return: whether the API is considered available
         """
-        try:
-            self.logger.debug(f"Trying to ping {self.API_NAME}")
-            timeout = 1
-            requests.get("https://developer.accuweather.com/", timeout=timeout)
-            self.logger.info(f"Ping to {self.API_NAME} successful")
-            return True
-        except (requests.ConnectionError, requests.Timeout):
-            self.logger.warning(f"Cant ping {self.API_NAME} city")
-            return False
+        available = HealthMonitor.is_available(self.API_NAME)
+        self.logger.debug(f"{self.API_NAME} available: {available}")
+        return available
 
     def get_url(self) -> str:
         """
@@ -69,34 +73,82 @@ class AccuWeatherCityHandler(BaseCityHandler):
         self.logger.debug(f"Created city location url for {self.API_NAME}: {url}")
         return url
 
-    def get_city(self) -> City:
+    @traced("city")
+    def fetch_city(self) -> City:
         """
-        Gets city information
+        Gets city information from the API
+        Takes the first suggestion and completes it with the location
         :return: city object
 
+        :raises:
+            BadCityNameException            API response is not parsable
+            NoAPIConnectionException        API is not accessible
+            ServiceUnavailableException     API returned bad a response
+        """
+        cities = self.fetch_suggestions()
+        if not cities:
+            self.logger.info("Bad city name")
+            raise BadCityNameException(self.name)
+        return self.complete_city(cities[0])
+
+    @traced("suggestions")
+    def fetch_suggestions(self) -> List[City]:
+        """
+        Gets the cities whose names start with the name from the autocomplete endpoint
+        The cities lack the geolocation, see complete_city
+        :return: list of city objects
+
         :raises:
             BadCityNameException            API response is not parsable
             NoAPIConnectionException        API is not accessible
             ServiceUnavailableException     API returned bad a response
         """
         try:
-            response = requests.get(self.get_url())
+            response = RequestCoalescer.get(self.API_NAME, "city", self.get_url())
+            if response.status_code >= 400:
+                raise ServiceUnavailableException(self.API_NAME)
+
+            return [
+                City(
+                    name=city_dict["LocalizedName"],
+                    woeid=city_dict["Key"],
+                    state=city_dict["Country"]["LocalizedName"],
+                    source=self.API_NAME
+                )
+                for city_dict in response.json()
+            ]
+        except (KeyError, TypeError):
+            self.logger.info("Bad city name")
+            raise BadCityNameException(self.name)
+        except (requests.ConnectionError, requests.Timeout):
+            self.logger.warning(f"Error connecting {self.API_NAME}")
+            raise NoAPIConnectionException(self.API_NAME, "city_info")
+
+    @traced("complete")
+    def complete_city(self, city: City) -> City:
+        """
+        Adds the geolocation to a copy of the suggested city
+        :param city: city object with the woeid
+        :return: completed copy of the city object
+
+        :raises:
+            BadCityNameException            API response is not parsable
+            NoAPIConnectionException        API is not accessible
+            ServiceUnavailableException     API returned bad a response
+        """
+        if city.latitude is not None:
+            return city
+        try:
+            response = RequestCoalescer.get(self.API_NAME, "location", self.get_url_location(city))
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
 
-            city_dict = response.json()[0]
-            city = City(
-                name=city_dict["LocalizedName"],
-                woeid=city_dict["Key"],
-                state=city_dict["Country"]["LocalizedName"]
-            )
-            response = requests.get(self.get_url_location(city))
             city_dict = response.json()
+            city = copy.copy(city)
             city.latitude = city_dict["GeoPosition"]["Latitude"]
             city.longitude = city_dict["GeoPosition"]["Longitude"]
-
             return city
-        except (KeyError, IndexError):
+        except KeyError:
             self.logger.info("Bad city name")
             raise BadCityNameException(self.name)
         except (requests.ConnectionError, requests.Timeout):
@@ -1,17 +1,32 @@
 from abc import ABC, abstractmethod
+from typing import List
 
+from handlers.async_loop import AsyncLoop
 from handlers.city import City
+from handlers.city_cache import CityCache
+from handlers.suggestion_trie import SuggestionTrie
 
 
 class BaseCityHandler(ABC):
     """
     City handler abstract base class
+    Found cities are stored in the persistent cache,
+    so repeated lookups of a location do not call the API
+    get_city has an asynchronous variant to be awaited on the AsyncLoop
+    Handlers with SUGGESTION_LIMIT set suggest the cities while the name is typed,
+    the suggestions are kept in the SuggestionTrie
     Attributes:
         name
     Constants:
-        API_NAME       short API name
+        API_NAME            short API name
+        SUGGESTION_LIMIT    maximum number of cities the API suggests, 0 if not supported
+        PREFIX_SUGGESTIONS  whether the API suggests every city whose name starts with the name,
+                            fewer suggestions than the limit then mean there are no other matches
     """
 
+    SUGGESTION_LIMIT = 0
+    PREFIX_SUGGESTIONS = False
+
     def __init__(self, name):
         self.name = name
 
@@ -25,7 +40,111 @@ class BaseCityHandler(ABC):
         """API url to get city information"""
         pass
 
-    @abstractmethod
     def get_city(self) -> City:
-        """Gets city information return City object instance"""
+        """
+        Gets city information from the cache
+        Calls the API if the city is not cached yet
+        :return: city object
+
+        :raises:
+            WeatherAppException     the city is not cached and the API call failed
+        """
+        city = CityCache.get(self.API_NAME, self.name)
+        if city:
+            return city
+
+        city = self.fetch_city()
+        CityCache.put(self.API_NAME, self.name, city)
+        return city
+
+    async def get_city_async(self) -> City:
+        """
+        Asynchronous variant of get_city
+        :return: city object
+        """
+        return await AsyncLoop.run_blocking(self.get_city)
+
+    def get_suggestions(self) -> List[City]:
+        """
+        Gets the cities whose names start with the name
+        Calls the API only if the suggestions cannot be found in the trie
+        :return: suggested cities, may lack the information found by get_city
+
+        :raises:
+            WeatherAppException     the API call failed
+        """
+        if not self.SUGGESTION_LIMIT:
+            return []
+
+        cities = SuggestionTrie.lookup(self.API_NAME, self.name)
+        if cities is None:
+            cities = self.fetch_suggestions()
+            complete = self.PREFIX_SUGGESTIONS and len(cities) < self.SUGGESTION_LIMIT
+            SuggestionTrie.insert(self.API_NAME, self.name, cities, complete)
+        return cities
+
+    async def get_suggestions_async(self) -> List[City]:
+        """
+        Asynchronous variant of get_suggestions
+        :return: suggested cities
+        """
+        return await AsyncLoop.run_blocking(self.get_suggestions)
+
+    def select_city(self, city: City) -> City:
+        """
+        Completes the picked suggestion
+        The completed city is cached under the woeid or the coordinates of the suggestion,
+        not the name, so picking one of the same named cities
+        does not change the city get_city finds by the name
+        :param city: suggested city
+        :return: completed city object
+
+        :raises:
+            WeatherAppException     the API call failed
+        """
+        key = self.get_selection_key(city)
+        selected = CityCache.get(self.API_NAME, key)
+        if selected:
+            return selected
+
+        selected = self.complete_city(city)
+        CityCache.put(self.API_NAME, key, selected)
+        return selected
+
+    @staticmethod
+    def get_selection_key(city: City) -> str:
+        """
+        Gets the key of the picked suggestion in the cache,
+        it cannot be mistaken for a typed name
+
+        :param city: suggested city
+        :return: woeid or the coordinates of the city prefixed with #
+        """
+        if city.woeid:
+            return f"#{city.woeid}"
+        return f"#{city.latitude},{city.longitude}"
+
+    async def select_city_async(self, city: City) -> City:
+        """
+        Asynchronous variant of select_city
+        :param city: suggested city
+        :return: completed city object
+        """
+        return await AsyncLoop.run_blocking(self.select_city, city)
+
+    @abstractmethod
+    def fetch_city(self) -> City:
+        """Gets city information from the API return City object instance"""
         pass
+
+    def fetch_suggestions(self) -> List[City]:
+        """Gets the suggested cities from the API, handlers with suggestions override it"""
+        return []
+
+    def complete_city(self, city: City) -> City:
+        """
+        Adds the information missing in the suggested city, returns it unchanged by default
+        The suggestion itself is kept in the SuggestionTrie and must not be changed,
+        the handlers completing it return a completed copy
+        """
+        return city
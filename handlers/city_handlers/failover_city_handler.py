@@ -0,0 +1,76 @@
+import logging
+from typing import List
+
+from handlers.city import City
+from handlers.city_handlers.base_city_handler import BaseCityHandler
+from handlers.city_handlers.open_weather_city_handler import OpenWeatherCityHandler
+from handlers.city_handlers.accuweather_city_handler import AccuWeatherCityHandler
+from handlers.city_handlers.meta_weather_city_handler import MetaWeatherCityHandler
+from handlers.failover import FailoverExecutor
+
+
+class FailoverCityHandler(BaseCityHandler):
+    """
+    Composite city handler backed by several geolocation APIs
+    Requests the healthiest API, fails over to the others
+    and hedges slow calls (see FailoverExecutor)
+    Attributes:
+        name
+        handlers       handlers of all the providers
+        logger
+    Constants:
+        API_NAME       short API name
+        PROVIDERS      city handler classes in the preferred order
+    """
+
+    API_NAME = "Auto (failover)"
+    PROVIDERS = (OpenWeatherCityHandler, AccuWeatherCityHandler, MetaWeatherCityHandler)
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.handlers = [provider(name) for provider in self.PROVIDERS]
+        self.logger = logging.getLogger("fo_city")
+
+    def ping(self) -> bool:
+        """
+        Tests connection to the providers
+
+        :return: whether any of the providers is reachable
+        """
+        return any(handler.ping() for handler in self.handlers)
+
+    def get_url(self) -> str:
+        """Gets the city url of the first provider"""
+        return self.handlers[0].get_url()
+
+    def get_suggestions(self) -> List[City]:
+        """
+        Gets the suggestions from the healthiest provider supporting them
+        Every provider keeps its suggestions in its own trie
+        :return: suggested cities
+
+        :raises:
+            WeatherAppException     all the providers failed or the budget is spent
+        """
+        return FailoverExecutor.call("city", "suggestions", [
+            (handler.API_NAME, handler.get_suggestions) for handler in self.handlers if handler.SUGGESTION_LIMIT
+        ])
+
+    def complete_city(self, city: City) -> City:
+        """Lets the provider that suggested the city add the information missing in it"""
+        for handler in self.handlers:
+            if handler.API_NAME == city.source:
+                return handler.complete_city(city)
+        return city
+
+    def fetch_city(self) -> City:
+        """
+        Gets city information from the healthiest provider
+        :return: city object
+
+        :raises:
+            WeatherAppException     all the providers failed or the budget is spent
+        """
+        return FailoverExecutor.call("city", "city_info", [
+            (handler.API_NAME, handler.fetch_city) for handler in self.handlers
+        ])
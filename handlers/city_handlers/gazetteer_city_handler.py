@@ -0,0 +1,113 @@
+import logging
+from typing import List
+
+from handlers.city_handlers.base_city_handler import BaseCityHandler
+from handlers.errors import BadCityNameException, ServiceUnavailableException
+from handlers.city import City
+from handlers.gazetteer import Gazetteer
+from handlers.tracing import traced
+
+from config import Config
+
+
+class GazetteerCityHandler(BaseCityHandler):
+    """
+    Offline city handler class
+    Does not make any API calls, looks the cities up in the local Gazetteer index
+    The index should be built beforehand:
+        python -m handlers.gazetteer cities15000.txt
+    Gets only city geolocation, the country code is used as the state
+    Attributes:
+        logger
+    Constants:
+        API_NAME            short name of the handler
+        SUGGESTION_LIMIT    maximum number of suggested cities
+        PREFIX_SUGGESTIONS  the index suggests the names starting with the name
+    """
+
+    API_NAME = "Offline gazetteer"
+    SUGGESTION_LIMIT = Config.SUGGESTION_COUNT
+    PREFIX_SUGGESTIONS = True
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.logger = logging.getLogger("gz_city")
+
+    def ping(self) -> bool:
+        """
+        Checks whether the index is built
+
+        :return: whether the index can be opened
+        """
+        return Gazetteer.is_available()
+
+    def get_url(self) -> None:
+        """The lookup is local, there is no url"""
+        return None
+
+    def get_city(self) -> City:
+        """
+        Gets city information from the index
+        The lookup is faster than the city cache, so the cache is not used
+        :return: city object
+
+        :raises:
+            BadCityNameException            no similar city is known
+            ServiceUnavailableException     the index is not built
+        """
+        return self.fetch_city()
+
+    @traced("city")
+    def fetch_city(self) -> City:
+        """
+        Gets city information from the index
+        Takes the most populated city with the name or the closest one
+        :return: city object
+
+        :raises:
+            BadCityNameException            no similar city is known
+            ServiceUnavailableException     the index is not built
+        """
+        try:
+            city = Gazetteer.find(self.name)
+        except (OSError, ValueError):
+            self.logger.warning(f"Cant open {Config.GAZETTEER_FILE}")
+            raise ServiceUnavailableException(self.API_NAME)
+        if not city:
+            self.logger.info("Bad city name")
+            raise BadCityNameException(self.name)
+        return city
+
+    def get_suggestions(self) -> List[City]:
+        """
+        Gets the most populated cities whose names start with the name
+        :return: suggested cities
+
+        :raises:
+            ServiceUnavailableException     the index is not built
+        """
+        try:
+            return Gazetteer.search(self.name, self.SUGGESTION_LIMIT)
+        except (OSError, ValueError):
+            self.logger.warning(f"Cant open {Config.GAZETTEER_FILE}")
+            raise ServiceUnavailableException(self.API_NAME)
+
+    @classmethod
+    def get_nearest_city(cls, latitude: float, longitude: float) -> City:
+        """
+        Gets the city nearest to the point
+        :param latitude: latitude of the point
+        :param longitude: longitude of the point
+        :return: city object
+
+        :raises:
+            BadCityNameException            the index is empty
+            ServiceUnavailableException     the index is not built
+        """
+        try:
+            city = Gazetteer.nearest(latitude, longitude)
+        except (OSError, ValueError):
+            raise ServiceUnavailableException(cls.API_NAME)
+        if not city:
+            raise BadCityNameException(f"{latitude},{longitude}")
+        return city
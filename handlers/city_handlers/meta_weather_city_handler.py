@@ -5,6 +5,9 @@ from handlers.city_handlers.base_city_handler import BaseCityHandler
 from handlers.errors import BadCityNameException, NoAPIConnectionException, WeatherAppException, \
     ServiceUnavailableException
 from handlers.city import City
+from handlers.health_monitor import HealthMonitor
+from handlers.request_coalescer import RequestCoalescer
+from handlers.tracing import traced
 
 
 class MetaWeatherCityHandler(BaseCityHandler):
@@ -28,20 +31,13 @@ class MetaWeatherCityHandler(BaseCityHandler):
     def ping(self) -> bool:
         """
         MetaWeather API connection test
-        Tries to connect to the API for one second
+        Answers from the health learned from the real API calls, makes no calls
 
-        :return: whether the call was successful
+        :return: whether the API is considered available
         """
-
-        try:
-            self.logger.debug(f"Trying to ping {self.API_NAME}")
-            timeout = 1
-            requests.get("https://www.metaweather.com/api/", timeout=timeout)
-            self.logger.info(f"Ping to {self.API_NAME} successful")
-            return True
-        except (requests.ConnectionError, requests.Timeout):
-            self.logger.warning(f"Cant ping {self.API_NAME} weather")
-            return False
+        available = HealthMonitor.is_available(self.API_NAME)
+        self.logger.debug(f"{self.API_NAME} available: {available}")
+        return available
 
     def get_url(self) -> str:
         """
@@ -55,9 +51,10 @@ class MetaWeatherCityHandler(BaseCityHandler):
         self.logger.debug(f"Created city url for {self.API_NAME}: {url}")
         return url
 
-    def get_city(self) -> City:
+    @traced("city")
+    def fetch_city(self) -> City:
         """
-        Gets city information
+        Gets city information from the API
         :return: city object
 
         :raises:
@@ -67,7 +64,7 @@ class MetaWeatherCityHandler(BaseCityHandler):
         """
 
         try:
-            response = requests.get(self.get_url())
+            response = RequestCoalescer.get(self.API_NAME, "city", self.get_url())
 
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
@@ -82,7 +79,8 @@ class MetaWeatherCityHandler(BaseCityHandler):
                 name=city_dict["title"],
                 longitude=longitude,
                 latitude=latitude,
-                woeid=city_dict["woeid"]
+                woeid=city_dict["woeid"],
+                source=self.API_NAME
             )
         except (KeyError, IndexError, ValueError):
             self.logger.info("Bad city name")
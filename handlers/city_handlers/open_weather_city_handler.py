@@ -1,10 +1,14 @@
 import requests
 import logging
+from typing import List
 
 from handlers.city_handlers.base_city_handler import BaseCityHandler
 from handlers.errors import BadCityNameException, NoAPIConnectionException, WeatherAppException, \
     ServiceUnavailableException
 from handlers.city import City
+from handlers.health_monitor import HealthMonitor
+from handlers.request_coalescer import RequestCoalescer
+from handlers.tracing import traced
 
 from config import Config
 
@@ -15,14 +19,19 @@ class OpenWeatherCityHandler(BaseCityHandler):
     Requires API key
     API key should be set in Config as OPEN_WEATHER_API_KEY
     Gets only city geolocation
+    Suggests the cities while the name is typed,
+    the geocoder matches whole names, so the suggestions of a name
+    say nothing about the longer names starting with it
     url: https://openweathermap.org/api
     Attributes:
         logger
     Constants:
-        API_NAME       short API name
+        API_NAME            short API name
+        SUGGESTION_LIMIT    maximum number of cities the API suggests
     """
 
     API_NAME = "OpenWeather"
+    SUGGESTION_LIMIT = 5
 
     def __init__(self, name):
         super().__init__(name)
@@ -31,20 +40,13 @@ class OpenWeatherCityHandler(BaseCityHandler):
     def ping(self) -> bool:
         """
         OpenWeather API connection test
-        Tries to connect to the API for one second
+        Answers from the health learned from the real API calls, makes no calls
 
-        :return: whether the call was successful
+        :return: whether the API is considered available
         """
-
-        try:
-            self.logger.debug(f"Trying to ping {self.API_NAME}")
-            timeout = 1
-            requests.get("http://api.openweathermap.org", timeout=timeout)
-            self.logger.info(f"Ping to {self.API_NAME} successful")
-            return True
-        except (requests.ConnectionError, requests.Timeout):
-            self.logger.warning(f"Cant ping {self.API_NAME} weather")
-            return False
+        available = HealthMonitor.is_available(self.API_NAME)
+        self.logger.debug(f"{self.API_NAME} available: {available}")
+        return available
 
     def get_url(self) -> str:
         """
@@ -59,9 +61,23 @@ class OpenWeatherCityHandler(BaseCityHandler):
         self.logger.debug(f"Created city url for {self.API_NAME}: {url}")
         return url
 
-    def get_city(self) -> City:
+    def get_url_suggestions(self) -> str:
+        """
+        Gets OpenWeather API url to get the locations matching the name
+
+        :return: URL that can be visited to get the information
+        """
+
+        url = f"http://api.openweathermap.org/geo/1.0/direct" \
+              f"?q={self.name}&" \
+              f"limit={self.SUGGESTION_LIMIT}&appid={Config.OPEN_WEATHER_API_KEY}"
+        self.logger.debug(f"Created suggestions url for {self.API_NAME}: {url}")
+        return url
+
+    @traced("city")
+    def fetch_city(self) -> City:
         """
-        Gets city information
+        Gets city information from the API
         :return: city object
 
         :raises:
@@ -71,7 +87,7 @@ class OpenWeatherCityHandler(BaseCityHandler):
         """
 
         try:
-            response = requests.get(self.get_url())
+            response = RequestCoalescer.get(self.API_NAME, "city", self.get_url())
 
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
@@ -83,7 +99,8 @@ class OpenWeatherCityHandler(BaseCityHandler):
                 name=city_dict["name"],
                 longitude=city_dict["lon"],
                 latitude=city_dict["lat"],
-                state=city_dict.get("state")
+                state=city_dict.get("state"),
+                source=self.API_NAME
             )
         except (KeyError, IndexError):
             self.logger.info("Bad city name")
@@ -91,3 +108,38 @@ class OpenWeatherCityHandler(BaseCityHandler):
         except (requests.ConnectionError, requests.Timeout):
             self.logger.warning(f"Error connecting {self.API_NAME}")
             raise NoAPIConnectionException(self.API_NAME, "city_info")
+
+    @traced("suggestions")
+    def fetch_suggestions(self) -> List[City]:
+        """
+        Gets the cities matching the name from the API
+        :return: list of city objects
+
+        :raises:
+            BadCityNameException            API response is not parsable
+            NoAPIConnectionException        API is not accessible
+            ServiceUnavailableException     API returned bad a response
+        """
+
+        try:
+            response = RequestCoalescer.get(self.API_NAME, "suggestions", self.get_url_suggestions())
+
+            if response.status_code >= 400:
+                raise ServiceUnavailableException(self.API_NAME)
+
+            return [
+                City(
+                    name=city_dict["name"],
+                    longitude=city_dict["lon"],
+                    latitude=city_dict["lat"],
+                    state=city_dict.get("state") or city_dict.get("country"),
+                    source=self.API_NAME
+                )
+                for city_dict in response.json()
+            ]
+        except (KeyError, TypeError):
+            self.logger.info("Bad city name")
+            raise BadCityNameException(self.name)
+        except (requests.ConnectionError, requests.Timeout):
+            self.logger.warning(f"Error connecting {self.API_NAME}")
+            raise NoAPIConnectionException(self.API_NAME, "city_info")
@@ -0,0 +1,110 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from handlers.city import City
+from handlers.errors import WeatherAppException
+from handlers.sun_handlers.solar_sun_handler import SolarSunHandler
+from handlers.weather import Weather
+
+from config import Config
+
+
+class DashboardEntry:
+    """
+    Refresh result of a single watched city
+
+    Attributes:
+        name        location name as entered
+        city        found City object (None if not found)
+        weather     current Weather object with the updated state (None if failed)
+        error       error message (None if succeeded)
+    """
+
+    def __init__(self, name: str, city: City = None, weather: Weather = None, error: str = None):
+        self.name = name
+        self.city = city
+        self.weather = weather
+        self.error = error
+
+
+class DashboardRefresher:
+    """
+    Refreshes the current weather of many cities at once
+    Cities are resolved in parallel (usually from the city cache),
+    then the current weather is requested with the batched group calls
+    where the weather API supports them, the rest of the cities
+    are requested in parallel on a bounded thread pool
+    Day and night themes are calculated locally with the solar calculator,
+    the sun information of all the located cities in one batch
+
+    Class attributes:
+        executor    bounded thread pool of the dashboard calls
+        logger
+
+    Configuration (Config):
+        DASHBOARD_WORKERS   maximum number of parallel API calls
+    """
+
+    executor = ThreadPoolExecutor(max_workers=Config.DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+    logger = logging.getLogger("dashbrd")
+
+    @classmethod
+    def refresh(cls, city_handler_class, weather_handler_class, city_names: List[str]) -> List[DashboardEntry]:
+        """
+        Gets the current weather of all the cities
+        Blocks until all the calls are finished, should not be called on the main thread
+        A failure of a city, expected or not, does not affect the others
+
+        :param city_handler_class: BaseCityHandler subclass
+        :param weather_handler_class: BaseWeatherHandler subclass
+        :param city_names: names of the locations
+        :return: DashboardEntry list in the same order
+        """
+        entries = [DashboardEntry(name) for name in city_names]
+
+        city_futures = [cls.executor.submit(city_handler_class(name).get_city) for name in city_names]
+        for entry, future in zip(entries, city_futures):
+            try:
+                entry.city = future.result()
+            except WeatherAppException as e:
+                entry.error = e.message
+            except Exception as e:
+                cls.logger.exception(f"Location of {entry.name} failed: {e}")
+                entry.error = WeatherAppException().message
+
+        resolved = [entry for entry in entries if entry.city]
+        if weather_handler_class.GROUP_SIZE > 1 and resolved:
+            try:
+                weathers = weather_handler_class.get_weather_group([entry.city for entry in resolved])
+                for entry, weather in zip(resolved, weathers):
+                    entry.weather = weather
+            except Exception as e:
+                cls.logger.warning(f"Group refresh failed, requesting one by one: {e}")
+
+        pending = [entry for entry in resolved if not entry.weather]
+        weather_futures = [
+            cls.executor.submit(weather_handler_class(entry.city).get_weather_current)
+            for entry in pending
+        ]
+        for entry, future in zip(pending, weather_futures):
+            try:
+                entry.weather = future.result()
+            except WeatherAppException as e:
+                entry.error = e.message
+            except Exception as e:
+                cls.logger.exception(f"Weather of {entry.name} failed: {e}")
+                entry.error = WeatherAppException().message
+
+        now = time.time()
+        located = [
+            entry for entry in entries
+            if entry.weather and entry.city.latitude is not None and entry.city.longitude is not None
+        ]
+        sun_infos = SolarSunHandler.get_sun_info_many([entry.city for entry in located], now)
+        for entry, sun_info in zip(located, sun_infos):
+            entry.weather.update_state(sun_info, now)
+
+        cls.logger.info(f"Refreshed {len(entries)} watched cities, {len(pending)} one by one")
+        return entries
@@ -0,0 +1,114 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Tuple
+
+from handlers.errors import NoAPIConnectionException, NotCompatibleAPIException, BadCityNameException
+from handlers.provider_stats import ProviderStats
+
+from config import Config
+
+
+class FailoverExecutor:
+    """
+    Calls interchangeable providers until one of them succeeds
+    Providers are tried from the healthiest one (see ProviderStats),
+    a failed call is retried with the next provider right away,
+    a call running longer than the provider p95 latency is hedged
+    by calling the next provider in parallel, the first result wins
+    Gives up when the latency budget is spent
+
+    Class attributes:
+        executor    thread pool of the provider calls
+        logger
+
+    Configuration (Config):
+        FAILOVER_BUDGET     maximum time of a call in seconds
+        FAILOVER_WORKERS    maximum number of parallel provider calls
+    """
+
+    executor = ThreadPoolExecutor(max_workers=Config.FAILOVER_WORKERS, thread_name_prefix="failover")
+    logger = logging.getLogger("failovr")
+
+    @classmethod
+    def call(cls, kind: str, action: str, calls: List[Tuple[str, Callable]]):
+        """
+        Gets the result from the first provider that succeeds
+
+        :param kind: provider kind (weather, city or sun)
+        :param action: action name used in the exception
+        :param calls: (API name, callable without arguments) tuples in the preferred order
+        :return: result of the successful call
+
+        :raises:
+            WeatherAppException         the last error if all the providers failed
+            NoAPIConnectionException    the budget is spent
+        """
+        functions = dict(calls)
+        queue = ProviderStats.rank(kind, [api_name for api_name, _ in calls])
+        deadline = time.monotonic() + Config.FAILOVER_BUDGET
+        pending = {}
+        last_error = None
+
+        def launch():
+            api_name = queue.pop(0)
+            future = cls.executor.submit(
+                contextvars.copy_context().run, cls._timed_call, kind, api_name, functions[api_name]
+            )
+            pending[future] = api_name, time.monotonic()
+
+        launch()
+        while pending:
+            now = time.monotonic()
+            timeout = deadline - now
+            if timeout <= 0:
+                break
+
+            hedge_at = None
+            if queue and len(pending) == 1:
+                api_name, started = next(iter(pending.values()))
+                p95 = ProviderStats.get(kind, api_name).get_percentile(95)
+                if p95 is not None:
+                    hedge_at = started + p95
+                    timeout = min(timeout, max(0, hedge_at - now))
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if hedge_at is not None:
+                    cls.logger.info(f"Hedging slow {kind} call to {api_name} with {queue[0]}")
+                    launch()
+                continue
+
+            for future in done:
+                api_name, _ = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    cls.logger.warning(f"{kind.capitalize()} call to {api_name} failed: {e}")
+                    last_error = e
+            if queue and not pending:
+                launch()
+
+        if last_error and not pending:
+            raise last_error
+        cls.logger.warning(f"{kind.capitalize()} call ran out of the budget")
+        raise NoAPIConnectionException("Failover", action)
+
+    @staticmethod
+    def _timed_call(kind: str, api_name: str, function: Callable):
+        """Calls the provider and records its statistics"""
+        started = time.monotonic()
+        try:
+            result = function()
+        except NotCompatibleAPIException:
+            # not a health problem of the provider
+            raise
+        except BadCityNameException:
+            ProviderStats.get(kind, api_name).record(time.monotonic() - started, True)
+            raise
+        except Exception:
+            ProviderStats.get(kind, api_name).record(time.monotonic() - started, False)
+            raise
+        ProviderStats.get(kind, api_name).record(time.monotonic() - started, True)
+        return result
@@ -0,0 +1,267 @@
+import logging
+import math
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from operator import sub
+from threading import Lock
+from typing import Dict, List, Optional
+
+from handlers.city import City
+from handlers.errors import WeatherAppException
+from handlers.handler_registry import HandlerRegistry
+from handlers.history_store import HistoryStore
+from handlers.provider_stats import ProviderStats
+
+from config import Config
+
+
+class ForecastScore:
+    """
+    Forecast errors of a provider by the variable and the lead time
+    The lead time is the time from the forecast issue to the forecast time,
+    grouped by the ACCURACY_LEAD_HOURS buckets
+
+    Attributes:
+        api_name    short API name
+        leads       first lead hour of every bucket
+        counts      numbers of the matched forecasts by the variable, an array item per bucket
+        mae         mean absolute errors by the variable, an array item per bucket (NaN without samples)
+        bias        mean errors (forecast minus observation) by the variable, an array item per bucket
+    """
+
+    def __init__(self, api_name: str, buckets: int):
+        self.api_name = api_name
+        self.leads = array("d", (bucket * Config.ACCURACY_LEAD_HOURS for bucket in range(buckets)))
+        self.counts = {}
+        self.mae = {}
+        self.bias = {}
+
+    def get_mae(self, variable: str) -> Optional[float]:
+        """
+        Gets the mean absolute error of all the lead times
+
+        :param variable: name of the ForecastSeries column
+        :return: error or None if there are not enough samples
+        """
+        counts = self.counts.get(variable)
+        if not counts or sum(counts) < Config.ACCURACY_MIN_SAMPLES:
+            return None
+        return math.fsum(
+            count * mae for count, mae in zip(counts, self.mae[variable]) if count
+        ) / sum(counts)
+
+
+class ForecastScorer:
+    """
+    Scores the forecasts of the weather providers against the observed weather
+    The HistoryStore keeps the current weather and the forecasts fetched by the handlers,
+    if ACCURACY_RECORDING is enabled a background job also periodically requests
+    the current weather and the forecast of the shown city from every provider,
+    which costs two extra metered calls per provider every ACCURACY_INTERVAL
+    The forecast rows are matched with the nearest observation of any provider
+    within ACCURACY_MATCH_WINDOW, so no provider is scored against itself only
+    The scoring works on the columns of the whole history:
+    the rows are matched by bisecting the sorted observation times,
+    grouped by the lead time bucket once, then the errors of every variable
+    are computed over the gathered arrays
+    The temperature error of every provider is passed to ProviderStats
+    to rank the providers by the accuracy as well as by the health
+    The daily HistoryStore compaction is run by the same background job,
+    so it never delays a foreground fetch
+
+    Class attributes:
+        executor    single thread running the recording, the scoring and the compaction job
+        recorded    last recording epoch time by the location key
+        scores      last ForecastScore objects by the API name
+        lock        guards recorded and scores
+        logger
+
+    Constants:
+        VARIABLES   scored ForecastSeries columns
+        CIRCULAR    scored columns in degrees, their errors wrap around
+
+    Configuration (Config):
+        ACCURACY_RECORDING          whether every provider is requested in the background, off by default
+        ACCURACY_INTERVAL           minimum time between the recordings of a location in seconds
+        ACCURACY_FORECAST_DAYS      number of the recorded forecast days
+        ACCURACY_WINDOW_DAYS        scored history in days
+        ACCURACY_MATCH_WINDOW       maximum time between a forecast and its observation in seconds
+        ACCURACY_LEAD_HOURS         lead time bucket in hours
+        ACCURACY_MIN_SAMPLES        number of the matched forecasts needed to rank a provider
+    """
+
+    VARIABLES = ("temperature", "pressure", "humidity", "wind_speed", "wind_direction")
+    CIRCULAR = ("wind_direction",)
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scorer")
+    recorded = {}
+    scores = {}
+    lock = Lock()
+    logger = logging.getLogger("scorer")
+
+    @classmethod
+    def schedule(cls, city: City) -> None:
+        """
+        Starts the recording job of the city unless it was recorded recently,
+        only rescores the providers if ACCURACY_RECORDING is disabled
+        Compacts the HistoryStore first if it was not compacted today
+        Does not block, can be called from any thread
+
+        :param city: City object
+        :return: None
+        """
+        location_key = cls._get_providers()[0](city).get_location_key()
+        now = time.time()
+        cls.executor.submit(HistoryStore.compact_daily)
+        with cls.lock:
+            if now - cls.recorded.get(location_key, 0) < Config.ACCURACY_INTERVAL:
+                return
+            cls.recorded[location_key] = now
+        cls.executor.submit(cls._run, city)
+
+    @classmethod
+    def record(cls, city: City) -> None:
+        """
+        Requests the current weather and the forecast from every provider
+        The results are appended to the HistoryStore by the handlers,
+        a failed provider is skipped
+
+        :param city: City object
+        :return: None
+        """
+        for provider in cls._get_providers():
+            handler = provider(city)
+            try:
+                handler.get_weather_current()
+                handler.get_weather_forecast(Config.ACCURACY_FORECAST_DAYS)
+            except WeatherAppException as e:
+                cls.logger.info(f"{provider.API_NAME} is not recorded: {e}")
+
+    @classmethod
+    def score(cls, api_names: List[str] = None,
+              start: float = None, end: float = None) -> Dict[str, ForecastScore]:
+        """
+        Scores the forecasts of all the stored locations
+
+        :param api_names: short API names, all the providers by default
+        :param start: first forecast epoch time, ACCURACY_WINDOW_DAYS ago by default
+        :param end: last forecast epoch time (exclusive), now by default
+        :return: ForecastScore objects by the API name
+        """
+        end = time.time() if end is None else end
+        start = end - Config.ACCURACY_WINDOW_DAYS * 24 * 60 * 60 if start is None else start
+        api_names = api_names or [provider.API_NAME for provider in cls._get_providers()]
+
+        locations = sorted({
+            location for api_name in api_names for location in HistoryStore.get_locations(api_name)
+        })
+        matches = {api_name: {"lead": array("d")} for api_name in api_names}
+        for location in locations:
+            observed = cls._get_observed(api_names, location, start, end)
+            for api_name in api_names:
+                forecast = HistoryStore.query(api_name, location, "forecast", start, end)
+                cls._match(forecast, observed, matches[api_name])
+
+        return {api_name: cls._aggregate(api_name, matched) for api_name, matched in matches.items()}
+
+    @classmethod
+    def update(cls) -> None:
+        """
+        Rescores the providers and passes the temperature errors to ProviderStats
+
+        :return: None
+        """
+        scores = cls.score()
+        for api_name, score in scores.items():
+            ProviderStats.get("weather", api_name).set_accuracy(score.get_mae("temperature"))
+        with cls.lock:
+            cls.scores = scores
+        cls.logger.debug(f"Scored {len(scores)} weather providers")
+
+    @classmethod
+    def _run(cls, city: City) -> None:
+        """Records the city if enabled and rescores the providers, logs the failures of the background job"""
+        try:
+            if Config.ACCURACY_RECORDING:
+                cls.record(city)
+            cls.update()
+        except Exception as e:
+            cls.logger.warning(f"Scoring failed: {e}")
+
+    @staticmethod
+    def _get_providers() -> tuple:
+        """Gets the scored weather handler classes, the ones the failover handler picks from"""
+        return HandlerRegistry.get("weather", "Auto (failover)").PROVIDERS
+
+    @classmethod
+    def _get_observed(cls, api_names: List[str], location: str, start: float, end: float) -> Dict[str, array]:
+        """Gets the observations of all the providers around the range sorted by the time"""
+        window = Config.ACCURACY_MATCH_WINDOW
+        columns = ("time",) + cls.VARIABLES
+        merged = {column: array("d") for column in columns}
+        for api_name in api_names:
+            observed = HistoryStore.query(api_name, location, "observed", start - window, end + window)
+            for column in columns:
+                merged[column].extend(observed[column])
+
+        order = sorted(range(len(merged["time"])), key=merged["time"].__getitem__)
+        return {column: array("d", map(values.__getitem__, order)) for column, values in merged.items()}
+
+    @classmethod
+    def _match(cls, forecast: Dict[str, array], observed: Dict[str, array], matched: Dict[str, array]) -> None:
+        """
+        Appends the forecast values with the values of the nearest observations
+        and the lead times to the matched columns ("<variable>" and "<variable>_observed")
+        """
+        times = observed["time"]
+        if not times:
+            return
+        window = Config.ACCURACY_MATCH_WINDOW
+        rows, nearest = [], []
+        for row, forecast_time in enumerate(forecast["time"]):
+            index = bisect_left(times, forecast_time)
+            if index == len(times) or (index and forecast_time - times[index - 1] < times[index] - forecast_time):
+                index -= 1
+            if abs(times[index] - forecast_time) <= window:
+                rows.append(row)
+                nearest.append(index)
+
+        matched["lead"].extend(map(
+            sub, map(forecast["time"].__getitem__, rows), map(forecast["issued"].__getitem__, rows)
+        ))
+        for variable in cls.VARIABLES:
+            matched.setdefault(variable, array("d")).extend(map(forecast[variable].__getitem__, rows))
+            matched.setdefault(f"{variable}_observed", array("d")).extend(map(observed[variable].__getitem__, nearest))
+
+    @classmethod
+    def _aggregate(cls, api_name: str, matched: Dict[str, array]) -> ForecastScore:
+        """Calculates the errors of the matched values by the lead time bucket"""
+        bucket_seconds = Config.ACCURACY_LEAD_HOURS * 60 * 60
+        buckets = [max(0, int(lead // bucket_seconds)) for lead in matched["lead"]]
+        score = ForecastScore(api_name, max(buckets) + 1 if buckets else 0)
+
+        order = sorted(range(len(buckets)), key=buckets.__getitem__)
+        sorted_buckets = [buckets[index] for index in order]
+        bounds = [bisect_left(sorted_buckets, bucket) for bucket in range(len(score.leads) + 1)]
+
+        for variable in cls.VARIABLES:
+            errors = list(map(
+                sub,
+                map(matched.get(variable, array("d")).__getitem__, order),
+                map(matched.get(f"{variable}_observed", array("d")).__getitem__, order)
+            ))
+            if variable in cls.CIRCULAR:
+                errors = [(error + 180) % 360 - 180 for error in errors]
+
+            counts, mae, bias = array("d"), array("d"), array("d")
+            for first, last in zip(bounds, bounds[1:]):
+                # NaN marks a missing value of the forecast or the observation
+                bucket_errors = [error for error in errors[first:last] if error == error]
+                count = len(bucket_errors)
+                counts.append(count)
+                mae.append(math.fsum(map(abs, bucket_errors)) / count if count else math.nan)
+                bias.append(math.fsum(bucket_errors) / count if count else math.nan)
+            score.counts[variable], score.mae[variable], score.bias[variable] = counts, mae, bias
+        return score
@@ -0,0 +1,99 @@
+import math
+from array import array
+from typing import Iterable, Iterator, Union
+
+from handlers.weather import Weather
+
+
+class ForecastSeries:
+    """
+    Compact columnar series of weather conditions (forecast or history)
+    Every numeric attribute is stored in a typed array of doubles,
+    missing values are stored as NaN, the status as a small integer code
+    Rows are accessed as Weather objects created on demand,
+    so the series can be used in place of a Weather list
+
+    Attributes:
+        location_name   name of the tracked location
+        status          array of Weather.STATUS_CODES indexes
+        time            array of epoch times
+        temperature     array of temperatures in Celsius
+        pressure        array of pressures
+        humidity        array of humidity percentages
+        wind_speed      array of wind speeds in meters per second
+        wind_direction  array of wind directions in degrees
+        time_zone       array of time zones in seconds
+
+    Constants:
+        COLUMNS         names of the numeric columns
+    """
+
+    COLUMNS = ("time", "temperature", "pressure", "humidity", "wind_speed", "wind_direction", "time_zone")
+
+    __slots__ = ("location_name", "status") + COLUMNS
+
+    def __init__(self, location_name: str = None):
+        self.location_name = location_name
+        self.status = array("B")
+        for column in self.COLUMNS:
+            setattr(self, column, array("d"))
+
+    @classmethod
+    def from_weathers(cls, weathers: Iterable[Weather], location_name: str = None) -> "ForecastSeries":
+        """
+        Creates a series from Weather objects
+
+        :param weathers: Weather objects in the time order
+        :param location_name: name of the location, taken from the first row if not provided
+        :return: ForecastSeries object
+        """
+        series = cls(location_name)
+        for weather in weathers:
+            series.append(weather)
+        return series
+
+    def append(self, weather: Weather) -> None:
+        """
+        Appends the weather conditions to the end of the series
+
+        :param weather: Weather object
+        :return: None
+        """
+        if self.location_name is None:
+            self.location_name = weather.city_name
+        self.status.append(Weather.STATUS_CODES.index(weather.status))
+        for column in self.COLUMNS:
+            value = getattr(weather, column)
+            getattr(self, column).append(math.nan if value is None else value)
+
+    def _get_row(self, index: int) -> Weather:
+        """Creates a Weather object from the row"""
+        values = {}
+        for column in self.COLUMNS:
+            value = getattr(self, column)[index]
+            values[column] = None if math.isnan(value) else value
+        return Weather(
+            location_name=self.location_name,
+            status=Weather.STATUS_CODES[self.status[index]],
+            **values
+        )
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Weather, "ForecastSeries"]:
+        if isinstance(item, slice):
+            series = ForecastSeries(self.location_name)
+            series.status = self.status[item]
+            for column in self.COLUMNS:
+                setattr(series, column, getattr(self, column)[item])
+            return series
+        return self._get_row(item)
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def __iter__(self) -> Iterator[Weather]:
+        for index in range(len(self)):
+            yield self._get_row(index)
+
+    def __str__(self):
+        return f"City: {self.location_name}\n" \
+               f"Rows: {len(self)}"
@@ -0,0 +1,381 @@
+import heapq
+import logging
+import math
+import mmap
+import struct
+import sys
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from handlers.city import City
+from handlers.city_cache import CityCache
+
+from config import Config
+
+
+class Gazetteer:
+    """
+    Offline city database loaded from a memory-mapped index file
+    The index is built once from a GeoNames dump (see build)
+    and opened on the first lookup, only the touched pages are read from the disk
+
+    Index layout (little endian):
+        header      magic, number of records, number of cell entries, cell size in degrees
+        records     text offset, latitude, longitude, population; sorted by the name key
+        cells       grid cell number, record number; sorted by the cell number
+        texts       "key\\tname\\tcountry\\n" lines referenced by the records
+
+    Names are searched with the binary search over the sorted keys,
+    unknown names are matched by the edit distance
+    with the names of about the same length starting with the same character,
+    the nearest city is found by visiting the grid cells around the point ring by ring
+
+    Class attributes:
+        index       memory-mapped index file, opened on the first use
+        count       number of records
+        cells       number of cell entries
+        cell_size   size of a grid cell in degrees
+        lock        guards the opening
+        logger
+
+    Configuration (Config):
+        GAZETTEER_FILE          index file path
+        GAZETTEER_CELL_SIZE     size of a grid cell in degrees used by the build
+    """
+
+    MAGIC = b"GAZ1"
+    HEADER = struct.Struct("<4sIIf")
+    RECORD = struct.Struct("<IffI")
+    CELL = struct.Struct("<iI")
+    EARTH_RADIUS = 6371
+
+    index = None
+    count = 0
+    cells = 0
+    cell_size = 0
+    lock = Lock()
+    logger = logging.getLogger("gaztr")
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """
+        Checks whether the index can be opened
+
+        :return: whether the index file exists and is valid
+        """
+        try:
+            cls._open()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    @classmethod
+    def _open(cls) -> None:
+        """Maps the index file to the memory"""
+        if cls.index:
+            return
+        with cls.lock:
+            if cls.index:
+                return
+            with open(Config.GAZETTEER_FILE, "rb") as f:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count, cells, cell_size = cls.HEADER.unpack_from(index)
+            if magic != cls.MAGIC:
+                index.close()
+                raise ValueError(f"{Config.GAZETTEER_FILE} is not a gazetteer index")
+            cls.count, cls.cells, cls.cell_size = count, cells, cell_size
+            cls.index = index
+            cls.logger.info(f"Opened the gazetteer with {count} names")
+
+    @classmethod
+    def _cells_offset(cls) -> int:
+        return cls.HEADER.size + cls.count * cls.RECORD.size
+
+    @classmethod
+    def _texts_offset(cls) -> int:
+        return cls._cells_offset() + cls.cells * cls.CELL.size
+
+    @classmethod
+    def _record(cls, number: int) -> Tuple[int, float, float, int]:
+        """Gets the text offset, latitude, longitude and population of the record"""
+        return cls.RECORD.unpack_from(cls.index, cls.HEADER.size + number * cls.RECORD.size)
+
+    @classmethod
+    def _key(cls, number: int) -> bytes:
+        """Gets the name key of the record"""
+        start = cls._texts_offset() + cls._record(number)[0]
+        return cls.index[start:cls.index.find(b"\t", start)]
+
+    @classmethod
+    def _city(cls, number: int) -> City:
+        """Makes the city object of the record"""
+        offset, latitude, longitude, _ = cls._record(number)
+        start = cls._texts_offset() + offset
+        _, name, country = cls.index[start:cls.index.find(b"\n", start)].decode("utf-8").split("\t")
+        return City(name=name, latitude=round(latitude, 4), longitude=round(longitude, 4), state=country)
+
+    @classmethod
+    def _lower_bound(cls, key: bytes) -> int:
+        """Gets the number of the first record with the key not less than the given one"""
+        low, high = 0, cls.count
+        while low < high:
+            middle = (low + high) // 2
+            if cls._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @classmethod
+    def _prefix_end(cls, prefix: bytes, start: int) -> int:
+        """Gets the number of the first record after the start with the key not starting with the prefix"""
+        low, high = start, cls.count
+        while low < high:
+            middle = (low + high) // 2
+            if cls._key(middle)[:len(prefix)] <= prefix:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @classmethod
+    def _populations(cls, numbers: range) -> List[int]:
+        """Gets the populations of the consecutive records, unpacked in one pass"""
+        start = cls.HEADER.size + numbers.start * cls.RECORD.size
+        records = cls.index[start:start + len(numbers) * cls.RECORD.size]
+        return [population for *_, population in cls.RECORD.iter_unpack(records)]
+
+    @classmethod
+    def _prefix_range(cls, prefix: bytes) -> range:
+        """Gets the numbers of the records with the keys starting with the prefix"""
+        start = cls._lower_bound(prefix)
+        return range(start, cls._prefix_end(prefix, start))
+
+    @classmethod
+    def search(cls, prefix: str, count: int) -> List[City]:
+        """
+        Gets the most populated cities whose names start with the prefix
+        Only the top records are selected by the population,
+        more of them are taken if the duplicate names leave too few cities
+
+        :param prefix: beginning of the location name
+        :param count: maximum number of the cities
+        :return: list of city objects
+        """
+        cls._open()
+        key = CityCache.normalize(prefix).encode("utf-8")
+        if not key:
+            return []
+        numbers = cls._prefix_range(key)
+        populations = cls._populations(numbers)
+        wanted = count
+        while True:
+            cities = []
+            for position in heapq.nlargest(wanted, range(len(numbers)), key=populations.__getitem__):
+                city = cls._city(numbers[position])
+                if not any((city.name, city.state) == (known.name, known.state) for known in cities):
+                    cities.append(city)
+                if len(cities) == count:
+                    return cities
+            if wanted >= len(numbers):
+                return cities
+            wanted *= 2
+
+    @classmethod
+    def find(cls, name: str) -> Optional[City]:
+        """
+        Gets the most populated city with the name
+        The name may be followed by a comma and the country code
+        Falls back to the closest name if there is no exact match
+
+        :param name: name of the location
+        :return: city object or None if nothing similar is known
+        """
+        cls._open()
+        name, _, country = name.partition(",")
+        key = CityCache.normalize(name).encode("utf-8")
+        country = country.strip().upper()
+        if not key:
+            return None
+
+        numbers = [number for number in cls._prefix_range(key) if cls._key(number) == key]
+        if not numbers:
+            numbers = cls._fuzzy(key)
+        if country:
+            numbers = [number for number in numbers if cls._city(number).state == country] or numbers
+        if not numbers:
+            return None
+        return cls._city(max(numbers, key=lambda number: cls._record(number)[3]))
+
+    @classmethod
+    def _fuzzy(cls, key: bytes) -> List[int]:
+        """
+        Gets the records with the closest keys within the allowed distance
+        Only the keys sharing the first character and differing in length
+        by no more than the allowed distance are compared
+        """
+        text = key.decode("utf-8")
+        allowed = max(1, len(text) // 4)
+        best, numbers = allowed, []
+        for number in cls._prefix_range(text[0].encode("utf-8")):
+            candidate = cls._key(number).decode("utf-8")
+            if abs(len(candidate) - len(text)) > allowed:
+                continue
+            distance = cls._distance(text, candidate, best)
+            if distance > best:
+                continue
+            if distance < best:
+                best, numbers = distance, []
+            numbers.append(number)
+        return numbers
+
+    @staticmethod
+    def _distance(first: str, second: str, limit: int) -> int:
+        """Gets the edit distance of the strings, stops counting above the limit and returns limit + 1"""
+        previous = list(range(len(second) + 1))
+        for i, first_char in enumerate(first, 1):
+            current = [i]
+            for j, second_char in enumerate(second, 1):
+                current.append(min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (first_char != second_char)
+                ))
+            if min(current) > limit:
+                return limit + 1
+            previous = current
+        return min(previous[-1], limit + 1)
+
+    @classmethod
+    def nearest(cls, latitude: float, longitude: float) -> Optional[City]:
+        """
+        Gets the city nearest to the point
+
+        :param latitude: latitude of the point in degrees
+        :param longitude: longitude of the point in degrees
+        :return: city object or None if the gazetteer is empty
+        """
+        cls._open()
+        rows, columns = cls._grid()
+        row, column = cls._cell(latitude, longitude)
+        best, best_number = math.inf, None
+
+        for ring in range(max(rows, columns)):
+            for cell_row in range(row - ring, row + ring + 1):
+                if not 0 <= cell_row < rows:
+                    continue
+                for cell_column in range(column - ring, column + ring + 1):
+                    if ring and abs(cell_row - row) != ring and abs(cell_column - column) != ring:
+                        continue
+                    for number in cls._cell_records(cell_row * columns + cell_column % columns):
+                        _, city_latitude, city_longitude, _ = cls._record(number)
+                        distance = cls._haversine(latitude, longitude, city_latitude, city_longitude)
+                        if distance < best:
+                            best, best_number = distance, number
+
+            # nothing outside the visited rings can be closer than the ring width
+            edge = min(89.9, abs(latitude) + (ring + 1) * cls.cell_size)
+            ring_width = ring * cls.cell_size * math.pi / 180 * cls.EARTH_RADIUS * math.cos(math.radians(edge))
+            if best_number is not None and best <= ring_width:
+                break
+
+        return None if best_number is None else cls._city(best_number)
+
+    @classmethod
+    def _grid(cls) -> Tuple[int, int]:
+        """Gets the number of the grid rows and columns"""
+        return math.ceil(180 / cls.cell_size), math.ceil(360 / cls.cell_size)
+
+    @classmethod
+    def _cell(cls, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Gets the grid row and column of the point"""
+        rows, columns = cls._grid()
+        row = min(rows - 1, int((latitude + 90) // cls.cell_size))
+        column = int((longitude + 180) // cls.cell_size) % columns
+        return row, column
+
+    @classmethod
+    def _cell_records(cls, cell: int) -> List[int]:
+        """Gets the numbers of the records in the grid cell"""
+        offset = cls._cells_offset()
+        low, high = 0, cls.cells
+        while low < high:
+            middle = (low + high) // 2
+            if cls.CELL.unpack_from(cls.index, offset + middle * cls.CELL.size)[0] < cell:
+                low = middle + 1
+            else:
+                high = middle
+        numbers = []
+        while low < cls.cells:
+            cell_number, number = cls.CELL.unpack_from(cls.index, offset + low * cls.CELL.size)
+            if cell_number != cell:
+                break
+            numbers.append(number)
+            low += 1
+        return numbers
+
+    @classmethod
+    def _haversine(cls, latitude: float, longitude: float, other_latitude: float, other_longitude: float) -> float:
+        """Gets the distance between the points in kilometers"""
+        d_latitude = math.radians(other_latitude - latitude)
+        d_longitude = math.radians(other_longitude - longitude)
+        a = math.sin(d_latitude / 2) ** 2 + \
+            math.cos(math.radians(latitude)) * math.cos(math.radians(other_latitude)) * math.sin(d_longitude / 2) ** 2
+        return 2 * cls.EARTH_RADIUS * math.asin(min(1, math.sqrt(a)))
+
+    @classmethod
+    def build(cls, source: str, target: str = None) -> int:
+        """
+        Builds the index from a GeoNames dump (cities15000.txt, cities1000.txt etc)
+        Every city is stored under its name and its ASCII name if they differ
+
+        :param source: path to the tab separated GeoNames file
+        :param target: index file path, Config.GAZETTEER_FILE by default
+        :return: number of the stored cities
+        """
+        target = target or Config.GAZETTEER_FILE
+        cell_size = Config.GAZETTEER_CELL_SIZE
+        texts, entries, points = bytearray(), [], []
+
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) < 15:
+                    continue
+                name, ascii_name, country = columns[1], columns[2], columns[8]
+                latitude, longitude = float(columns[4]), float(columns[5])
+                population = int(columns[14] or 0)
+                first = True
+                for key in dict.fromkeys((CityCache.normalize(name), CityCache.normalize(ascii_name))):
+                    if not key:
+                        continue
+                    entries.append((key.encode("utf-8"), len(texts), latitude, longitude, population, first))
+                    texts += f"{key}\t{name}\t{country}\n".encode("utf-8")
+                    first = False
+
+        entries.sort(key=lambda entry: entry[0])
+        cls.cell_size = cell_size
+        _, columns = cls._grid()
+        for number, (_, _, latitude, longitude, _, first) in enumerate(entries):
+            if first:
+                row, column = cls._cell(latitude, longitude)
+                points.append((row * columns + column, number))
+        points.sort()
+
+        with open(target, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, len(entries), len(points), cell_size))
+            for _, offset, latitude, longitude, population, _ in entries:
+                f.write(cls.RECORD.pack(offset, latitude, longitude, population))
+            for cell, number in points:
+                f.write(cls.CELL.pack(cell, number))
+            f.write(texts)
+
+        cls.logger.info(f"Built {target} with {len(points)} cities")
+        return len(points)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m handlers.gazetteer <GeoNames cities file> [index file]")
+        sys.exit(1)
+    print(f"Stored {Gazetteer.build(*sys.argv[1:])} cities")
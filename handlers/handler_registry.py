@@ -0,0 +1,84 @@
+import importlib
+import logging
+from threading import Lock
+
+
+class HandlerRegistry:
+    """
+    Registry of the available handlers by their kind and API name
+    The handler modules are imported only when the handler is requested,
+    so the application starts without importing the providers it does not use
+    (and the HTTP stack they depend on)
+    The names have to match the API_NAME of the handler classes
+
+    Class attributes:
+        classes     imported handler classes by (kind, API name)
+        lock        guards the imports
+        logger
+
+    Constants:
+        HANDLERS    "module:class" paths by the API name by the kind (city, weather or sun),
+                    the first handler of a kind is the default one
+    """
+
+    HANDLERS = {
+        "city": {
+            "OpenWeather": "handlers.city_handlers.open_weather_city_handler:OpenWeatherCityHandler",
+            "AccuWeather": "handlers.city_handlers.accuweather_city_handler:AccuWeatherCityHandler",
+            "MetaWeather": "handlers.city_handlers.meta_weather_city_handler:MetaWeatherCityHandler",
+            "Auto (failover)": "handlers.city_handlers.failover_city_handler:FailoverCityHandler",
+            "Offline gazetteer": "handlers.city_handlers.gazetteer_city_handler:GazetteerCityHandler"
+        },
+        "weather": {
+            "OpenWeather": "handlers.weather_handlers.open_weather_handler:OpenWeatherHandler",
+            "AccuWeather": "handlers.weather_handlers.accuweather_handler:AccuWeatherHandler",
+            "MetaWeather": "handlers.weather_handlers.meta_weather_handler:MetaWeatherHandler",
+            "Auto (failover)": "handlers.weather_handlers.failover_weather_handler:FailoverWeatherHandler"
+        },
+        "sun": {
+            "Sunrise Sunset": "handlers.sun_handlers.sunrise_sunset_sun_handler:SunriseSunsetSunHandler",
+            "OpenWeather": "handlers.sun_handlers.open_weather_sun_handler:OpenWeatherSunHandler",
+            "Solar calculator": "handlers.sun_handlers.solar_sun_handler:SolarSunHandler",
+            "Auto (failover)": "handlers.sun_handlers.failover_sun_handler:FailoverSunHandler"
+        }
+    }
+
+    classes = {}
+    lock = Lock()
+    logger = logging.getLogger("registry")
+
+    @classmethod
+    def get_names(cls, kind: str) -> list:
+        """
+        Gets the API names of the handlers without importing them
+
+        :param kind: city, weather or sun
+        :return: API names, the default one first
+        """
+        return list(cls.HANDLERS[kind])
+
+    @classmethod
+    def get(cls, kind: str, api_name: str):
+        """
+        Gets the handler class, imports its module on the first request
+
+        :param kind: city, weather or sun
+        :param api_name: API name of the handler
+        :return: handler class
+
+        :raises:
+            KeyError    handler is not registered
+        """
+        key = kind, api_name
+        handler_class = cls.classes.get(key)
+        if handler_class:
+            return handler_class
+
+        with cls.lock:
+            handler_class = cls.classes.get(key)
+            if not handler_class:
+                module_name, class_name = cls.HANDLERS[kind][api_name].split(":")
+                handler_class = getattr(importlib.import_module(module_name), class_name)
+                cls.classes[key] = handler_class
+                cls.logger.debug(f"Imported {kind} handler {api_name}")
+        return handler_class
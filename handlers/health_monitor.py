@@ -0,0 +1,150 @@
+import logging
+import time
+from threading import Lock
+
+from config import Config
+
+
+class ProviderHealth:
+    """
+    Passively learned health of a provider
+
+    Attributes:
+        success_rate            exponentially decayed share of the successful calls
+        latency                 exponentially decayed call duration in seconds
+        consecutive_failures    number of the calls failed in a row
+        opened                  monotonic time the circuit breaker was opened (None if closed)
+        trial                   whether a trial call is running in the half-open state
+    """
+
+    def __init__(self):
+        self.success_rate = 1.0
+        self.latency = None
+        self.consecutive_failures = 0
+        self.opened = None
+        self.trial = False
+
+
+class HealthMonitor:
+    """
+    Learns the availability of the providers from the real API calls
+    Every call made through SessionRegistry is recorded,
+    after several failures in a row the circuit breaker of the provider is opened
+    and the calls fail right away until the cool down period passes,
+    then a single trial call is let through (half-open state)
+    to close the breaker again or keep it open
+
+    Class attributes:
+        providers   ProviderHealth objects by the API name
+        lock
+        logger
+
+    Configuration (Config):
+        HEALTH_DECAY                weight of the latest call in the decayed values
+        CIRCUIT_FAILURE_THRESHOLD   number of failures in a row opening the breaker
+        CIRCUIT_COOLDOWN            how long the breaker stays open in seconds
+    """
+
+    providers = {}
+    lock = Lock()
+    logger = logging.getLogger("health")
+
+    @classmethod
+    def _get(cls, api_name: str) -> ProviderHealth:
+        """Gets the provider health, should be called with the lock"""
+        health = cls.providers.get(api_name)
+        if not health:
+            health = cls.providers[api_name] = ProviderHealth()
+        return health
+
+    @classmethod
+    def record(cls, api_name: str, success: bool, latency: float) -> None:
+        """
+        Records the outcome of a call
+
+        :param api_name: short API name
+        :param success: whether the provider answered properly
+        :param latency: duration of the call in seconds
+        :return: None
+        """
+        with cls.lock:
+            health = cls._get(api_name)
+            health.trial = False
+            health.success_rate += Config.HEALTH_DECAY * (success - health.success_rate)
+            if health.latency is None:
+                health.latency = latency
+            else:
+                health.latency += Config.HEALTH_DECAY * (latency - health.latency)
+
+            if success:
+                if health.opened is not None:
+                    cls.logger.info(f"Circuit of {api_name} closed")
+                health.consecutive_failures = 0
+                health.opened = None
+            else:
+                health.consecutive_failures += 1
+                if health.opened is not None or \
+                        health.consecutive_failures >= Config.CIRCUIT_FAILURE_THRESHOLD:
+                    if health.opened is None:
+                        cls.logger.warning(f"Circuit of {api_name} opened")
+                    health.opened = time.monotonic()
+
+    @classmethod
+    def end_trial(cls, api_name: str) -> None:
+        """
+        Ends the trial call of the half-open state
+        Called however the call ended, so a call that failed before its outcome
+        was recorded does not block the next trials
+
+        :param api_name: short API name
+        :return: None
+        """
+        with cls.lock:
+            cls._get(api_name).trial = False
+
+    @classmethod
+    def allow_request(cls, api_name: str) -> bool:
+        """
+        Checks whether a call to the provider can be made
+        Lets a single trial call through when the cool down period passes
+
+        :param api_name: short API name
+        :return: whether the call can be made
+        """
+        with cls.lock:
+            health = cls._get(api_name)
+            if health.opened is None:
+                return True
+            if health.trial or time.monotonic() - health.opened < Config.CIRCUIT_COOLDOWN:
+                return False
+            health.trial = True
+            return True
+
+    @classmethod
+    def is_available(cls, api_name: str) -> bool:
+        """
+        Checks whether the provider is considered available, makes no calls
+
+        :param api_name: short API name
+        :return: False if the circuit breaker is open and cooling down
+        """
+        with cls.lock:
+            health = cls._get(api_name)
+            return health.opened is None or time.monotonic() - health.opened >= Config.CIRCUIT_COOLDOWN
+
+    @classmethod
+    def get_state(cls, api_name: str) -> dict:
+        """
+        Gets the learned health of the provider
+
+        :param api_name: short API name
+        :return: dictionary with the success rate, latency, failures and breaker state
+        """
+        with cls.lock:
+            health = cls._get(api_name)
+            return {
+                "success_rate": health.success_rate,
+                "latency": health.latency,
+                "consecutive_failures": health.consecutive_failures,
+                "circuit_open": health.opened is not None
+            }
@@ -0,0 +1,495 @@
+import datetime
+import logging
+import math
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import time
+from array import array
+from collections import Counter
+from threading import Lock
+from typing import Dict, List
+
+from handlers.forecast_series import ForecastSeries
+from handlers.weather import Weather
+
+from config import Config
+
+
+class HistoryChunk:
+    """
+    Append-only columnar file of the rows of a single period
+    Every column is a contiguous region of the file preallocated for the capacity rows,
+    the status is a column of Weather.STATUS_CODES indexes, the others are doubles
+    The count in the header is written after the values, so a partial append is never read
+    A full chunk is copied to a file with the doubled capacity
+    Layout:
+        header      magic, version, byte order (0 little, 1 big), number of columns, capacity, count
+        names       comma separated column names, padded to 8 bytes
+        status      capacity bytes, padded to 8 bytes
+        columns     capacity doubles of every column
+
+    Attributes:
+        path
+        columns     names of the double columns
+        capacity    number of the rows the file has room for
+        count       number of the stored rows
+        offsets     file offsets of the columns by the name, the status included
+
+    Constants:
+        MAGIC, VERSION
+        HEADER      binary header format
+        COUNT       format of the count field at COUNT_OFFSET
+    """
+
+    MAGIC = b"WHST"
+    VERSION = 1
+
+    HEADER = struct.Struct("<4sBBHII")
+    COUNT = struct.Struct("<I")
+    COUNT_OFFSET = HEADER.size - COUNT.size
+
+    def __init__(self, path: str, columns: tuple = None, capacity: int = None):
+        """
+        Opens the chunk, creates it with the columns if it does not exist
+
+        :param path: chunk file path
+        :param columns: names of the double columns of a new chunk
+        :param capacity: initial capacity of a new chunk, Config.HISTORY_CHUNK_ROWS by default
+        :raises:
+            FileNotFoundError   the chunk does not exist and no columns are provided
+            ValueError          the file is not a chunk
+        """
+        self.path = path
+        if not os.path.exists(path):
+            if columns is None:
+                raise FileNotFoundError(path)
+            self._create(path, columns, capacity or Config.HISTORY_CHUNK_ROWS)
+        self._load()
+
+    def _load(self) -> None:
+        """Reads the header and works out the column offsets"""
+        with open(self.path, "rb") as f:
+            header = f.read(self.HEADER.size)
+            magic, version, byte_order, column_count, self.capacity, self.count = self.HEADER.unpack(header)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError(f"{self.path} is not a history chunk")
+            names_length, = struct.unpack("<H", f.read(2))
+            self.columns = tuple(f.read(names_length).decode("ascii").split(","))
+        self.swapped = byte_order != (sys.byteorder == "big")
+
+        offset = self._align(self.HEADER.size + 2 + names_length)
+        self.offsets = {"status": offset}
+        offset += self._align(self.capacity)
+        for column in self.columns:
+            self.offsets[column] = offset
+            offset += self.capacity * 8
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        """Rounds the offset up to 8 bytes"""
+        return (offset + 7) // 8 * 8
+
+    @classmethod
+    def _create(cls, path: str, columns: tuple, capacity: int) -> None:
+        """Writes an empty chunk"""
+        names = ",".join(columns).encode("ascii")
+        data = bytearray(cls.HEADER.pack(cls.MAGIC, cls.VERSION, sys.byteorder == "big", len(columns), capacity, 0))
+        data += struct.pack("<H", len(names)) + names
+        data += bytes(cls._align(len(data)) - len(data))
+        data += bytes(cls._align(capacity) + capacity * 8 * len(columns))
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+    def append(self, rows: List[dict]) -> None:
+        """
+        Appends the rows, grows the chunk if they do not fit
+
+        :param rows: dictionaries with the status code and the column values, missing values are NaN
+        :return: None
+        """
+        if self.count + len(rows) > self.capacity:
+            self._grow(self.count + len(rows))
+
+        with open(self.path, "r+b") as f:
+            f.seek(self.offsets["status"] + self.count)
+            f.write(bytes(row["status"] for row in rows))
+            for column in self.columns:
+                values = array("d", (row.get(column, math.nan) for row in rows))
+                if self.swapped:
+                    values.byteswap()
+                f.seek(self.offsets[column] + self.count * 8)
+                f.write(values.tobytes())
+            f.flush()
+            f.seek(self.COUNT_OFFSET)
+            f.write(self.COUNT.pack(self.count + len(rows)))
+        self.count += len(rows)
+
+    def _grow(self, count: int) -> None:
+        """Copies the chunk to a file with the capacity doubled until the rows fit"""
+        capacity = self.capacity
+        while capacity < count:
+            capacity *= 2
+        data = self.read()
+        grown = f"{self.path}.grow"
+        if os.path.exists(grown):
+            os.remove(grown)
+        chunk = HistoryChunk(grown, self.columns, capacity)
+        chunk.append([
+            {"status": data["status"][index], **{column: data[column][index] for column in self.columns}}
+            for index in range(self.count)
+        ])
+        os.replace(grown, self.path)
+        self._load()
+
+    def read_last(self, column: str) -> float:
+        """
+        Reads the value of the last row without reading the whole column
+
+        :param column: name of the double column
+        :return: value, NaN if the chunk is empty
+        """
+        if not self.count:
+            return math.nan
+        values = array("d")
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[column] + (self.count - 1) * 8)
+            values.frombytes(f.read(8))
+        if self.swapped:
+            values.byteswap()
+        return values[0]
+
+    def read(self) -> Dict[str, array]:
+        """
+        Reads all the rows through a memory map
+
+        :return: arrays by the column name, "status" is an array of the status codes
+        """
+        result = {"status": array("B")}
+        for column in self.columns:
+            result[column] = array("d")
+        if not self.count:
+            return result
+
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                count, = self.COUNT.unpack_from(mapped, self.COUNT_OFFSET)
+                start = self.offsets["status"]
+                result["status"].frombytes(mapped[start:start + count])
+                for column in self.columns:
+                    start = self.offsets[column]
+                    result[column].frombytes(mapped[start:start + count * 8])
+                    if self.swapped:
+                        result[column].byteswap()
+        return result
+
+
+class HistoryStore:
+    """
+    Local store of the observed weather and the forecasts by the provider and the location
+    Rows are appended to the day chunks (see HistoryChunk) of the row time in UTC:
+        <HISTORY_DIR>/<provider>/<location>/observed/<YYYYMMDD>.chunk
+        <HISTORY_DIR>/<provider>/<location>/forecast/<YYYYMMDD>.chunk
+    The forecast rows are stored by the forecast time with the time the forecast was issued
+    Closed days of the observations are downsampled to the hourly rollups (a chunk per month)
+    and the daily rollups (a chunk per year), the rollup rows hold the mean values
+    and the minimum and maximum temperature of the period, the status is the most frequent one
+    Expired chunks are removed by the retention periods once a day,
+    the compaction is run in the background (see compact_daily), never by the appends
+
+    Class attributes:
+        compacted   UTC date the store was last compacted
+        lock        guards the appends and the compaction
+        logger
+
+    Constants:
+        COLUMNS         double columns of the raw rows
+        ROLLUP_COLUMNS  double columns of the rollup rows
+        RESOLUTIONS     chunk kinds by the query resolution
+
+    Configuration (Config):
+        HISTORY_DIR             directory of the store
+        HISTORY_CHUNK_ROWS      initial capacity of the chunks
+        HISTORY_RAW_DAYS        how long the raw rows are kept in days
+        HISTORY_HOURLY_DAYS     how long the hourly rollups are kept in days
+        HISTORY_DAILY_DAYS      how long the daily rollups are kept in days
+    """
+
+    COLUMNS = ForecastSeries.COLUMNS + ("issued",)
+    ROLLUP_COLUMNS = ForecastSeries.COLUMNS + ("temperature_min", "temperature_max", "count")
+    RESOLUTIONS = {"raw": None, "hour": "hourly", "day": "daily"}
+
+    compacted = None
+    lock = Lock()
+    logger = logging.getLogger("history")
+
+    @classmethod
+    def append_observation(cls, api_name: str, location_key: str, weather: Weather) -> None:
+        """
+        Stores the observed weather, skips the observation stored already
+
+        :param api_name: short API name
+        :param location_key: location key of the handler (see BaseWeatherHandler.get_location_key)
+        :param weather: Weather object
+        :return: None
+        """
+        if weather.time is None:
+            return
+        row = cls._to_row(weather, weather.time)
+        path = cls._get_chunk_path(api_name, location_key, "observed", weather.time)
+        with cls.lock:
+            try:
+                chunk = HistoryChunk(path, cls.COLUMNS)
+                if chunk.read_last("time") == weather.time:
+                    return
+                chunk.append([row])
+            except (OSError, ValueError) as e:
+                cls.logger.warning(f"Observation of {api_name} is not stored: {e}")
+
+    @classmethod
+    def append_forecast(cls, api_name: str, location_key: str, forecast: ForecastSeries,
+                        issued: float = None) -> None:
+        """
+        Stores the forecast rows in the chunks of their days
+
+        :param api_name: short API name
+        :param location_key: location key of the handler
+        :param forecast: ForecastSeries object
+        :param issued: epoch time the forecast was received, now by default
+        :return: None
+        """
+        issued = time.time() if issued is None else issued
+        rows = {}
+        for weather in forecast:
+            if weather.time is not None:
+                path = cls._get_chunk_path(api_name, location_key, "forecast", weather.time)
+                rows.setdefault(path, []).append(cls._to_row(weather, issued))
+        with cls.lock:
+            try:
+                for path, chunk_rows in rows.items():
+                    HistoryChunk(path, cls.COLUMNS).append(chunk_rows)
+            except (OSError, ValueError) as e:
+                cls.logger.warning(f"Forecast of {api_name} is not stored: {e}")
+
+    @classmethod
+    def query(cls, api_name: str, location_key: str, kind: str = "observed",
+              start: float = None, end: float = None, resolution: str = "raw") -> Dict[str, array]:
+        """
+        Gets the rows of the time range as arrays
+        Only the chunks of the days in the range are read
+
+        :param api_name: short API name
+        :param location_key: location key of the handler
+        :param kind: observed or forecast
+        :param start: first epoch time of the range (inclusive), unbounded by default
+        :param end: last epoch time of the range (exclusive), unbounded by default
+        :param resolution: raw, hour or day, the rollups exist for the observations only
+        :return: arrays by the column name, "status" holds the Weather.STATUS_CODES indexes,
+                 rows are in the time order for the observations and the rollups,
+                 in the time order by the issue time for the forecasts
+        """
+        rollup = cls.RESOLUTIONS[resolution]
+        directory = os.path.join(cls._get_location_dir(api_name, location_key), rollup or kind)
+        columns = cls.ROLLUP_COLUMNS if rollup else cls.COLUMNS
+        result = {"status": array("B"), **{column: array("d") for column in columns}}
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith(".chunk"))
+        except FileNotFoundError:
+            return result
+
+        for name in names:
+            first, last = cls._get_period(name[:-len(".chunk")])
+            if (end is not None and first >= end) or (start is not None and last <= start):
+                continue
+            try:
+                data = HistoryChunk(os.path.join(directory, name)).read()
+            except (OSError, ValueError) as e:
+                cls.logger.warning(f"Chunk {name} is not readable: {e}")
+                continue
+            if (start is None or first >= start) and (end is None or last <= end):
+                for column, values in data.items():
+                    result[column].extend(values)
+                continue
+            for index, row_time in enumerate(data["time"]):
+                if (start is None or row_time >= start) and (end is None or row_time < end):
+                    for column, values in data.items():
+                        result[column].append(values[index])
+        return result
+
+    @classmethod
+    def get_locations(cls, api_name: str) -> List[str]:
+        """
+        Gets the stored locations of the provider
+
+        :param api_name: short API name
+        :return: location keys accepted by query
+        """
+        try:
+            return sorted(os.listdir(os.path.join(Config.HISTORY_DIR, cls._get_name(api_name))))
+        except FileNotFoundError:
+            return []
+
+    @classmethod
+    def compact(cls, now: float = None) -> None:
+        """
+        Rolls up the closed days of the observations and removes the expired chunks
+
+        :param now: current epoch time
+        :return: None
+        """
+        now = time.time() if now is None else now
+        today = cls._get_day(now)
+        with cls.lock:
+            for location_dir in cls._get_location_dirs():
+                try:
+                    cls._roll_up(location_dir, today)
+                    cls._expire(location_dir, now)
+                except (OSError, ValueError) as e:
+                    cls.logger.warning(f"Compaction of {location_dir} failed: {e}")
+        cls.logger.debug("Compacted the history")
+
+    @classmethod
+    def compact_daily(cls) -> None:
+        """
+        Compacts the store unless it was compacted today
+        Reads and writes every stored location, should be run on a background thread
+
+        :return: None
+        """
+        today = cls._get_day(time.time())
+        if cls.compacted != today:
+            cls.compacted = today
+            cls.compact()
+
+    @classmethod
+    def _roll_up(cls, location_dir: str, today: str) -> None:
+        """Adds the closed days that are not rolled up yet to the hourly and daily rollups"""
+        observed_dir = os.path.join(location_dir, "observed")
+        if not os.path.isdir(observed_dir):
+            return
+        for name in sorted(os.listdir(observed_dir)):
+            day = name[:-len(".chunk")]
+            if not name.endswith(".chunk") or day >= today:
+                continue
+            first, last = cls._get_period(day)
+            data = HistoryChunk(os.path.join(observed_dir, name)).read()
+            for rollup, period, file_name in (("hourly", 60 * 60, day[:6]), ("daily", 24 * 60 * 60, day[:4])):
+                chunk = HistoryChunk(os.path.join(location_dir, rollup, f"{file_name}.chunk"), cls.ROLLUP_COLUMNS)
+                if chunk.read_last("time") >= first:
+                    continue
+                chunk.append(cls._downsample(data, first, period))
+
+    @classmethod
+    def _downsample(cls, data: Dict[str, array], first: float, period: int) -> List[dict]:
+        """Aggregates the rows of a day into the rows of the periods"""
+        buckets = {}
+        for index, row_time in enumerate(data["time"]):
+            buckets.setdefault(int((row_time - first) // period), []).append(index)
+
+        rows = []
+        for bucket, indexes in sorted(buckets.items()):
+            row = {
+                "status": Counter(data["status"][index] for index in indexes).most_common(1)[0][0],
+                "time": first + bucket * period,
+                "count": len(indexes)
+            }
+            for column in ForecastSeries.COLUMNS[1:]:
+                values = [data[column][index] for index in indexes if not math.isnan(data[column][index])]
+                row[column] = sum(values) / len(values) if values else math.nan
+            temperatures = [data["temperature"][index] for index in indexes
+                            if not math.isnan(data["temperature"][index])]
+            row["temperature_min"] = min(temperatures) if temperatures else math.nan
+            row["temperature_max"] = max(temperatures) if temperatures else math.nan
+            rows.append(row)
+        return rows
+
+    @classmethod
+    def _expire(cls, location_dir: str, now: float) -> None:
+        """Removes the chunks past the retention periods"""
+        retention = {
+            "observed": Config.HISTORY_RAW_DAYS,
+            "forecast": Config.HISTORY_RAW_DAYS,
+            "hourly": Config.HISTORY_HOURLY_DAYS,
+            "daily": Config.HISTORY_DAILY_DAYS
+        }
+        for kind, days in retention.items():
+            directory = os.path.join(location_dir, kind)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith(".chunk"):
+                    continue
+                _, last = cls._get_period(name[:-len(".chunk")])
+                if last < now - days * 24 * 60 * 60:
+                    os.remove(os.path.join(directory, name))
+                    cls.logger.debug(f"Removed expired {kind} chunk {name}")
+            if not os.listdir(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+
+    @classmethod
+    def _to_row(cls, weather: Weather, issued: float) -> dict:
+        """Converts the weather to a row"""
+        row = {"status": Weather.STATUS_CODES.index(weather.status), "issued": issued}
+        for column in ForecastSeries.COLUMNS:
+            value = getattr(weather, column)
+            row[column] = math.nan if value is None else value
+        return row
+
+    @staticmethod
+    def _get_name(text: str) -> str:
+        """Makes a file name of the provider or the location"""
+        return re.sub(r"[^\w.-]+", "_", str(text)).strip("_") or "_"
+
+    @classmethod
+    def _get_location_dir(cls, api_name: str, location_key: str) -> str:
+        return os.path.join(Config.HISTORY_DIR, cls._get_name(api_name), cls._get_name(location_key))
+
+    @classmethod
+    def _get_location_dirs(cls) -> List[str]:
+        """Gets the directories of all the stored locations"""
+        try:
+            providers = os.listdir(Config.HISTORY_DIR)
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(Config.HISTORY_DIR, provider, location)
+            for provider in providers if os.path.isdir(os.path.join(Config.HISTORY_DIR, provider))
+            for location in os.listdir(os.path.join(Config.HISTORY_DIR, provider))
+        ]
+
+    @classmethod
+    def _get_chunk_path(cls, api_name: str, location_key: str, kind: str, row_time: float) -> str:
+        return os.path.join(cls._get_location_dir(api_name, location_key), kind, f"{cls._get_day(row_time)}.chunk")
+
+    @staticmethod
+    def _get_day(epoch: float) -> str:
+        """Gets the UTC date as YYYYMMDD"""
+        return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).strftime("%Y%m%d")
+
+    @staticmethod
+    def _get_period(name: str) -> tuple:
+        """
+        Gets the epoch time range of the chunk from its name
+
+        :param name: YYYYMMDD (a day), YYYYMM (a month) or YYYY (a year)
+        :return: (first, last) epoch times, the last one is exclusive
+        """
+        year = int(name[:4])
+        if len(name) == 4:
+            first = datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc)
+            last = datetime.datetime(year + 1, 1, 1, tzinfo=datetime.timezone.utc)
+        elif len(name) == 6:
+            month = int(name[4:6])
+            first = datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc)
+            last = datetime.datetime(year + month // 12, month % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+        else:
+            first = datetime.datetime(year, int(name[4:6]), int(name[6:8]), tzinfo=datetime.timezone.utc)
+            last = first + datetime.timedelta(days=1)
+        return first.timestamp(), last.timestamp()
@@ -0,0 +1,168 @@
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+from threading import Lock
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from handlers.http_timing import TimedHTTPAdapter
+
+from config import Config
+
+
+class Fixtures:
+    """
+    Stores the recorded HTTP exchanges as JSON files
+    One file per request in the directory of the host,
+    the file name is derived from the method and the URL without the API keys,
+    so the fixtures can be shared without leaking the keys
+
+    Class attributes:
+        lock
+        logger
+
+    Constants:
+        SECRET_PARAMS   query parameters removed from the stored URLs
+
+    Configuration (Config):
+        FIXTURES_DIR    directory of the fixtures
+    """
+
+    SECRET_PARAMS = ("apikey", "appid", "key")
+
+    lock = Lock()
+    logger = logging.getLogger("fixture")
+
+    @classmethod
+    def redact(cls, url: str) -> str:
+        """
+        Removes the API keys from the URL and sorts its query
+
+        :param url: requested URL
+        :return: URL identifying the fixture
+        """
+        parts = urlsplit(url)
+        query = sorted(
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name.lower() not in cls.SECRET_PARAMS
+        )
+        return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+    @classmethod
+    def get_path(cls, method: str, url: str) -> str:
+        """
+        Gets the file path of the fixture
+
+        :param method: HTTP method
+        :param url: requested URL
+        :return: path of the JSON file
+        """
+        parts = urlsplit(cls.redact(url))
+        # the scheme is not a part of the key, the stub server is called over plain HTTP
+        key = f"{method.upper()} {parts.netloc}{parts.path}?{parts.query}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(Config.FIXTURES_DIR, parts.netloc, f"{digest}.json")
+
+    @classmethod
+    def save(cls, method: str, url: str, status: int, headers: dict, body: bytes) -> None:
+        """
+        Stores the exchange
+
+        :param method: HTTP method
+        :param url: requested URL
+        :param status: response status code
+        :param headers: response headers
+        :param body: raw response body
+        :return: None
+        """
+        path = cls.get_path(method, url)
+        fixture = {
+            "method": method.upper(),
+            "url": cls.redact(url),
+            "status": status,
+            "headers": {
+                name: value for name, value in headers.items()
+                if name.lower() not in ("content-encoding", "transfer-encoding", "content-length")
+            },
+            "body": base64.b64encode(body).decode("ascii")
+        }
+        with cls.lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(fixture, f, indent=2)
+        cls.logger.debug(f"Recorded {fixture['url']} to {path}")
+
+    @classmethod
+    def load(cls, method: str, url: str) -> Optional[dict]:
+        """
+        Gets the stored exchange
+
+        :param method: HTTP method
+        :param url: requested URL
+        :return: fixture dictionary with the decoded body or None if it is not recorded
+        """
+        try:
+            with open(cls.get_path(method, url), "r") as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            return None
+        fixture["body"] = base64.b64decode(fixture["body"])
+        return fixture
+
+
+class RecordingAdapter(TimedHTTPAdapter):
+    """
+    Transport adapter making the real calls and recording them to the Fixtures
+    The body is read whole before it is returned, streamed responses are recorded too
+    """
+
+    def send(self, request, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+        Fixtures.save(request.method, request.url, response.status_code, dict(response.headers), response.content)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter answering from the Fixtures without any network calls
+    Requests that were not recorded fail as if the API is not reachable
+    """
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None) -> requests.Response:
+        fixture = Fixtures.load(request.method, request.url)
+        if not fixture:
+            raise requests.ConnectionError(f"No fixture for {Fixtures.redact(request.url)}", request=request)
+
+        response = requests.Response()
+        response.status_code = fixture["status"]
+        response.headers = CaseInsensitiveDict(fixture["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(fixture["body"])
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+class StubAdapter(TimedHTTPAdapter):
+    """
+    Transport adapter sending all the calls to the local stub server (see StubServer)
+    The original host is kept as the first segment of the path
+    """
+
+    def send(self, request, **kwargs) -> requests.Response:
+        host, port = Config.STUB_SERVER_ADDRESS
+        parts = urlsplit(request.url)
+        request.url = urlunsplit(("http", f"{host}:{port}", f"/{parts.netloc}{parts.path}", parts.query, ""))
+        return super().send(request, **kwargs)
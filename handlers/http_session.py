@@ -0,0 +1,191 @@
+import logging
+import time
+from threading import Lock
+from typing import Optional
+
+import requests
+
+from handlers.health_monitor import HealthMonitor
+from handlers.http_fixtures import Fixtures, RecordingAdapter, ReplayAdapter, StubAdapter
+from handlers.http_timing import TimedHTTPAdapter
+from handlers.metrics import MetricsRegistry
+from handlers.tracing import Span, Tracer
+
+from config import Config
+
+
+class SessionRegistry:
+    """
+    Process-wide registry of pooled HTTP sessions
+    Every handler makes its calls through the registry instead of
+    the module-level requests functions, so the connections to the API hosts
+    are kept alive and reused between the calls
+    Outcomes of the calls are reported to the HealthMonitor,
+    calls to the providers with the open circuit breaker fail right away
+    One session is created per API name, the session keeps
+    a separate keep-alive pool for every host it visits
+    Every call is traced as an "http" span with the phase timings (see TimedConnectionMixin),
+    the status code and the body size, the timings are added to the MetricsRegistry
+    Depending on the mode the sessions call the APIs ("live"),
+    call them and record the exchanges ("record"), answer from the records ("replay")
+    or call the local stub server ("stub"), see Fixtures and StubServer
+
+    Class attributes:
+        sessions    sessions created so far by the API name
+        lock        guards the session creation
+        logger
+
+    Constants:
+        PHASES                  connection phases timed by the adapters
+        FAILURE_STATUSES        client error statuses recorded as failures of the provider
+                                (authorization failures and rate limits)
+
+    Configuration (Config):
+        HTTP_POOL_CONNECTIONS   number of host pools kept per session
+        HTTP_POOL_SIZE          maximum number of connections kept per host
+        HTTP_DEFAULT_TIMEOUT    (connect, read) timeout in seconds
+        HTTP_TIMEOUTS           (connect, read) timeouts by the API name
+        HTTP_MODE               live, record, replay or stub
+        METRICS_SIZE_BUCKETS    bucket bounds of the body size histograms in bytes
+    """
+
+    PHASES = "dns", "connect", "tls", "first_byte"
+    FAILURE_STATUSES = frozenset((401, 403, 429))
+
+    ADAPTERS = {
+        "live": TimedHTTPAdapter,
+        "record": RecordingAdapter,
+        "replay": ReplayAdapter,
+        "stub": StubAdapter
+    }
+
+    sessions = {}
+    lock = Lock()
+    logger = logging.getLogger("http")
+
+    @classmethod
+    def get_session(cls, api_name: str) -> requests.Session:
+        """
+        Gets the pooled session of the API
+        Creates one if the API was not called before
+
+        :param api_name: short API name
+        :return: session with the mounted pooling adapters
+        """
+        session = cls.sessions.get(api_name)
+        if session:
+            return session
+
+        with cls.lock:
+            session = cls.sessions.get(api_name)
+            if not session:
+                session = requests.Session()
+                adapter_class = cls.ADAPTERS[Config.HTTP_MODE]
+                if adapter_class is ReplayAdapter:
+                    adapter = adapter_class()
+                else:
+                    adapter = adapter_class(
+                        pool_connections=Config.HTTP_POOL_CONNECTIONS,
+                        pool_maxsize=Config.HTTP_POOL_SIZE
+                    )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls.sessions[api_name] = session
+                cls.logger.debug(f"Created {Config.HTTP_MODE} session for {api_name}")
+        return session
+
+    @classmethod
+    def get_timeout(cls, api_name: str) -> tuple:
+        """
+        Gets connect and read timeouts of the API
+
+        :param api_name: short API name
+        :return: (connect, read) timeout tuple in seconds
+        """
+        return Config.HTTP_TIMEOUTS.get(api_name, Config.HTTP_DEFAULT_TIMEOUT)
+
+    @classmethod
+    def get(cls, api_name: str, url: str, **kwargs) -> requests.Response:
+        """
+        Makes a GET request using the pooled session of the API
+        Uses the API timeouts unless the timeout is provided
+        Server errors, rate limits, authorization failures, connection errors and timeouts
+        are recorded as failures, the half-open trial is ended however the call ends
+
+        :param api_name: short API name
+        :param url: URL to visit
+        :param kwargs: additional arguments passed to the session
+        :return: response object
+
+        :raises:
+            requests.ConnectionError    API is not reachable or its circuit breaker is open
+            requests.Timeout            API did not respond in time
+        """
+        if not HealthMonitor.allow_request(api_name):
+            raise requests.ConnectionError(f"Circuit breaker of {api_name} is open")
+
+        kwargs.setdefault("timeout", cls.get_timeout(api_name))
+        span = None
+        try:
+            with Tracer.span("http", api=api_name, url=Fixtures.redact(url), transport=Config.HTTP_MODE) as span:
+                started = time.monotonic()
+                try:
+                    try:
+                        response = cls.get_session(api_name).get(url, **kwargs)
+                    except requests.RequestException:
+                        HealthMonitor.record(api_name, False, time.monotonic() - started)
+                        raise
+                    HealthMonitor.record(api_name, cls.is_healthy(response), time.monotonic() - started)
+                finally:
+                    HealthMonitor.end_trial(api_name)
+                span.set(status=response.status_code, size=cls._get_size(response, kwargs.get("stream")))
+        finally:
+            cls._observe(api_name, span)
+        return response
+
+    @classmethod
+    def is_healthy(cls, response: requests.Response) -> bool:
+        """
+        Checks whether the response shows the provider is answering properly
+
+        :param response: response object
+        :return: False for the server errors, rate limits and authorization failures
+        """
+        return response.status_code < 500 and response.status_code not in cls.FAILURE_STATUSES
+
+    @staticmethod
+    def _get_size(response: requests.Response, stream: bool) -> Optional[int]:
+        """Gets the body size, streamed bodies are not read yet and only their declared size is known"""
+        if not stream:
+            return len(response.content)
+        length = response.headers.get("Content-Length", "")
+        return int(length) if length.isdigit() else None
+
+    @classmethod
+    def _observe(cls, api_name: str, span: Optional[Span]) -> None:
+        """Adds the phase timings and the size of the finished call to the histograms"""
+        if not span or span.duration is None:
+            return
+        for phase in cls.PHASES:
+            if f"{phase}_ms" in span.attributes:
+                MetricsRegistry.observe(
+                    "weather_http_phase_seconds", span.attributes[f"{phase}_ms"] / 1000, api=api_name, phase=phase
+                )
+        MetricsRegistry.observe("weather_http_phase_seconds", span.duration, api=api_name, phase="total")
+        if span.attributes.get("size") is not None:
+            MetricsRegistry.observe(
+                "weather_http_response_bytes", span.attributes["size"], Config.METRICS_SIZE_BUCKETS,
+                api=api_name, status=span.attributes.get("status")
+            )
+
+    @classmethod
+    def close(cls) -> None:
+        """
+        Closes all the sessions and their pooled connections
+
+        :return: None
+        """
+        with cls.lock:
+            for session in cls.sessions.values():
+                session.close()
+            cls.sessions.clear()
@@ -0,0 +1,115 @@
+import socket
+import time
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+from handlers.tracing import Tracer
+
+
+class TimedConnectionMixin:
+    """
+    Adds the phase timings of the connection to the current span (see Tracer)
+    The host is resolved separately from the connect call to time the DNS lookup,
+    the connection is then made to the first address, all the addresses
+    are tried by urllib3 if that one is not reachable
+    The timings are set in milliseconds:
+        dns_ms          DNS lookup
+        connect_ms      TCP connect
+        tls_ms          TLS handshake
+        first_byte_ms   waiting for the response headers after the request is sent
+    Connections reused from the pool only set the first_byte_ms
+    Splitting the DNS lookup from the TCP connect relies on the private hooks of urllib3
+    (_new_conn and _dns_host), if a urllib3 version does not have them
+    the whole connect call is set as the connect_ms without the dns_ms and the tls_ms
+
+    Attributes:
+        connect_time    DNS lookup and TCP connect time of the last connect call in seconds,
+                        None if the private hook was not called
+
+    Constants:
+        TLS             whether the connect call includes the TLS handshake
+    """
+
+    TLS = False
+
+    def connect(self) -> None:
+        started = time.perf_counter()
+        self.connect_time = None
+        super().connect()
+        elapsed = time.perf_counter() - started
+        if self.connect_time is None:
+            Tracer.annotate(reused=False, connect_ms=elapsed * 1000)
+        elif self.TLS:
+            Tracer.annotate(tls_ms=max(0.0, elapsed - self.connect_time) * 1000)
+
+    def _new_conn(self) -> socket.socket:
+        host = getattr(self, "_dns_host", None)
+        started = time.perf_counter()
+        if host is None:
+            sock = super()._new_conn()
+            self.connect_time = time.perf_counter() - started
+            Tracer.annotate(reused=False, connect_ms=self.connect_time * 1000)
+            return sock
+
+        try:
+            address = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            # reported by urllib3 as the resolution error
+            address = None
+        resolved = time.perf_counter()
+
+        try:
+            if address:
+                self._dns_host = address
+            sock = super()._new_conn()
+        except NewConnectionError:
+            if not address:
+                raise
+            self._dns_host = host
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+
+        self.connect_time = time.perf_counter() - started
+        Tracer.annotate(reused=False, dns_ms=(resolved - started) * 1000,
+                        connect_ms=(self.connect_time - (resolved - started)) * 1000)
+        return sock
+
+    def getresponse(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().getresponse(*args, **kwargs)
+        Tracer.annotate(first_byte_ms=(time.perf_counter() - started) * 1000)
+        return response
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    TLS = True
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    Pooling transport adapter making the connections with the phase timings
+    """
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool
+        }
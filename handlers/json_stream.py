@@ -0,0 +1,140 @@
+import codecs
+import json
+from typing import Iterable, Iterator
+
+
+class JSONStreamParser:
+    """
+    Incremental JSON parser reading a document chunk by chunk
+    Walks the top-level containers key by key and element by element,
+    so only the values that are actually read are kept in memory
+    and the reading can be stopped as soon as enough data is parsed
+
+    Every key yielded by iter_object must be followed by a call
+    of read_value or iter_array consuming its value
+
+    Attributes:
+        chunks      iterator over the raw UTF-8 chunks
+        decoder     incremental UTF-8 decoder
+        buffer      decoded text not consumed yet
+        position    position of the next character in the buffer
+        exhausted   whether all the chunks are read
+    """
+
+    WHITESPACE = " \t\r\n"
+    DELIMITERS = ",:]}" + WHITESPACE
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.exhausted = False
+
+    def _fill(self) -> bool:
+        """Appends the next chunk to the buffer dropping the consumed text"""
+        if self.exhausted:
+            return False
+        try:
+            text = self.decoder.decode(next(self.chunks))
+        except StopIteration:
+            text = self.decoder.decode(b"", final=True)
+            self.exhausted = True
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skips the whitespaces and returns the next character, empty string at the end"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in self.WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def _expect(self, characters: str) -> str:
+        """Consumes one of the expected characters"""
+        character = self._peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r}, got {character!r}")
+        self.position += 1
+        return character
+
+    def read_value(self):
+        """
+        Reads the whole value at the current position
+
+        :return: parsed value
+        :raises:
+            ValueError  the document is not a valid JSON
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buffer, self.position)
+                # a number can be cut by the end of the chunk,
+                # it is complete only when followed by a delimiter
+                if end < len(self.buffer) and self.buffer[end] in self.DELIMITERS or self.exhausted:
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.exhausted:
+                    raise
+            self._fill()
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Iterates over the keys of the object at the current position
+
+        :return: iterator over the keys
+        :raises:
+            ValueError  the document is not a valid JSON
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def iter_array(self) -> Iterator:
+        """
+        Iterates over the elements of the array at the current position
+        Every element is parsed as a whole
+
+        :return: iterator over the parsed elements
+        :raises:
+            ValueError  the document is not a valid JSON
+        """
+        self._expect("[")
+        if self._peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            if self._expect(",]") == "]":
+                return
+
+    def read_array(self, limit: int = None) -> list:
+        """
+        Reads the array at the current position keeping its first elements
+        The elements past the limit are read and dropped,
+        so the parser is positioned after the array
+
+        :param limit: maximum number of kept elements, all of them are kept if None
+        :return: list of the kept parsed elements
+        :raises:
+            ValueError  the document is not a valid JSON
+        """
+        elements = []
+        for element in self.iter_array():
+            if limit is None or len(elements) < limit:
+                elements.append(element)
+        return elements
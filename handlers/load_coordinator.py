@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from concurrent.futures import CancelledError, Future
+from threading import Lock
+from typing import Callable, Coroutine
+
+from handlers.async_loop import AsyncLoop
+from handlers.errors import WeatherAppException
+
+
+class LoadCoordinator:
+    """
+    Runs the loads of a screen on the AsyncLoop, applies only the newest one
+    Every load is tagged with a generation number,
+    a new load cancels the previous one and the superseded results are dropped
+    even if they arrive later, so the screen is updated once per the latest request
+    The number of loads running at the same time is limited,
+    loads superseded while waiting for their turn do not call the API at all
+    A superseded or cancelled load calls its on_superseded callback instead,
+    so the screen can undo what it started for the load (for example a spinner)
+
+    Attributes:
+        max_loads   maximum number of loads running at the same time
+        dispatch    callable running a function on the main thread
+        generation  number of the newest load
+        future      future of the newest load
+        semaphore   limits the running loads, created on the loop
+        lock
+        logger
+    """
+
+    def __init__(self, max_loads: int, dispatch: Callable[[Callable], None]):
+        self.max_loads = max_loads
+        self.dispatch = dispatch
+        self.generation = 0
+        self.future = None
+        self.semaphore = None
+        self.lock = Lock()
+        self.logger = logging.getLogger("loads")
+
+    def submit(self, load: Callable[[], Coroutine], on_result: Callable, on_error: Callable,
+               on_superseded: Callable = None) -> int:
+        """
+        Starts the load, supersedes the running one
+        Only one of the callbacks is called on the main thread,
+        on_result or on_error only if no newer load was started by then
+
+        :param load: callable returning the coroutine making the load
+        :param on_result: called with the result of the load
+        :param on_error: called with the WeatherAppException raised by the load
+        :param on_superseded: called without arguments if a newer load was started or the load was cancelled
+        :return: generation number of the load
+        """
+        with self.lock:
+            self.generation += 1
+            generation = self.generation
+            if self.future:
+                self.future.cancel()
+            future = self.future = AsyncLoop.submit(self._run(generation, load))
+        future.add_done_callback(
+            lambda future: self.dispatch(
+                lambda: self._deliver(generation, future, on_result, on_error, on_superseded)
+            )
+        )
+        self.logger.debug(f"Started load {generation}")
+        return generation
+
+    def cancel(self) -> None:
+        """
+        Cancels the running load and drops its result
+
+        :return: None
+        """
+        with self.lock:
+            self.generation += 1
+            if self.future:
+                self.future.cancel()
+
+    def is_current(self, generation: int) -> bool:
+        """
+        Checks whether the load is the newest one
+
+        :param generation: generation number of the load
+        :return: whether no newer load was started
+        """
+        return generation == self.generation
+
+    def is_busy(self) -> bool:
+        """
+        Checks whether the newest load is still running
+
+        :return: whether the load is running
+        """
+        future = self.future
+        return bool(future) and not future.done()
+
+    async def _run(self, generation: int, load: Callable[[], Coroutine]):
+        """Waits for the turn and runs the load unless it is superseded"""
+        if not self.semaphore:
+            self.semaphore = asyncio.Semaphore(self.max_loads)
+        async with self.semaphore:
+            if not self.is_current(generation):
+                raise asyncio.CancelledError()
+            return await load()
+
+    def _deliver(self, generation: int, future: Future, on_result: Callable, on_error: Callable,
+                 on_superseded: Callable = None) -> None:
+        """Calls the result callback of the load if it is still the newest one, the superseded one otherwise"""
+        if not self.is_current(generation):
+            self.logger.debug(f"Dropped superseded load {generation}")
+            if on_superseded:
+                on_superseded()
+            return
+        try:
+            result = future.result()
+        except CancelledError:
+            if on_superseded:
+                on_superseded()
+            return
+        except WeatherAppException as e:
+            on_error(e)
+            return
+        except Exception as e:
+            self.logger.exception(f"Load {generation} failed: {e}")
+            on_error(WeatherAppException())
+            return
+        on_result(result)
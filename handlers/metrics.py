@@ -0,0 +1,114 @@
+import bisect
+from threading import Lock
+from typing import Dict, Sequence, Tuple
+
+from config import Config
+
+
+class Histogram:
+    """
+    Cumulative histogram of the observed values
+
+    Attributes:
+        buckets     upper bounds of the buckets in the ascending order
+        counts      number of the values falling into every bucket,
+                    the last one counts the values above the largest bound
+        sum         sum of the observed values
+        count       number of the observed values
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Adds the value, should be called with the registry lock
+
+        :param value: observed value
+        :return: None
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative(self) -> list:
+        """
+        Gets the number of the values less than or equal to every bound
+
+        :return: (bound, count) tuples, the last bound is infinity
+        """
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    """
+    In-process registry of the histograms
+    Histograms are identified by the name and the label values,
+    they are created on the first observation and kept until the registry is cleared
+
+    Class attributes:
+        histograms  Histogram objects by (name, labels) where labels are sorted (name, value) tuples
+        lock
+
+    Configuration (Config):
+        METRICS_LATENCY_BUCKETS     default bucket bounds in seconds
+    """
+
+    histograms = {}
+    lock = Lock()
+
+    @classmethod
+    def observe(cls, name: str, value: float, buckets: Sequence[float] = None, **labels) -> None:
+        """
+        Adds the value to the histogram
+
+        :param name: metric name
+        :param value: observed value
+        :param buckets: bucket bounds used when the histogram is created,
+                        Config.METRICS_LATENCY_BUCKETS by default
+        :param labels: label values identifying the histogram
+        :return: None
+        """
+        key = name, tuple(sorted(
+            (label, str(label_value)) for label, label_value in labels.items() if label_value is not None
+        ))
+        with cls.lock:
+            histogram = cls.histograms.get(key)
+            if not histogram:
+                histogram = cls.histograms[key] = Histogram(buckets or Config.METRICS_LATENCY_BUCKETS)
+            histogram.observe(value)
+
+    @classmethod
+    def get_snapshot(cls) -> Dict[Tuple[str, tuple], Histogram]:
+        """
+        Gets a consistent copy of the histograms
+
+        :return: copies of the Histogram objects by (name, labels)
+        """
+        with cls.lock:
+            snapshot = {}
+            for key, histogram in cls.histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts = list(histogram.counts)
+                copy.sum = histogram.sum
+                copy.count = histogram.count
+                snapshot[key] = copy
+        return snapshot
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Removes all the histograms
+
+        :return: None
+        """
+        with cls.lock:
+            cls.histograms.clear()
@@ -0,0 +1,128 @@
+from collections import deque
+from threading import Lock
+from typing import List, Optional
+
+from handlers.health_monitor import HealthMonitor
+
+from config import Config
+
+
+class ProviderStats:
+    """
+    Latency and error statistics of a provider over its recent calls
+    Used to rank providers of the same kind by their health
+    and the weather providers by their forecast accuracy (see ForecastScorer)
+
+    Attributes:
+        latencies   durations of the recent successful calls in seconds
+        outcomes    whether the recent calls succeeded
+        accuracy    mean absolute temperature error of the forecasts (None if not scored)
+        lock
+
+    Class attributes:
+        registry    statistics by (kind, API name)
+        registry_lock
+
+    Configuration (Config):
+        PROVIDER_STATS_WINDOW       number of the recent calls taken into account
+        PROVIDER_STATS_MIN_SAMPLES  number of calls needed to estimate percentiles
+        FAILOVER_ERROR_PENALTY      seconds of latency one failed call is worth when ranking
+        ACCURACY_PENALTY            seconds of latency one degree of the forecast error is worth when ranking
+    """
+
+    registry = {}
+    registry_lock = Lock()
+
+    def __init__(self):
+        self.latencies = deque(maxlen=Config.PROVIDER_STATS_WINDOW)
+        self.outcomes = deque(maxlen=Config.PROVIDER_STATS_WINDOW)
+        self.accuracy = None
+        self.lock = Lock()
+
+    @classmethod
+    def get(cls, kind: str, api_name: str) -> "ProviderStats":
+        """
+        Gets the statistics of the provider, creates empty ones if needed
+
+        :param kind: provider kind (weather, city or sun)
+        :param api_name: short API name
+        :return: ProviderStats object
+        """
+        with cls.registry_lock:
+            stats = cls.registry.get((kind, api_name))
+            if not stats:
+                stats = cls.registry[kind, api_name] = cls()
+            return stats
+
+    @classmethod
+    def rank(cls, kind: str, api_names: List[str]) -> List[str]:
+        """
+        Orders the providers from the healthiest one
+        Providers with the open circuit breaker (see HealthMonitor) go last,
+        providers with equal scores keep the given order
+
+        :param kind: provider kind (weather, city or sun)
+        :param api_names: short API names in the preferred order
+        :return: short API names ordered by the score
+        """
+        return sorted(api_names, key=lambda api_name: (
+            not HealthMonitor.is_available(api_name),
+            cls.get(kind, api_name).get_score()
+        ))
+
+    def record(self, latency: float, success: bool) -> None:
+        """
+        Records the outcome of a call
+
+        :param latency: duration of the call in seconds
+        :param success: whether the call succeeded
+        :return: None
+        """
+        with self.lock:
+            self.outcomes.append(success)
+            if success:
+                self.latencies.append(latency)
+
+    def set_accuracy(self, error: Optional[float]) -> None:
+        """
+        Sets the forecast accuracy of the provider
+
+        :param error: mean absolute temperature error, None if there are not enough samples
+        :return: None
+        """
+        self.accuracy = error
+
+    def get_percentile(self, percentile: float) -> Optional[float]:
+        """
+        Gets the latency percentile of the successful calls
+
+        :param percentile: percentile from 0 to 100
+        :return: latency in seconds or None if there are not enough calls
+        """
+        with self.lock:
+            if len(self.latencies) < Config.PROVIDER_STATS_MIN_SAMPLES:
+                return None
+            latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+        return latencies[index]
+
+    def get_error_rate(self) -> float:
+        """
+        Gets the share of the failed calls
+
+        :return: error rate from 0 to 1, 0 if there were no calls
+        """
+        with self.lock:
+            if not self.outcomes:
+                return 0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def get_score(self) -> float:
+        """
+        Gets the provider score, the lower the healthier
+
+        :return: median latency with the penalties for the errors and the forecast inaccuracy
+        """
+        median = self.get_percentile(50) or 0
+        inaccuracy = (self.accuracy or 0) * Config.ACCURACY_PENALTY
+        return median + self.get_error_rate() * Config.FAILOVER_ERROR_PENALTY + inaccuracy
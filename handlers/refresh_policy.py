@@ -0,0 +1,109 @@
+import time
+from typing import Optional
+
+from handlers.request_coalescer import RequestCoalescer
+from handlers.sun_info import SunInfo
+from handlers.weather import Weather
+
+from config import Config
+
+
+class RefreshPolicy:
+    """
+    Works out when the weather should be refreshed next
+    The interval is based on how long the provider keeps its data
+    (Cache-Control max-age of the last current weather response or the handler TTL)
+    counted from the time the shown weather was fetched, not observed,
+    as the provider may serve an observation older than its cache lifetime,
+    it is shortened to catch the next sunrise, sunset or dusk theme transition
+    and replaced with an exponential backoff while the provider is failing
+    A refresh at a transition only changes the theme unless the weather is expired,
+    the expired weather is fetched again instead of being served stale from the cache
+
+    Configuration (Config):
+        REFRESH_MIN_INTERVAL    shortest interval in seconds
+        REFRESH_MAX_INTERVAL    longest interval in seconds
+        REFRESH_MAX_BACKOFF     longest interval after failures in seconds
+    """
+
+    @classmethod
+    def get_interval(cls, weather_handler_class, fetched: float = None, sun_info: SunInfo = None,
+                     failures: int = 0, now: float = None) -> float:
+        """
+        Gets the number of seconds until the next refresh
+
+        :param weather_handler_class: BaseWeatherHandler subclass providing the weather
+        :param fetched: epoch time the shown weather was fetched at (see BaseWeatherHandler.get_fetched_time)
+        :param sun_info: SunInfo object of the shown city
+        :param failures: number of the refreshes failed in a row
+        :param now: current epoch time
+        :return: interval in seconds
+        """
+        if now is None:
+            now = time.time()
+
+        if failures:
+            backoff = Config.REFRESH_MIN_INTERVAL * 2 ** (failures - 1)
+            return min(backoff, Config.REFRESH_MAX_BACKOFF)
+
+        lifetime = cls.get_lifetime(weather_handler_class)
+        if fetched:
+            interval = fetched + lifetime - now
+        else:
+            interval = lifetime
+
+        transition = cls.get_next_transition(sun_info, now)
+        if transition is not None:
+            interval = min(interval, transition - now)
+
+        return min(max(interval, Config.REFRESH_MIN_INTERVAL), Config.REFRESH_MAX_INTERVAL)
+
+    @staticmethod
+    def get_lifetime(weather_handler_class) -> float:
+        """
+        Gets how long the provider keeps the current weather unchanged
+
+        :param weather_handler_class: BaseWeatherHandler subclass providing the weather
+        :return: Cache-Control max-age of the last current weather response or the handler TTL in seconds
+        """
+        return RequestCoalescer.max_ages.get(
+            (weather_handler_class.API_NAME, "current"), weather_handler_class.CURRENT_TTL
+        )
+
+    @classmethod
+    def is_expired(cls, weather_handler_class, fetched: Optional[float], now: float = None) -> bool:
+        """
+        Checks whether the provider may have a newer weather than the fetched one
+
+        :param weather_handler_class: BaseWeatherHandler subclass providing the weather
+        :param fetched: epoch time the shown weather was fetched at, None if it is not cached
+        :param now: current epoch time
+        :return: whether the weather has to be fetched again
+        """
+        if now is None:
+            now = time.time()
+        return not fetched or now >= fetched + cls.get_lifetime(weather_handler_class)
+
+    @staticmethod
+    def get_next_transition(sun_info: Optional[SunInfo], now: float) -> Optional[float]:
+        """
+        Gets the time of the next theme change
+        Themes are changed around the sunrise and sunset (Weather.SUNSET_PERIOD)
+        and before and after the sunset (Weather.DUSK_PERIOD or the civil dusk if it is known)
+
+        :param sun_info: SunInfo object of the shown city
+        :param now: current epoch time
+        :return: epoch time of the next transition or None if unknown
+        """
+        if not sun_info:
+            return None
+        transitions = (
+            sun_info.sunrise - Weather.SUNSET_PERIOD,
+            sun_info.sunrise + Weather.SUNSET_PERIOD,
+            sun_info.sunset - Weather.DUSK_PERIOD,
+            sun_info.sunset - Weather.SUNSET_PERIOD,
+            sun_info.sunset + Weather.SUNSET_PERIOD,
+            sun_info.dusk if sun_info.dusk is not None else sun_info.sunset + Weather.DUSK_PERIOD
+        )
+        upcoming = [transition for transition in transitions if transition > now]
+        return min(upcoming) if upcoming else None
@@ -0,0 +1,149 @@
+import json
+import logging
+import time
+from threading import Event, Lock
+
+import requests
+
+from handlers.http_session import SessionRegistry
+from handlers.tracing import Tracer
+
+from config import Config
+
+
+class CoalescedResponse:
+    """
+    Response shared by the coalesced requests
+    Keeps the body and parses it to JSON only once,
+    all the callers get the same parsed object and should not modify it
+
+    Attributes:
+        status_code
+        headers
+        url
+        content     raw response body
+    """
+
+    def __init__(self, response: requests.Response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+        self.content = response.content
+
+        self._json = None
+        self._parsed = False
+        self._lock = Lock()
+
+    def json(self):
+        """
+        Parses the response body once and returns the shared object
+
+        :return: parsed JSON object
+        :raises:
+            ValueError  body is not a valid JSON
+        """
+        with self._lock:
+            if not self._parsed:
+                self._json = json.loads(self.content)
+                self._parsed = True
+        return self._json
+
+
+class _PendingRequest:
+    """In-flight or recently finished request shared by the callers"""
+
+    def __init__(self):
+        self.event = Event()
+        self.response = None
+        self.error = None
+        self.finished = None
+
+
+class RequestCoalescer:
+    """
+    Coalesces identical GET requests by their URL
+    Concurrent requests to the same URL wait for the single in-flight call,
+    successful responses are also shared with the requests made
+    within a short window after the call is finished
+    The wait is traced as a "coalesced" span, so it is not counted as the own time of the caller
+
+    Class attributes:
+        pending     requests by the URL
+        max_ages    Cache-Control max-age of the last response by the API name and the endpoint
+        lock        guards the pending requests
+        logger
+
+    Configuration (Config):
+        COALESCE_WINDOW     how long a finished response is shared in seconds
+    """
+
+    pending = {}
+    max_ages = {}
+    lock = Lock()
+    logger = logging.getLogger("coalesce")
+
+    @classmethod
+    def get(cls, api_name: str, endpoint: str, url: str) -> CoalescedResponse:
+        """
+        Makes a GET request or joins the identical one
+
+        :param api_name: short API name
+        :param endpoint: kind of the requested data ("current", "forecast", "city", ...)
+        :param url: URL to visit
+        :return: shared response object
+
+        :raises:
+            requests.ConnectionError    API is not reachable
+            requests.Timeout            API did not respond in time
+        """
+        now = time.monotonic()
+        with cls.lock:
+            request = cls.pending.get(url)
+            if request and (request.finished is None or now - request.finished < Config.COALESCE_WINDOW):
+                owner = False
+            else:
+                cls._prune(now)
+                request = _PendingRequest()
+                cls.pending[url] = request
+                owner = True
+
+        if owner:
+            try:
+                request.response = CoalescedResponse(SessionRegistry.get(api_name, url))
+                cls._store_max_age(api_name, endpoint, request.response)
+            except Exception as e:
+                request.error = e
+            finally:
+                request.finished = time.monotonic()
+                request.event.set()
+
+            if request.error or request.response.status_code >= 400:
+                with cls.lock:
+                    if cls.pending.get(url) is request:
+                        del cls.pending[url]
+        else:
+            cls.logger.debug(f"Coalesced request to {api_name}")
+            with Tracer.span("coalesced", api=api_name, endpoint=endpoint):
+                request.event.wait()
+
+        if request.error:
+            raise request.error
+        return request.response
+
+    @classmethod
+    def _prune(cls, now: float) -> None:
+        """Removes the finished requests that are not shared anymore"""
+        expired = [
+            url for url, request in cls.pending.items()
+            if request.finished is not None and now - request.finished >= Config.COALESCE_WINDOW
+        ]
+        for url in expired:
+            del cls.pending[url]
+
+    @classmethod
+    def _store_max_age(cls, api_name: str, endpoint: str, response: CoalescedResponse) -> None:
+        """Remembers how long the provider allows to cache the response of the endpoint"""
+        for directive in response.headers.get("Cache-Control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+            if name.lower() == "max-age" and value.isdigit():
+                cls.max_ages[api_name, endpoint] = int(value)
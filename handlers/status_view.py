@@ -0,0 +1,167 @@
+import math
+from datetime import datetime
+from typing import List, Optional
+
+from handlers.errors import NotCompatibleAPIException
+from handlers.forecast_series import ForecastSeries
+from handlers.sun_handlers.solar_sun_handler import SolarSunHandler
+from handlers.sun_info import SunInfo
+from handlers.weather import Weather
+from handlers.weather_fetcher import WeatherReport
+
+from config import Config
+
+
+class StatusView:
+    """
+    Display values of the status screen computed in one pass
+    Made from a weather report on any thread, the screen applies it in one batch
+    on the main thread and sets only the widget properties that changed
+    since the last applied view (see get_changes)
+    The hours of the timeline are themed by their own day and night,
+    the sun information of all the hours is calculated locally in one batch
+
+    Attributes:
+        properties  widget property values by (widget id, property name)
+        timeline    data of the hourly timeline recycle view
+        background  gradient colors of the application theme
+
+    Constants:
+        FORECAST_SLOTS  number of the forecast days shown
+        NAME_LENGTH     longest city name shown, longer ones are truncated
+    """
+
+    FORECAST_SLOTS = 4
+    NAME_LENGTH = 13
+
+    def __init__(self, properties: dict, timeline: list, background: tuple):
+        self.properties = properties
+        self.timeline = timeline
+        self.background = background
+
+    @classmethod
+    def from_report(cls, report: WeatherReport, temp_format: str, time_format: int) -> "StatusView":
+        """
+        Computes the display values of the report
+        The weather state has to be updated (see Weather.update_state)
+
+        :param report: WeatherReport object
+        :param temp_format: temperature units (C or F)
+        :param time_format: 24 or 12 hour time format
+        :return: StatusView object
+        """
+        name = report.city.name
+        if len(name) > cls.NAME_LENGTH:
+            name = f"{name[:cls.NAME_LENGTH - 3]}..."
+        weather = report.weather
+        properties = {
+            ("city_name", "text"): name,
+            ("weather_status", "text"): weather.status.capitalize(),
+            ("weather_temp", "text"): cls.format_temp(weather.temperature, temp_format, verbose=True),
+            ("weather_image", "source"): weather.image
+        }
+
+        forecast = report.forecast
+        for slot in range(cls.FORECAST_SLOTS):
+            if slot < len(forecast):
+                day = datetime.fromtimestamp(forecast.time[slot]).strftime("%a")
+                temp = cls.format_temp(forecast.temperature[slot], temp_format)
+            else:
+                day = temp = ""
+            properties[f"forecast_day_{slot + 1}", "text"] = day
+            properties[f"forecast_temp_{slot + 1}", "text"] = temp
+
+        timeline = cls._get_timeline(report.hourly, cls._get_sun_infos(report), temp_format, time_format)
+        return cls(properties, timeline, weather.color)
+
+    @classmethod
+    def from_error(cls, message: str) -> "StatusView":
+        """
+        Gets the display values of a failed refresh
+
+        :param message: error message
+        :return: StatusView object with the blank weather labels
+        """
+        properties = {
+            ("city_name", "text"): "Error",
+            ("weather_status", "text"): message,
+            ("weather_temp", "text"): "",
+            ("weather_image", "source"): Config.ERROR_IMAGE
+        }
+        for slot in range(cls.FORECAST_SLOTS):
+            properties[f"forecast_day_{slot + 1}", "text"] = ""
+            properties[f"forecast_temp_{slot + 1}", "text"] = ""
+        return cls(properties, [], Config.ERROR_COLOR)
+
+    @staticmethod
+    def format_temp(temp: float, temp_format: str, verbose: bool = False) -> str:
+        """
+        Formats the temperature in Celsius in the temperature units
+
+        :param temp: temperature in Celsius
+        :param temp_format: temperature units (C or F)
+        :param verbose: whether the string should contain the units name
+        :return: printable string, empty if the temperature is not known
+        """
+        if temp is None or math.isnan(temp):
+            return ""
+        if temp_format == "C":
+            temp_text = f"{round(temp)}°"
+        else:
+            # C to F conversion rate is t * 9/5 + 32
+            temp_text = f"{round(temp * 9/5 + 32)}°"
+        if verbose:
+            temp_text += temp_format
+        return temp_text
+
+    def get_changes(self, previous: Optional["StatusView"]) -> dict:
+        """
+        Gets the values that differ from the previous view
+
+        :param previous: last applied StatusView object, None if nothing is applied yet
+        :return: widget property values by (widget id, property name)
+        """
+        if previous is None:
+            return dict(self.properties)
+        return {
+            key: value for key, value in self.properties.items()
+            if previous.properties.get(key) != value
+        }
+
+    @staticmethod
+    def _get_sun_infos(report: WeatherReport) -> Optional[List[SunInfo]]:
+        """Calculates the sun information of every hour of the timeline, None if the city has no coordinates"""
+        if not len(report.hourly):
+            return None
+        try:
+            return SolarSunHandler(report.city).get_sun_info_batch(report.hourly.time)
+        except NotCompatibleAPIException:
+            return None
+
+    @classmethod
+    def _get_timeline(
+            cls, hourly: ForecastSeries, sun_infos: Optional[List[SunInfo]], temp_format: str, time_format: int
+    ) -> list:
+        """Gets the timeline data from the forecast columns without creating Weather objects"""
+        hour_format = "%H:%M" if time_format == 24 else "%I %p"
+        if sun_infos is None:
+            images = [
+                Weather.IMAGE_TABLE.get(Weather.STATUS_CODES[status], Config.ERROR_IMAGE) for status in hourly.status
+            ]
+        else:
+            images = [
+                Weather.get_image(Weather.STATUS_CODES[status], sun_info, hour_time)
+                for status, sun_info, hour_time in zip(hourly.status, sun_infos, hourly.time)
+            ]
+        return [
+            {
+                "hour_text": datetime.utcfromtimestamp(
+                    hour_time + (0 if math.isnan(time_zone) else time_zone)
+                ).strftime(hour_format),
+                "temp_text": cls.format_temp(temperature, temp_format),
+                "image_source": image
+            }
+            for hour_time, temperature, image, time_zone in zip(
+                hourly.time, hourly.temperature, images, hourly.time_zone
+            )
+        ]
@@ -0,0 +1,125 @@
+import argparse
+import logging
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from handlers.http_fixtures import Fixtures
+
+from config import Config
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests of the StubAdapter with the recorded Fixtures
+    The first path segment is the host of the original request
+    """
+
+    def do_GET(self) -> None:
+        stub = self.server.stub
+        host, _, path = self.path.lstrip("/").partition("/")
+        url = f"https://{host}/{path}"
+
+        time.sleep(max(0.0, stub.latency + random.uniform(-stub.jitter, stub.jitter)))
+        if random.random() < stub.error_rate:
+            stub.logger.info(f"Injecting {stub.error_kind} into {url}")
+            if stub.error_kind == "reset":
+                self.close_connection = True
+                return
+            if stub.error_kind == "slow":
+                time.sleep(stub.slow_delay)
+            else:
+                self._respond(503, {"Content-Type": "text/plain"}, b"Injected error")
+                return
+
+        fixture = Fixtures.load("GET", url)
+        if not fixture:
+            self._respond(404, {"Content-Type": "text/plain"}, b"No fixture")
+            return
+        self._respond(fixture["status"], fixture["headers"], fixture["body"])
+
+    def _respond(self, status: int, headers: dict, body: bytes) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        self.server.stub.logger.debug(format % args)
+
+
+class StubServer:
+    """
+    Local HTTP server replaying the recorded Fixtures
+    Used with Config.HTTP_MODE set to "stub" to test the handlers
+    and the fetch pipeline on an isolated machine
+    Adds the latency with the jitter to every answer and injects the errors
+
+    Attributes:
+        latency         average delay of an answer in seconds
+        jitter          maximum deviation of the delay in seconds
+        error_rate      share of the requests failed on purpose
+        error_kind      "status" answers 503, "reset" drops the connection,
+                        "slow" delays the answer by slow_delay
+        slow_delay      delay of the slow answers in seconds
+        server          HTTP server, created by start
+        logger
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_kind: str = "status", slow_delay: float = 30.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.slow_delay = slow_delay
+        self.server = None
+        self.logger = logging.getLogger("stub")
+
+    def start(self, address: tuple = None) -> tuple:
+        """
+        Starts serving on a background thread
+
+        :param address: (host, port) to listen on, Config.STUB_SERVER_ADDRESS by default
+        :return: (host, port) the server listens on
+        """
+        self.server = ThreadingHTTPServer(address or Config.STUB_SERVER_ADDRESS, StubRequestHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        Thread(target=self.server.serve_forever, name="stub-server", daemon=True).start()
+        self.logger.info(f"Serving {Config.FIXTURES_DIR} on {self.server.server_address}")
+        return self.server.server_address
+
+    def stop(self) -> None:
+        """
+        Stops serving
+
+        :return: None
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves the recorded API fixtures")
+    parser.add_argument("--host", default=Config.STUB_SERVER_ADDRESS[0])
+    parser.add_argument("--port", type=int, default=Config.STUB_SERVER_ADDRESS[1])
+    parser.add_argument("--latency", type=float, default=0.0, help="average delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum deviation of the delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of the failed requests")
+    parser.add_argument("--error-kind", choices=("status", "reset", "slow"), default="status")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    stub = StubServer(arguments.latency, arguments.jitter, arguments.error_rate, arguments.error_kind)
+    stub.start((arguments.host, arguments.port))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,126 @@
+from threading import Lock
+from typing import List, Optional
+
+from handlers.city import City
+from handlers.city_cache import CityCache
+
+from config import Config
+
+
+class TrieNode:
+    """
+    Node of the suggestion trie, one per typed character
+
+    Attributes:
+        children    child nodes by the next character
+        cities      cities whose normalized name ends at the node
+        results     cities the API returned for the prefix of the node, None if not requested
+        complete    whether the API returned all the cities matching the prefix
+    """
+
+    __slots__ = ("children", "cities", "results", "complete")
+
+    def __init__(self):
+        self.children = {}
+        self.cities = []
+        self.results = None
+        self.complete = False
+
+
+class SuggestionTrie:
+    """
+    Prefix trie of the autocomplete results, one per API
+    Keeps the cities returned for the requested prefixes,
+    so a prefix requested before is answered locally
+    and a longer prefix is answered by filtering the cities of a shorter one
+    if the API returned all the cities matching the shorter prefix
+    (only known for the prefix matching APIs, see BaseCityHandler.PREFIX_SUGGESTIONS)
+
+    Class attributes:
+        roots   root nodes by the API name
+        lock
+
+    Configuration (Config):
+        SUGGESTION_COUNT    maximum number of suggestions
+    """
+
+    roots = {}
+    lock = Lock()
+
+    @classmethod
+    def lookup(cls, api_name: str, prefix: str) -> Optional[List[City]]:
+        """
+        Gets the suggestions without calling the API
+
+        :param api_name: short API name
+        :param prefix: beginning of the location name
+        :return: suggested cities or None if the API should be called
+        """
+        prefix = CityCache.normalize(prefix)
+        with cls.lock:
+            node = cls.roots.get(api_name)
+            complete = False
+            for char in prefix:
+                if not node:
+                    break
+                complete = complete or node.complete
+                node = node.children.get(char)
+            if not node:
+                return [] if complete else None
+            if node.results is not None:
+                return node.results
+            if complete:
+                return cls._collect(node)
+        return None
+
+    @classmethod
+    def insert(cls, api_name: str, prefix: str, cities: List[City], complete: bool) -> None:
+        """
+        Stores the cities the API returned for the prefix
+
+        :param api_name: short API name
+        :param prefix: beginning of the location name
+        :param cities: cities returned by the API
+        :param complete: whether the API returned all the cities matching the prefix
+        :return: None
+        """
+        with cls.lock:
+            root = cls.roots.get(api_name)
+            if not root:
+                root = cls.roots[api_name] = TrieNode()
+
+            node = cls._walk(root, CityCache.normalize(prefix))
+            node.results = cities[:Config.SUGGESTION_COUNT]
+            node.complete = complete
+
+            for city in cities:
+                node = cls._walk(root, CityCache.normalize(city.name))
+                if not any(cls._same(city, known) for known in node.cities):
+                    node.cities.append(city)
+
+    @staticmethod
+    def _walk(node: TrieNode, key: str) -> TrieNode:
+        """Gets the node of the key, creates the missing nodes"""
+        for char in key:
+            child = node.children.get(char)
+            if not child:
+                child = node.children[char] = TrieNode()
+            node = child
+        return node
+
+    @staticmethod
+    def _collect(node: TrieNode) -> List[City]:
+        """Gets the cities under the node, shorter names first"""
+        cities = []
+        level = [node]
+        while level and len(cities) < Config.SUGGESTION_COUNT:
+            for child in level:
+                cities.extend(child.cities)
+            level = [child for parent in level for child in parent.children.values()]
+        return cities[:Config.SUGGESTION_COUNT]
+
+    @staticmethod
+    def _same(city: City, other: City) -> bool:
+        """Checks whether the cities are the same location"""
+        return (city.name, city.state, city.woeid, city.latitude, city.longitude) == \
+               (other.name, other.state, other.woeid, other.latitude, other.longitude)
@@ -1,19 +1,51 @@
+import time
 from abc import ABC, abstractmethod
+from typing import Callable
+
+from handlers.async_loop import AsyncLoop
 from handlers.city import City
+from handlers.sun_info import SunInfo
+from handlers.weather_cache import WeatherCache
 
 
 class BaseSunsetHandler(ABC):
     """
     Sunset handler abstract base class
+    get_sun_info has an asynchronous variant to be awaited on the AsyncLoop
+    The handlers calling an API cache the sun information of the day (see get_cached)
     Attributes:
         city           city object instance
     Constants:
         API_NAME       short API name
+        SUN_TTL        how long the sun information of the day is considered fresh in seconds
     """
+    SUN_TTL = 24 * 60 * 60
 
     def __init__(self, city: City):
         self.city = city
 
+    def get_location_key(self) -> str:
+        """
+        Gets the key identifying the location of the city in the cache
+        The woeid differs between the APIs, so it is qualified with the API that gave it
+
+        :return: coordinates of the city, the source API and the woeid if they are not known
+        """
+        if self.city.latitude is not None and self.city.longitude is not None:
+            return f"{self.city.latitude},{self.city.longitude}"
+        return f"{self.city.source}:{self.city.woeid}"
+
+    def get_cached(self, loader: Callable) -> SunInfo:
+        """
+        Gets the sun information from the weather cache, calls the loader if it is not cached
+        The key includes the UTC date, so the information of the previous day is never served
+
+        :param loader: callable without arguments that gets the sun information from the API
+        :return: SunInfo object
+        """
+        key = self.API_NAME, self.get_location_key(), f"sun_{time.strftime('%Y%m%d', time.gmtime())}"
+        return WeatherCache.get(key, loader, self.SUN_TTL)
+
     @abstractmethod
     def ping(self):
         """API connection test"""
@@ -28,3 +60,7 @@ class BaseSunsetHandler(ABC):
     def get_sun_info(self):
         """Gets the sun information from the API"""
         pass
+
+    async def get_sun_info_async(self) -> SunInfo:
+        """Asynchronous variant of get_sun_info"""
+        return await AsyncLoop.run_blocking(self.get_sun_info)
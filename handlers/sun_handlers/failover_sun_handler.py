@@ -0,0 +1,59 @@
+import logging
+
+from handlers.city import City
+from handlers.failover import FailoverExecutor
+from handlers.sun_handlers.base_sun_handler import BaseSunsetHandler
+from handlers.sun_handlers.sunrise_sunset_sun_handler import SunriseSunsetSunHandler
+from handlers.sun_handlers.open_weather_sun_handler import OpenWeatherSunHandler
+from handlers.sun_handlers.solar_sun_handler import SolarSunHandler
+
+from handlers.sun_info import SunInfo
+
+
+class FailoverSunHandler(BaseSunsetHandler):
+    """
+    Composite sun handler backed by several sun information APIs
+    Requests the healthiest API, fails over to the others
+    and hedges slow calls (see FailoverExecutor)
+    The local solar calculator is the last resort
+    Attributes:
+        city           city object instance
+        handlers       handlers of all the providers
+        logger
+    Constants:
+        API_NAME       short API name
+        PROVIDERS      sun handler classes in the preferred order
+    """
+
+    API_NAME = "Auto (failover)"
+    PROVIDERS = (SunriseSunsetSunHandler, OpenWeatherSunHandler, SolarSunHandler)
+
+    def __init__(self, city: City):
+        super().__init__(city)
+        self.handlers = [provider(city) for provider in self.PROVIDERS]
+        self.logger = logging.getLogger("fo_sun")
+
+    def ping(self) -> bool:
+        """
+        Tests connection to the providers
+
+        :return: whether any of the providers is reachable
+        """
+        return any(handler.ping() for handler in self.handlers)
+
+    def get_url(self) -> str:
+        """Gets the sun information url of the first provider"""
+        return self.handlers[0].get_url()
+
+    def get_sun_info(self) -> SunInfo:
+        """
+        Gets the sun information from the healthiest provider
+
+        :return: SunInfo object
+
+        :raises:
+            WeatherAppException     all the providers failed or the budget is spent
+        """
+        return FailoverExecutor.call("sun", "sun info", [
+            (handler.API_NAME, handler.get_sun_info) for handler in self.handlers
+        ])
@@ -1,11 +1,13 @@
 import requests
 
 from handlers.city import City
+from handlers.request_coalescer import RequestCoalescer
 from handlers.sun_handlers.base_sun_handler import BaseSunsetHandler
 from handlers.weather_handlers.open_weather_handler import OpenWeatherHandler
 
 from handlers.sun_info import SunInfo
 from handlers.errors import NoAPIConnectionException, BadCityNameException, ServiceUnavailableException
+from handlers.tracing import traced
 
 
 class OpenWeatherSunHandler(BaseSunsetHandler):
@@ -34,6 +36,16 @@ class OpenWeatherSunHandler(BaseSunsetHandler):
         return self.weather_handler.get_url_current()
 
     def get_sun_info(self):
+        """
+        Gets the sun information of the day from the cache
+        Calls the API if it is not cached
+
+        :return: SunInfo object
+        """
+        return self.get_cached(self.fetch_sun_info)
+
+    @traced("sun")
+    def fetch_sun_info(self):
         """
         Gets the sun information from the OpenWeather API
 
@@ -46,7 +58,7 @@ class OpenWeatherSunHandler(BaseSunsetHandler):
         """
 
         try:
-            response = requests.get(self.get_url())
+            response = RequestCoalescer.get(self.API_NAME, "sun", self.get_url())
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
 
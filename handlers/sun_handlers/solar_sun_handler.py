@@ -0,0 +1,208 @@
+import logging
+import math
+import time
+from array import array
+from typing import Callable, Dict, List, Iterable
+
+from handlers.city import City
+from handlers.sun_handlers.base_sun_handler import BaseSunsetHandler
+
+from handlers.sun_info import SunInfo
+from handlers.errors import NotCompatibleAPIException
+from handlers.tracing import traced
+
+
+class SolarSunHandler(BaseSunsetHandler):
+    """
+    Calculates sunrise, sunset and civil dusk timings locally
+    Does not make any API calls, uses the sunrise equation
+    with the solar position approximation (accurate within a couple of minutes)
+    Requires the city latitude and longitude
+    In a polar day the sun is considered to rise and set 12 hours around the noon,
+    in a polar night it rises and sets at the noon
+    Attributes:
+        city           city object instance
+        logger
+    Constants:
+        API_NAME            short name of the handler
+        SUNRISE_ALTITUDE    sun altitude of the sunrise and sunset in degrees
+        DUSK_ALTITUDE       sun altitude of the civil dusk in degrees
+        J2000               Julian date of the 2000-01-01 noon
+        UNIX_EPOCH          Julian date of the unix epoch
+    """
+
+    API_NAME = "Solar calculator"
+
+    SUNRISE_ALTITUDE = -0.833
+    DUSK_ALTITUDE = -6
+
+    J2000 = 2451545.0
+    UNIX_EPOCH = 2440587.5
+
+    def __init__(self, city: City):
+        super().__init__(city)
+        self.logger = logging.getLogger("sun_slr")
+
+    def ping(self) -> bool:
+        """
+        The calculation is local, always available
+
+        :return: True
+        """
+        return True
+
+    def get_url(self) -> None:
+        """
+        The calculation is local, there is no url
+
+        :return: None
+        """
+        return None
+
+    @traced("sun")
+    def get_sun_info(self) -> SunInfo:
+        """
+        Calculates the sun information of the current day
+
+        :return: SunInfo object
+        :raises:
+            NotCompatibleAPIException   the city has no coordinates
+        """
+        return self.get_sun_info_batch([time.time()])[0]
+
+    def get_sun_info_batch(self, timestamps: Iterable[float]) -> List[SunInfo]:
+        """
+        Calculates the sun information of the city for many days at once
+        Can be used to set the day and night themes of a forecast
+
+        :param timestamps: epoch times within the days to calculate
+        :return: SunInfo object list in the same order
+        :raises:
+            NotCompatibleAPIException   the city has no coordinates
+        """
+        if self.city.latitude is None or self.city.longitude is None:
+            self.logger.warning(f"Not compatible {self.API_NAME}")
+            raise NotCompatibleAPIException(self.API_NAME)
+
+        timestamps = array("d", timestamps)
+        latitudes = array("d", [float(self.city.latitude)]) * len(timestamps)
+        longitudes = array("d", [float(self.city.longitude)]) * len(timestamps)
+        return self._to_sun_info(self.calculate_columns(latitudes, longitudes, timestamps))
+
+    @classmethod
+    def get_sun_info_many(cls, cities: Iterable[City], timestamp: float) -> List[SunInfo]:
+        """
+        Calculates the sun information of many locations for the same moment
+
+        :param cities: City objects with the coordinates
+        :param timestamp: epoch time within the day to calculate
+        :return: SunInfo object list in the same order
+        :raises:
+            NotCompatibleAPIException   one of the cities has no coordinates
+        """
+        latitudes, longitudes = array("d"), array("d")
+        for city in cities:
+            if city.latitude is None or city.longitude is None:
+                logging.getLogger("sun_slr").warning(f"Not compatible {cls.API_NAME}")
+                raise NotCompatibleAPIException(cls.API_NAME)
+            latitudes.append(float(city.latitude))
+            longitudes.append(float(city.longitude))
+        timestamps = array("d", [timestamp]) * len(latitudes)
+        return cls._to_sun_info(cls.calculate_columns(latitudes, longitudes, timestamps))
+
+    @classmethod
+    def calculate(cls, latitude: float, longitude: float, timestamp: float) -> SunInfo:
+        """
+        Calculates the sun information of the solar day closest to the timestamp
+
+        :param latitude: latitude in degrees, positive to the north
+        :param longitude: longitude in degrees, positive to the east
+        :param timestamp: epoch time
+        :return: SunInfo object
+        """
+        columns = cls.calculate_columns(array("d", [latitude]), array("d", [longitude]), array("d", [timestamp]))
+        return cls._to_sun_info(columns)[0]
+
+    @classmethod
+    def calculate_columns(cls, latitudes: array, longitudes: array, timestamps: array) -> Dict[str, array]:
+        """
+        Calculates the sun information of the solar days closest to the timestamps
+        Every step of the sunrise equation is a single pass over the columns,
+        the terms shared by the sunrise and the dusk are calculated once
+
+        :param latitudes: latitudes in degrees, positive to the north
+        :param longitudes: longitudes in degrees, positive to the east
+        :param timestamps: epoch times, an item per latitude and longitude
+        :return: "sunrise", "sunset" and "dusk" epoch time columns
+        """
+        column = cls._column
+        offsets = column(lambda longitude: longitude / 360, longitudes)
+
+        # mean solar noon of the closest solar day
+        mean_noons = column(
+            lambda timestamp, offset: cls.J2000 + 0.0009 - offset + round(
+                timestamp / 86400 + cls.UNIX_EPOCH - cls.J2000 - 0.0009 + offset
+            ),
+            timestamps, offsets
+        )
+
+        anomalies = column(
+            lambda mean_noon: math.radians((357.5291 + 0.98560028 * (mean_noon - cls.J2000)) % 360), mean_noons
+        )
+        ecliptic_longitudes = column(
+            lambda anomaly: math.radians((
+                math.degrees(anomaly) + 1.9148 * math.sin(anomaly) + 0.02 * math.sin(2 * anomaly)
+                + 0.0003 * math.sin(3 * anomaly) + 180 + 102.9372
+            ) % 360),
+            anomalies
+        )
+
+        transits = column(
+            lambda mean_noon, anomaly, ecliptic_longitude:
+                mean_noon + 0.0053 * math.sin(anomaly) - 0.0069 * math.sin(2 * ecliptic_longitude),
+            mean_noons, anomalies, ecliptic_longitudes
+        )
+        declinations = column(
+            lambda ecliptic_longitude: math.asin(math.sin(ecliptic_longitude) * math.sin(math.radians(23.4397))),
+            ecliptic_longitudes
+        )
+
+        # terms of the hour angle shared by both altitudes
+        latitudes = column(math.radians, latitudes)
+        products = column(lambda latitude, declination: math.sin(latitude) * math.sin(declination),
+                          latitudes, declinations)
+        divisors = column(lambda latitude, declination: math.cos(latitude) * math.cos(declination),
+                          latitudes, declinations)
+
+        sunrise_angles = cls._hour_angles(cls.SUNRISE_ALTITUDE, products, divisors)
+        dusk_angles = cls._hour_angles(cls.DUSK_ALTITUDE, products, divisors)
+
+        return {
+            "sunrise": column(lambda transit, angle: cls._to_epoch(transit - angle / 360), transits, sunrise_angles),
+            "sunset": column(lambda transit, angle: cls._to_epoch(transit + angle / 360), transits, sunrise_angles),
+            "dusk": column(lambda transit, angle: cls._to_epoch(transit + angle / 360), transits, dusk_angles)
+        }
+
+    @classmethod
+    def _hour_angles(cls, altitude: float, products: array, divisors: array) -> array:
+        """Hour angles in degrees the sun reaches the altitude at, 0 or 180 for polar nights and days"""
+        sine = math.sin(math.radians(altitude))
+        return cls._column(
+            lambda product, divisor: math.degrees(math.acos(min(1.0, max(-1.0, (sine - product) / divisor)))),
+            products, divisors
+        )
+
+    @staticmethod
+    def _column(function: Callable, *columns: array) -> array:
+        """Applies the function to the items of the columns, an array of the results"""
+        return array("d", map(function, *columns))
+
+    @staticmethod
+    def _to_sun_info(columns: Dict[str, array]) -> List[SunInfo]:
+        """Creates the SunInfo objects of the calculated columns"""
+        return list(map(SunInfo, columns["sunrise"], columns["sunset"], columns["dusk"]))
+
+    @classmethod
+    def _to_epoch(cls, julian_date: float) -> float:
+        """Converts the Julian date to the epoch time"""
+        return (julian_date - cls.UNIX_EPOCH) * 86400
@@ -3,10 +3,13 @@ import logging
 import requests
 
 from handlers.city import City
+from handlers.health_monitor import HealthMonitor
+from handlers.request_coalescer import RequestCoalescer
 from handlers.sun_handlers.base_sun_handler import BaseSunsetHandler
 
 from handlers.sun_info import SunInfo
 from handlers.errors import NoAPIConnectionException, BadCityNameException, ServiceUnavailableException
+from handlers.tracing import traced
 
 
 class SunriseSunsetSunHandler(BaseSunsetHandler):
@@ -30,20 +33,13 @@ class SunriseSunsetSunHandler(BaseSunsetHandler):
     def ping(self) -> bool:
         """
         Sunrise Sunset API connection test
-        Tries to connect to the API for one second
+        Answers from the health learned from the real API calls, makes no calls
 
-        :return: whether the call was successful
+        :return: whether the API is considered available
         """
-
-        try:
-            self.logger.debug("Trying to ping sunrise-sunset")
-            timeout = 1
-            requests.get("https://sunrise-sunset.org", timeout=timeout)
-            self.logger.info("Ping to sunrise-sunset successful")
-            return True
-        except (requests.ConnectionError, requests.Timeout):
-            self.logger.warning("Cant ping sunrise-sunset city")
-            return False
+        available = HealthMonitor.is_available(self.API_NAME)
+        self.logger.debug(f"{self.API_NAME} available: {available}")
+        return available
 
     def get_url(self) -> str:
         """
@@ -58,6 +54,16 @@ class SunriseSunsetSunHandler(BaseSunsetHandler):
         return url
 
     def get_sun_info(self) -> SunInfo:
+        """
+        Gets the sun information of the day from the cache
+        Calls the API if it is not cached
+
+        :return: SunInfo object
+        """
+        return self.get_cached(self.fetch_sun_info)
+
+    @traced("sun")
+    def fetch_sun_info(self) -> SunInfo:
         """
         Gets the sun information
         :return: SunInfo object
@@ -70,7 +76,7 @@ class SunriseSunsetSunHandler(BaseSunsetHandler):
 
         try:
             self.logger.debug(f"Getting sun info from {self.API_NAME}")
-            response = requests.get(self.get_url())
+            response = RequestCoalescer.get(self.API_NAME, "sun", self.get_url())
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
 
@@ -5,11 +5,14 @@ class SunInfo:
     Arguments:
         sunrise     epoch time of the sunrise
         sunset      epoch time of the sunset
+        dusk        epoch time of the civil dusk (optional)
     """
-    def __init__(self, sunrise, sunset):
+    def __init__(self, sunrise, sunset, dusk=None):
         self.sunrise = sunrise
         self.sunset = sunset
+        self.dusk = dusk
 
     def __str__(self):
         return f"Sunrise: {self.sunrise}\n" \
-               f"Sunset:  {self.sunset}"
+               f"Sunset:  {self.sunset}\n" \
+               f"Dusk:    {self.dusk}"
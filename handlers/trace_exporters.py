@@ -0,0 +1,99 @@
+import json
+import logging
+import math
+import os
+from threading import Lock
+
+from handlers.metrics import MetricsRegistry
+from handlers.tracing import Span
+
+
+class JsonLinesExporter:
+    """
+    Appends the finished spans to a file, one JSON object per line
+    Added to the Tracer to keep the spans of the calls made in the field
+
+    Attributes:
+        path    file the spans are appended to
+        lock    guards the writes
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+
+    def export(self, span: Span) -> None:
+        """
+        Appends the span to the file
+
+        :param span: finished Span object
+        :return: None
+        """
+        line = json.dumps(span.to_dict(), default=str)
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class PrometheusExporter:
+    """
+    Writes the histograms of the MetricsRegistry in the Prometheus text format
+    The file can be read by the node exporter textfile collector
+    or sent to a push gateway
+
+    Class attributes:
+        logger
+    """
+
+    logger = logging.getLogger("metrics")
+
+    @classmethod
+    def render(cls) -> str:
+        """
+        Gets the histograms in the Prometheus text exposition format
+
+        :return: text with the TYPE line and the bucket, sum and count samples of every histogram
+        """
+        lines = []
+        typed = set()
+        for (name, labels), histogram in cls._get_sorted():
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in histogram.get_cumulative():
+                le = "+Inf" if math.isinf(bound) else repr(float(bound))
+                lines.append(f"{name}_bucket{cls._format_labels(labels + (('le', le),))} {count}")
+            lines.append(f"{name}_sum{cls._format_labels(labels)} {histogram.sum!r}")
+            lines.append(f"{name}_count{cls._format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def write(cls, path: str) -> None:
+        """
+        Replaces the file with the current histograms
+        The file is written aside and renamed, so a reader never sees a partial one
+
+        :param path: file path
+        :return: None
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(cls.render())
+        os.replace(temporary, path)
+        cls.logger.debug(f"Wrote the metrics to {path}")
+
+    @staticmethod
+    def _get_sorted() -> list:
+        """Gets the histogram snapshot as ((name, labels), histogram) tuples sorted by the key"""
+        return sorted(MetricsRegistry.get_snapshot().items(), key=lambda item: item[0])
+
+    @staticmethod
+    def _format_labels(labels: tuple) -> str:
+        """Formats the (name, value) tuples as the label set"""
+        if not labels:
+            return ""
+        escaped = (
+            (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+            for name, value in labels
+        )
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
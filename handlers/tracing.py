@@ -0,0 +1,202 @@
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Optional
+
+from handlers.metrics import MetricsRegistry
+
+
+class Span:
+    """
+    Timed operation with the attributes describing it
+    Spans started while another one is current become its children,
+    the time spent in the children is subtracted to get the own time of the span,
+    e.g. the parsing time of a handler call without the HTTP call it made
+    or the wait for the identical call made by another handler
+
+    Attributes:
+        name            operation name (refresh, handler, http, coalesced)
+        trace_id        id shared by all the spans of a single refresh
+        span_id
+        parent          parent Span object (None for the root span)
+        attributes      values describing the operation
+        started         wall clock time the span started at
+        duration        span duration in seconds, None until it is finished
+        children_time   total duration of the finished children in seconds
+        error           name of the exception raised in the span
+        lock            guards children_time, children may finish on different threads
+    """
+
+    def __init__(self, name: str, parent: "Span" = None, **attributes):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent = parent
+        self.attributes = attributes
+        self.started = time.time()
+        self.duration = None
+        self.children_time = 0.0
+        self.error = None
+        self.lock = Lock()
+
+        self._start = time.perf_counter()
+
+    def set(self, **attributes) -> None:
+        """
+        Sets the attributes of the span
+
+        :param attributes: attribute values
+        :return: None
+        """
+        self.attributes.update(attributes)
+
+    def get_self_time(self) -> Optional[float]:
+        """
+        Gets the duration of the span without the time spent in its children
+
+        :return: own time in seconds, None if the span is not finished
+        """
+        if self.duration is None:
+            return None
+        with self.lock:
+            return max(0.0, self.duration - self.children_time)
+
+    def finish(self) -> None:
+        """
+        Stops the timer and adds the duration to the parent
+
+        :return: None
+        """
+        self.duration = time.perf_counter() - self._start
+        if self.parent:
+            with self.parent.lock:
+                self.parent.children_time += self.duration
+
+    def to_dict(self) -> dict:
+        """
+        Gets the serializable representation of the span
+
+        :return: dictionary with the timings in milliseconds
+        """
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "started": self.started,
+            "duration_ms": self.duration * 1000 if self.duration is not None else None,
+            "self_ms": self.get_self_time() * 1000 if self.duration is not None else None,
+            "error": self.error,
+            **self.attributes
+        }
+
+
+class Tracer:
+    """
+    Creates the spans and hands the finished ones to the exporters
+    The current span is kept in a context variable,
+    so it follows the coroutines on the AsyncLoop and the blocking calls
+    made from them (see AsyncLoop.run_blocking)
+    Every finished span is also added to the duration histograms of the MetricsRegistry
+
+    Class attributes:
+        current     context variable with the current Span object
+        exporters   objects with the export(span) method
+        lock        guards the exporters
+        logger
+    """
+
+    current = ContextVar("span", default=None)
+    exporters = []
+    lock = Lock()
+    logger = logging.getLogger("trace")
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str, **attributes):
+        """
+        Runs the block as a span, the child of the current one
+
+        :param name: operation name
+        :param attributes: values describing the operation
+        :return: context manager giving the Span object
+        """
+        span = Span(name, cls.current.get(), **attributes)
+        token = cls.current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            cls.current.reset(token)
+            span.finish()
+            cls._export(span)
+
+    @classmethod
+    def annotate(cls, **attributes) -> None:
+        """
+        Sets the attributes of the current span if there is one
+
+        :param attributes: attribute values
+        :return: None
+        """
+        span = cls.current.get()
+        if span:
+            span.set(**attributes)
+
+    @classmethod
+    def add_exporter(cls, exporter) -> None:
+        """
+        Starts handing the finished spans to the exporter
+
+        :param exporter: object with the export(span) method
+        :return: None
+        """
+        with cls.lock:
+            cls.exporters.append(exporter)
+
+    @classmethod
+    def remove_exporter(cls, exporter) -> None:
+        """
+        Stops handing the finished spans to the exporter
+
+        :param exporter: previously added exporter
+        :return: None
+        """
+        with cls.lock:
+            if exporter in cls.exporters:
+                cls.exporters.remove(exporter)
+
+    @classmethod
+    def _export(cls, span: Span) -> None:
+        """Records the span duration and hands the span to the exporters"""
+        api_name = span.attributes.get("api")
+        MetricsRegistry.observe("weather_span_seconds", span.duration, span=span.name, api=api_name)
+        MetricsRegistry.observe("weather_span_self_seconds", span.get_self_time(), span=span.name, api=api_name)
+        for exporter in list(cls.exporters):
+            try:
+                exporter.export(span)
+            except Exception as e:
+                cls.logger.warning(f"Span export failed: {e}")
+
+
+def traced(operation: str) -> Callable:
+    """
+    Decorates a handler method to run it as a "handler" span
+    The API name is taken from the handler the method is called on
+
+    :param operation: name of the handler operation (current, forecast, city etc.)
+    :return: decorator
+    """
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(handler, *args, **kwargs):
+            with Tracer.span("handler", api=handler.API_NAME, operation=operation):
+                return method(handler, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -5,6 +5,7 @@ from handlers.sun_info import SunInfo
 class Weather:
     """
     Weather status to track various information
+    Uses slots to keep many objects compact
 
     Attributes:
         location_name   name of the tracked location
@@ -23,7 +24,8 @@ class Weather:
         SUNSET_PERIOD   How much time is needed to be close to the
                         sunrise or sunset to set sunrise theme
         DUSK_PERIOD     How much time is needed to be close to the
-                        sunrise or sunset to set dusk theme
+                        sunrise or sunset to set dusk theme,
+                        after the sunset the civil dusk ends it if it is known
 
     Weather conditions:
         CLEAR, CLOUDY, OVERCAST, SUNNY_RAIN, RAIN,
@@ -31,8 +33,15 @@ class Weather:
         NIGHT_CLEAR, NIGHT_CLOUDY, SUNRISE
 
     IMAGE_TABLE         Maps weather status to the corresponding images
+    STATUS_CODES        All the weather conditions, the index is used
+                        as a compact status code
     """
 
+    __slots__ = (
+        "city_name", "status", "image", "color", "temperature", "pressure",
+        "humidity", "wind_speed", "wind_direction", "time", "time_zone"
+    )
+
     SUNSET_PERIOD = 30 * 60
     DUSK_PERIOD = 120 * 60
 
@@ -69,6 +78,11 @@ class Weather:
         SUNRISE: "images/sunrise.png"
     }
 
+    STATUS_CODES = (
+        CLEAR, CLOUDY, OVERCAST, SUNNY_RAIN, RAIN, THUNDERSTORM, SNOW,
+        MIST, SANDSTORM, ERUPTION, STORM, NIGHT_CLEAR, NIGHT_CLOUDY, SUNRISE
+    )
+
     def __init__(
             self, location_name: str = None, status: str = None, temperature: float = None,
             pressure: float = None, humidity: float = None, wind_speed: float = None,
@@ -90,14 +104,19 @@ class Weather:
         self.time = time
         self.time_zone = time_zone
 
-    def update_state(self, sun_info: SunInfo) -> None:
+    def update_state(self, sun_info: SunInfo, now: float = None) -> None:
         """
         Method to update the internal state
         Sets weather color and images depending on time and conditions
+        Can be called again to change the theme as the time passes
 
         :param sun_info: SunInfo object to store sunset and sunrise timings
+        :param now: epoch time the theme is set for, the observation time if not provided
         :return: None
         """
+        if now is None:
+            now = self.time
+        self.image = self.get_image(self.status, sun_info, now)
 
         # Sets snowy theme
         if self.status == self.SNOW or self.status == self.MIST:
@@ -105,22 +124,17 @@ class Weather:
             return
 
         # Sets sunset/sunrise theme
-        if abs(sun_info.sunrise - self.time) < self.SUNSET_PERIOD \
-                or abs(sun_info.sunset - self.time) < self.SUNSET_PERIOD:
-            self.image = self.IMAGE_TABLE[self.SUNRISE]
+        if self.is_sunset(sun_info, now):
             self.color = Config.SUNSET_COLOR
             return
 
         # Sets dusk theme
-        if abs(sun_info.sunset - self.time) < self.DUSK_PERIOD:
+        if self.is_dusk(sun_info, now):
             self.color = Config.DUSK_COLOR
             return
 
         # determine whether there is a day or night
-        if sun_info.sunrise < self.time < sun_info.sunset:
-            is_day = True
-        else:
-            is_day = False
+        is_day = sun_info.sunrise < now < sun_info.sunset
 
         # eruption theme
         if self.status == self.ERUPTION:
@@ -141,7 +155,6 @@ class Weather:
                 self.color = Config.NOON_COLOR
                 return
             else:
-                self.image = self.IMAGE_TABLE[self.NIGHT_CLEAR]
                 self.color = Config.NIGHT_COLOR
                 return
 
@@ -152,7 +165,6 @@ class Weather:
                 return
             else:
                 self.color = Config.NIGHT_COLOR
-                self.image = self.IMAGE_TABLE[self.NIGHT_CLOUDY]
                 return
 
         # overcast theme
@@ -167,6 +179,56 @@ class Weather:
         # default is dusk theme
         self.color = Config.DUSK_COLOR
 
+    @classmethod
+    def get_image(cls, status: str, sun_info: SunInfo, now: float) -> str:
+        """
+        Gets the image of the weather condition at the time
+        Shows the sunrise image around the sunrise and sunset
+        and the night images of the clear and cloudy sky at night,
+        the same image update_state sets, but without a Weather object
+
+        :param status: weather condition name
+        :param sun_info: SunInfo object of the day of the time
+        :param now: epoch time
+        :return: image path
+        """
+        if status == cls.SNOW or status == cls.MIST:
+            return cls.IMAGE_TABLE[status]
+        if cls.is_sunset(sun_info, now):
+            return cls.IMAGE_TABLE[cls.SUNRISE]
+        if cls.is_dusk(sun_info, now) or sun_info.sunrise < now < sun_info.sunset:
+            return cls.IMAGE_TABLE[status]
+        if status == cls.CLEAR:
+            return cls.IMAGE_TABLE[cls.NIGHT_CLEAR]
+        if status == cls.CLOUDY:
+            return cls.IMAGE_TABLE[cls.NIGHT_CLOUDY]
+        return cls.IMAGE_TABLE[status]
+
+    @classmethod
+    def is_sunset(cls, sun_info: SunInfo, now: float) -> bool:
+        """
+        Checks whether the time is close to the sunrise or the sunset
+
+        :param sun_info: SunInfo object of the day of the time
+        :param now: epoch time
+        :return: whether the sunrise theme is shown
+        """
+        return abs(sun_info.sunrise - now) < cls.SUNSET_PERIOD or abs(sun_info.sunset - now) < cls.SUNSET_PERIOD
+
+    @classmethod
+    def is_dusk(cls, sun_info: SunInfo, now: float) -> bool:
+        """
+        Checks whether the time is in the dusk before or after the sunset
+        After the sunset the dusk ends at the civil dusk if it is known
+
+        :param sun_info: SunInfo object of the day of the time
+        :param now: epoch time
+        :return: whether the dusk theme is shown
+        """
+        if now > sun_info.sunset and sun_info.dusk is not None:
+            return now < sun_info.dusk
+        return abs(sun_info.sunset - now) < cls.DUSK_PERIOD
+
     def __str__(self):
         """
         Printable string of the object
@@ -0,0 +1,193 @@
+import copy
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Hashable, Optional
+
+from config import Config
+
+
+class WeatherCache:
+    """
+    In-memory TTL cache of the weather handler results
+    Fresh entries are returned right away,
+    entries past their TTL are still returned while a background refresh runs
+    (stale-while-revalidate), entries past the stale period are fetched again,
+    concurrent callers missing the same key wait for a single load
+    Every returned value is a copy, so the callers can update its state
+    Entries past the stale period are evicted when a value is stored,
+    the least recently used entries are evicted above WEATHER_CACHE_SIZE entries
+
+    Class attributes:
+        entries     (value, time stored, expiry time) tuples by the key in the least recently used order
+        refreshing  keys being refreshed in the background
+        loading     futures of the loads of the missing keys by the key
+        executor    thread pool of the background refreshes
+        lock
+        logger
+        hits        number of fresh entries returned
+        misses      number of values fetched by the caller
+        stale       number of stale entries returned
+        evicted     number of entries evicted
+
+    Configuration (Config):
+        WEATHER_STALE_PERIOD    how long past the TTL the stale entry is served in seconds
+        WEATHER_CACHE_WORKERS   maximum number of parallel background refreshes
+        WEATHER_CACHE_SIZE      maximum number of entries
+    """
+
+    entries = OrderedDict()
+    refreshing = set()
+    loading = {}
+    executor = ThreadPoolExecutor(max_workers=Config.WEATHER_CACHE_WORKERS, thread_name_prefix="wthr_cch")
+    lock = Lock()
+    logger = logging.getLogger("wthr_cch")
+
+    hits = 0
+    misses = 0
+    stale = 0
+    evicted = 0
+
+    @classmethod
+    def get(cls, key: Hashable, loader: Callable, ttl: float):
+        """
+        Gets the cached value or loads it
+
+        :param key: cache key, usually (API name, location, endpoint)
+        :param loader: callable without arguments that gets a new value
+        :param ttl: how long the value is fresh in seconds
+        :return: copy of the value
+
+        :raises:
+            WeatherAppException     the value is not cached and the loader failed
+        """
+        now = time.time()
+        with cls.lock:
+            entry = cls.entries.get(key)
+            if entry:
+                value, stored, _ = entry
+                cls.entries.move_to_end(key)
+                age = now - stored
+                if age < ttl:
+                    cls.hits += 1
+                    return copy.deepcopy(value)
+                if age < ttl + Config.WEATHER_STALE_PERIOD:
+                    cls.stale += 1
+                    if key not in cls.refreshing:
+                        cls.refreshing.add(key)
+                        cls.executor.submit(cls._refresh, key, loader, ttl)
+                    return copy.deepcopy(value)
+            cls.misses += 1
+            future = cls.loading.get(key)
+            owner = future is None
+            if owner:
+                future = cls.loading[key] = Future()
+
+        if not owner:
+            return copy.deepcopy(future.result())
+        try:
+            value = loader()
+            with cls.lock:
+                cls._store(key, value, ttl)
+            future.set_result(value)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with cls.lock:
+                del cls.loading[key]
+        return copy.deepcopy(value)
+
+    @classmethod
+    def put(cls, key: Hashable, value, ttl: float) -> None:
+        """
+        Stores the value fetched elsewhere, for example by a batched call
+
+        :param key: cache key, usually (API name, location, endpoint)
+        :param value: fresh value
+        :param ttl: how long the value is fresh in seconds
+        :return: None
+        """
+        with cls.lock:
+            cls._store(key, copy.deepcopy(value), ttl)
+
+    @classmethod
+    def invalidate(cls, key: Hashable) -> None:
+        """
+        Removes the entry, so the next get loads the value instead of returning the stale one
+
+        :param key: cache key, usually (API name, location, endpoint)
+        :return: None
+        """
+        with cls.lock:
+            cls.entries.pop(key, None)
+
+    @classmethod
+    def get_stored(cls, key: Hashable) -> Optional[float]:
+        """
+        Gets the time the cached value was fetched at
+
+        :param key: cache key, usually (API name, location, endpoint)
+        :return: epoch time or None if the value is not cached
+        """
+        with cls.lock:
+            entry = cls.entries.get(key)
+        return entry[1] if entry else None
+
+    @classmethod
+    def _store(cls, key: Hashable, value, ttl: float) -> None:
+        """Stores the value as the most recently used one, evicts the expired entries, the lock has to be held"""
+        now = time.time()
+        cls.entries[key] = value, now, now + ttl + Config.WEATHER_STALE_PERIOD
+        cls.entries.move_to_end(key)
+
+        expired = [stored_key for stored_key, (_, _, expires) in cls.entries.items() if expires <= now]
+        for stored_key in expired:
+            del cls.entries[stored_key]
+        cls.evicted += len(expired)
+        while len(cls.entries) > Config.WEATHER_CACHE_SIZE:
+            cls.entries.popitem(last=False)
+            cls.evicted += 1
+
+    @classmethod
+    def _refresh(cls, key: Hashable, loader: Callable, ttl: float) -> None:
+        """Loads the value in the background, keeps the stale one if failed"""
+        try:
+            value = loader()
+            with cls.lock:
+                cls._store(key, value, ttl)
+            cls.logger.debug(f"Refreshed {key}")
+        except Exception as e:
+            cls.logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            with cls.lock:
+                cls.refreshing.discard(key)
+
+    @classmethod
+    def get_counters(cls) -> dict:
+        """
+        Gets the cache statistics
+
+        :return: dictionary with hits, misses, stale, evicted and entries counters
+        """
+        with cls.lock:
+            return {
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "stale": cls.stale,
+                "evicted": cls.evicted,
+                "entries": len(cls.entries)
+            }
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        Removes all the entries and resets the counters
+
+        :return: None
+        """
+        with cls.lock:
+            cls.entries.clear()
+            cls.hits = cls.misses = cls.stale = cls.evicted = 0
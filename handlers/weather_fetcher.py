@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+from handlers.async_loop import AsyncLoop
+from handlers.city import City
+from handlers.errors import WeatherAppException
+from handlers.sun_info import SunInfo
+from handlers.tracing import Tracer
+from handlers.weather import Weather
+from handlers.forecast_series import ForecastSeries
+
+
+class WeatherReport:
+    """
+    Stores the results of a single weather refresh
+
+    Attributes:
+        city        City object the report is made for
+        sun_info    SunInfo object of the city
+        weather     current Weather object
+        forecast    ForecastSeries object with the forecast
+        hourly      ForecastSeries object with the hourly forecast (empty if not requested or not available)
+    """
+
+    def __init__(self, city: City, sun_info: SunInfo, weather: Weather, forecast: ForecastSeries,
+                 hourly: ForecastSeries = None):
+        self.city = city
+        self.sun_info = sun_info
+        self.weather = weather
+        self.forecast = forecast
+        self.hourly = hourly if hourly is not None else ForecastSeries(weather.city_name)
+
+
+class WeatherFetcher:
+    """
+    Orchestrates the API calls needed to refresh the weather
+    Only the city lookup has to be made first,
+    the sun information, the current weather, the forecast and the hourly forecast
+    are independent and requested in parallel on the AsyncLoop
+    The hourly forecast is optional, the report is made without it if it fails
+
+    Class attributes:
+        logger
+    """
+
+    logger = logging.getLogger("fetch")
+
+    @classmethod
+    def fetch(cls, city_handler_class, sun_handler_class, weather_handler_class,
+              city_name: str, n: int, hours: int = 0, city: City = None) -> WeatherReport:
+        """
+        Gets the city, the sun information, the current weather and a forecast
+        Blocks until all the calls are finished, should not be called on the main thread
+
+        :param city_handler_class: BaseCityHandler subclass
+        :param sun_handler_class: BaseSunsetHandler subclass
+        :param weather_handler_class: BaseWeatherHandler subclass
+        :param city_name: name of the location
+        :param n: number of predicted days
+        :param hours: number of predicted hours, no hourly forecast is requested if 0
+        :param city: City object of the location if already known, skips the city lookup
+        :return: WeatherReport object
+
+        :raises:
+            WeatherAppException     the first exception raised by any of the handlers
+        """
+        return AsyncLoop.run(cls.fetch_async(
+            city_handler_class, sun_handler_class, weather_handler_class, city_name, n, hours, city
+        ))
+
+    @classmethod
+    async def fetch_async(cls, city_handler_class, sun_handler_class, weather_handler_class,
+                          city_name: str, n: int, hours: int = 0, city: City = None) -> WeatherReport:
+        """
+        Asynchronous variant of fetch
+        The refresh is traced as a "refresh" span, the parent of the handler calls it makes
+        Cancelling it cancels the calls that are not started yet
+
+        :param city_handler_class: BaseCityHandler subclass
+        :param sun_handler_class: BaseSunsetHandler subclass
+        :param weather_handler_class: BaseWeatherHandler subclass
+        :param city_name: name of the location
+        :param n: number of predicted days
+        :param hours: number of predicted hours, no hourly forecast is requested if 0
+        :param city: City object of the location if already known, skips the city lookup
+        :return: WeatherReport object
+
+        :raises:
+            WeatherAppException     the first exception raised by any of the handlers
+        """
+        with Tracer.span("refresh", city=city_name, api=weather_handler_class.API_NAME, days=n):
+            if city is None:
+                city = await city_handler_class(city_name).get_city_async()
+            weather_handler = weather_handler_class(city, hours)
+
+            sun_task = asyncio.ensure_future(sun_handler_class(city).get_sun_info_async())
+            weather_task = asyncio.ensure_future(weather_handler.get_weather_current_async())
+            forecast_task = asyncio.ensure_future(weather_handler.get_weather_forecast_async(n))
+            hourly_task = asyncio.ensure_future(cls._fetch_hourly(weather_handler, hours))
+            tasks = sun_task, weather_task, forecast_task, hourly_task
+
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                for task in tasks:
+                    if not task.done():
+                        task.cancel()
+            for task in done:
+                if task.exception():
+                    cls.logger.info(f"Refresh of {city.name} failed: {task.exception()}")
+                    raise task.exception()
+
+            cls.logger.debug(f"Refreshed {city.name}")
+
+        return WeatherReport(
+            city=city,
+            sun_info=sun_task.result(),
+            weather=weather_task.result(),
+            forecast=forecast_task.result(),
+            hourly=hourly_task.result()
+        )
+
+    @classmethod
+    async def _fetch_hourly(cls, weather_handler, hours: int) -> ForecastSeries:
+        """Gets the hourly forecast, an empty one if it is not requested or fails"""
+        if not hours:
+            return ForecastSeries(weather_handler.city.name)
+        try:
+            return await weather_handler.get_weather_hourly_async(hours)
+        except WeatherAppException as e:
+            cls.logger.warning(f"No hourly forecast of {weather_handler.city.name}: {e}")
+            return ForecastSeries(weather_handler.city.name)
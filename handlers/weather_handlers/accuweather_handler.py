@@ -1,13 +1,15 @@
-from typing import List
-
 import requests
 import logging
 import datetime
 
 from handlers.city import City
+from handlers.health_monitor import HealthMonitor
+from handlers.request_coalescer import RequestCoalescer
 from handlers.weather_handlers.base_weather_handler import BaseWeatherHandler
 from handlers.weather import Weather
+from handlers.forecast_series import ForecastSeries
 from handlers.errors import NoAPIConnectionException, BadWeatherException, NotCompatibleAPIException
+from handlers.tracing import traced
 
 from config import Config
 
@@ -24,8 +26,12 @@ class AccuWeatherHandler(BaseWeatherHandler):
     Constants:
         API_NAME       short API name
         STATUS_TABLE   Weather object and API weather status mapping
+        CURRENT_TTL    how long the current weather is considered fresh in seconds
+        FORECAST_TTL   how long a forecast is considered fresh in seconds
     """
     API_NAME = "AccuWeather"
+    CURRENT_TTL = 30 * 60
+    FORECAST_TTL = 6 * 60 * 60
     STATUS_TABLE = {
         1: Weather.CLEAR,
         2: Weather.CLEAR,
@@ -69,42 +75,35 @@ class AccuWeatherHandler(BaseWeatherHandler):
         44: Weather.SNOW
     }
 
-    def __init__(self, city: City):
-        super().__init__(city)
+    def __init__(self, city: City, hours: int = 0):
+        super().__init__(city, hours)
         self.logger = logging.getLogger("aw_wthr")
 
     def ping(self) -> bool:
         """
         AccuWeather API connection test
-        Tries to connect to the API for one second
+        Answers from the health learned from the real API calls, makes no calls
 
-        :return: whether the call was successful
+        :return: whether the API is considered available
         """
-
-        try:
-            self.logger.debug(f"Trying to ping {self.API_NAME}")
-            timeout = 1
-            requests.get("https://developer.accuweather.com/", timeout=timeout)
-            self.logger.info(f"Ping to {self.API_NAME} successful")
-            return True
-        except (requests.ConnectionError, requests.Timeout):
-            self.logger.warning(f"Cant ping {self.API_NAME} weather")
-            return False
+        available = HealthMonitor.is_available(self.API_NAME)
+        self.logger.debug(f"{self.API_NAME} available: {available}")
+        return available
 
     def get_url_current(self) -> str:
         """
         Gets OpenWeather API url to get the current weather
-        To have a successful call, AccuWeather API requires city woeid
-        if not provided in the City object raises the corresponding message
+        To have a successful call, AccuWeather API requires city woeid found by the same API
+        given by the AccuWeather geolocation, if not provided in the City object raises the corresponding message
 
         :return: URL that can be visited to get a forecast
         :raises:
             NotCompatibleAPIException   if the api is not compatible with the city object
         """
 
-        if self.city.woeid:
+        if self.get_woeid():
             url = f"http://dataservice.accuweather.com/forecasts/v1/hourly/1hour/" \
-                  f"{self.city.woeid}?apikey={Config.ACCUWEATHER_API_KEY}" \
+                  f"{self.get_woeid()}?apikey={Config.ACCUWEATHER_API_KEY}" \
                   f"&details=true&metric=true"
             self.logger.debug(f"Created current url for {self.API_NAME}: {url}")
             return url
@@ -115,24 +114,46 @@ class AccuWeatherHandler(BaseWeatherHandler):
     def get_url_forecast(self) -> str:
         """
         Gets AccuWeather API url to get a forecast
-        To have a successful call, AccuWeather API requires city woeid
-        if not provided in the City object, raises the corresponding message
+        To have a successful call, AccuWeather API requires city woeid found by the same API
+        given by the AccuWeather geolocation, if not provided in the City object, raises the corresponding message
 
         :return: URL that can be visited to get a forecast
         :raises:
             NotCompatibleAPIException   if the api is not compatible with the city object
         """
 
-        if self.city.woeid:
+        if self.get_woeid():
             url = f"http://dataservice.accuweather.com/forecasts/v1/daily/5day/" \
-                  f"{self.city.woeid}?apikey={Config.ACCUWEATHER_API_KEY}&details=true&metric=true"
+                  f"{self.get_woeid()}?apikey={Config.ACCUWEATHER_API_KEY}&details=true&metric=true"
             self.logger.debug(f"Created forecast url for {self.API_NAME}: {url}")
             return url
         else:
             self.logger.warning(f"Not compatible {self.API_NAME}")
             raise NotCompatibleAPIException(self.API_NAME)
 
-    def get_weather_current(self) -> Weather:
+    def get_url_hourly(self) -> str:
+        """
+        Gets AccuWeather API url to get an hourly forecast (12 hours)
+        To have a successful call, AccuWeather API requires city woeid found by the same API
+        given by the AccuWeather geolocation, if not provided in the City object, raises the corresponding message
+
+        :return: URL that can be visited to get an hourly forecast
+        :raises:
+            NotCompatibleAPIException   if the api is not compatible with the city object
+        """
+
+        if self.get_woeid():
+            url = f"http://dataservice.accuweather.com/forecasts/v1/hourly/12hour/" \
+                  f"{self.get_woeid()}?apikey={Config.ACCUWEATHER_API_KEY}" \
+                  f"&details=true&metric=true"
+            self.logger.debug(f"Created hourly url for {self.API_NAME}: {url}")
+            return url
+        else:
+            self.logger.warning(f"Not compatible {self.API_NAME}")
+            raise NotCompatibleAPIException(self.API_NAME)
+
+    @traced("current")
+    def fetch_weather_current(self) -> Weather:
         """
         Gets the current weather from the AccuWeather API
 
@@ -145,22 +166,9 @@ class AccuWeatherHandler(BaseWeatherHandler):
         """
 
         try:
-            response = requests.get(self.get_url_current())
+            response = RequestCoalescer.get(self.API_NAME, "current", self.get_url_current())
             self.logger.info(f"Got current weather request from {self.API_NAME}")
-            weather_dict = response.json()[0]
-            date = datetime.datetime.fromisoformat(weather_dict["DateTime"])
-            time_zone = date.utcoffset() / datetime.timedelta(seconds=1)
-            return Weather(
-                location_name=self.city.name,
-                status=self.STATUS_TABLE[weather_dict["WeatherIcon"]],
-                temperature=weather_dict["Temperature"]["Value"],
-                pressure=None,
-                humidity=weather_dict["RelativeHumidity"],
-                wind_speed=weather_dict["Wind"]["Speed"]["Value"] / 3.6,
-                wind_direction=weather_dict["Wind"]["Direction"]["Degrees"],
-                time=weather_dict["EpochDateTime"],
-                time_zone=time_zone
-            )
+            return self._parse_hour(response.json()[0])
         except (KeyError, IndexError):
             self.logger.warning(f"Bad weather response {self.API_NAME}")
             raise BadWeatherException(self.API_NAME)
@@ -168,13 +176,58 @@ class AccuWeatherHandler(BaseWeatherHandler):
             self.logger.warning(f"Error connecting {self.API_NAME}")
             raise NoAPIConnectionException(self.API_NAME, "current weather")
 
-    def get_weather_forecast(self, n: int) -> List[Weather]:
+    @traced("hourly")
+    def fetch_weather_hourly(self, hours: int) -> ForecastSeries:
+        """
+        Gets an hourly forecast from the AccuWeather API
+        The API predicts 12 hours
+
+        :param hours:   number of predicted hours
+
+        :return:   ForecastSeries object with an entry per hour
+
+        :raises:
+            BadWeatherException             API response is not parsable
+            NoAPIConnectionException        API is not accessible
+            ServiceUnavailableException     API returned bad a response
+        """
+        try:
+            response = RequestCoalescer.get(self.API_NAME, "hourly", self.get_url_hourly())
+            self.logger.info(f"Got hourly forecast request from {self.API_NAME}")
+            return ForecastSeries.from_weathers(
+                (self._parse_hour(hour_info) for hour_info in response.json()[:hours]), self.city.name
+            )
+        except (KeyError, IndexError, TypeError):
+            self.logger.warning(f"Bad weather response {self.API_NAME}")
+            raise BadWeatherException(self.API_NAME)
+        except (requests.ConnectionError, requests.Timeout):
+            self.logger.warning(f"Error connecting {self.API_NAME}")
+            raise NoAPIConnectionException(self.API_NAME, "hourly forecast")
+
+    def _parse_hour(self, weather_dict: dict) -> Weather:
+        """Creates a Weather object from an entry of the hourly forecast response"""
+        date = datetime.datetime.fromisoformat(weather_dict["DateTime"])
+        time_zone = date.utcoffset() / datetime.timedelta(seconds=1)
+        return Weather(
+            location_name=self.city.name,
+            status=self.STATUS_TABLE[weather_dict["WeatherIcon"]],
+            temperature=weather_dict["Temperature"]["Value"],
+            pressure=None,
+            humidity=weather_dict["RelativeHumidity"],
+            wind_speed=weather_dict["Wind"]["Speed"]["Value"] / 3.6,
+            wind_direction=weather_dict["Wind"]["Direction"]["Degrees"],
+            time=weather_dict["EpochDateTime"],
+            time_zone=time_zone
+        )
+
+    @traced("forecast")
+    def fetch_weather_forecast(self, n: int) -> ForecastSeries:
         """
         Gets a forecast from the AccuWeather API
 
         :param n:   number of predicted days
 
-        :return:   Weather object list with the corresponding information
+        :return:   ForecastSeries object with the corresponding information
 
         :raises:
             BadWeatherException             API response is not parsable
@@ -182,10 +235,10 @@ class AccuWeatherHandler(BaseWeatherHandler):
             ServiceUnavailableException     API returned bad a response
         """
         try:
-            response = requests.get(self.get_url_forecast())
+            response = RequestCoalescer.get(self.API_NAME, "forecast", self.get_url_forecast())
             self.logger.info(f"Got forecast weather request from {self.API_NAME}")
             results = response.json()
-            forecast = []
+            forecast = ForecastSeries(self.city.name)
             for day_info in results["DailyForecasts"]:
                 date = datetime.datetime.fromisoformat(day_info["Date"])
                 time_zone = date.utcoffset() / datetime.timedelta(seconds=1)
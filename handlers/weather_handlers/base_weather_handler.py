@@ -1,25 +1,205 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
+from handlers.async_loop import AsyncLoop
 from handlers.city import City
+from handlers.errors import NotCompatibleAPIException
 from handlers.weather import Weather
+from handlers.forecast_series import ForecastSeries
+from handlers.history_store import HistoryStore
+from handlers.weather_cache import WeatherCache
 
 
 class BaseWeatherHandler(ABC):
     """
     Weather handler abstract base class
+    Results are cached for the time the provider keeps them unchanged
+    Fetched results are appended to the HistoryStore
+    Every getter has an asynchronous variant to be awaited on the AsyncLoop
     Attributes:
         city           city object instance
+        hours          number of the hourly forecast hours requested along with the forecast,
+                       lets the APIs answering both in one response request them together
         logger
     Constants:
         API_NAME       short API name
         STATUS_TABLE   Weather object and API weather status mapping
+        CURRENT_TTL    how long the current weather is considered fresh in seconds
+        FORECAST_TTL   how long a forecast is considered fresh in seconds
+        HOURLY_TTL     how long an hourly forecast is considered fresh in seconds
+        GROUP_SIZE     maximum number of cities the API returns in one call
     """
     API_NAME = None
     STATUS_TABLE = None
 
-    def __init__(self, city: City):
+    CURRENT_TTL = 10 * 60
+    FORECAST_TTL = 3 * 60 * 60
+    HOURLY_TTL = 60 * 60
+
+    GROUP_SIZE = 1
+
+    def __init__(self, city: City, hours: int = 0):
         self.city = city
+        self.hours = hours
+
+    def get_location_key(self) -> str:
+        """
+        Gets the key identifying the location of the city in the cache and the history
+        The coordinates are the same for all the providers,
+        the woeid differs between the APIs, so it is qualified with the API that gave it
+
+        :return: coordinates of the city, the source API and the woeid if they are not known
+        """
+        if self.city.latitude is not None and self.city.longitude is not None:
+            return f"{self.city.latitude},{self.city.longitude}"
+        return f"{self.city.source}:{self.city.woeid}"
+
+    def get_woeid(self):
+        """
+        Gets the woeid of the city if it was given by the same API,
+        the woeid of one API means a different location (or nothing) to another one
+
+        :return: woeid or None if the city has no woeid of the API
+        """
+        if self.city.source == self.API_NAME:
+            return self.city.woeid
+        return None
+
+    def get_fetched_time(self) -> Optional[float]:
+        """
+        Gets the time the cached current weather was fetched at
+
+        :return: epoch time or None if the current weather is not cached
+        """
+        return WeatherCache.get_stored((self.API_NAME, self.get_location_key(), "current"))
+
+    def invalidate_weather_current(self) -> None:
+        """
+        Drops the cached current weather,
+        so the next get_weather_current calls the API instead of returning the stale one
+
+        :return: None
+        """
+        WeatherCache.invalidate((self.API_NAME, self.get_location_key(), "current"))
+
+    def get_weather_current(self) -> Weather:
+        """
+        Gets the current weather from the cache
+        Calls the API if the cached one is outdated
+
+        :return: Weather object with the corresponding information
+        """
+        key = self.API_NAME, self.get_location_key(), "current"
+        return WeatherCache.get(key, self.load_weather_current, self.CURRENT_TTL)
+
+    def get_weather_forecast(self, n: int) -> ForecastSeries:
+        """
+        Gets a forecast from the cache
+        Calls the API if the cached one is outdated
+
+        :param n:   number of predicted days
+        :return:    ForecastSeries object with the corresponding information
+        """
+        key = self.API_NAME, self.get_location_key(), f"forecast_{n}"
+        return WeatherCache.get(key, lambda: self.load_weather_forecast(n), self.FORECAST_TTL)
+
+    def get_weather_hourly(self, hours: int) -> ForecastSeries:
+        """
+        Gets an hourly forecast from the cache
+        Calls the API if the cached one is outdated
+
+        :param hours:   number of predicted hours, the API may return fewer
+        :return:        ForecastSeries object with an entry per hour
+
+        :raises:
+            NotCompatibleAPIException   the API has no hourly forecast
+        """
+        key = self.API_NAME, self.get_location_key(), f"hourly_{hours}"
+        return WeatherCache.get(key, lambda: self.load_weather_hourly(hours), self.HOURLY_TTL)
+
+    def load_weather_current(self) -> Weather:
+        """
+        Fetches the current weather bypassing the cache and stores it in the history
+
+        :return: Weather object with the corresponding information
+        """
+        weather = self.fetch_weather_current()
+        HistoryStore.append_observation(self.API_NAME, self.get_location_key(), weather)
+        return weather
+
+    def load_weather_forecast(self, n: int) -> ForecastSeries:
+        """
+        Fetches a forecast bypassing the cache and stores it in the history
+
+        :param n:   number of predicted days
+        :return:    ForecastSeries object with the corresponding information
+        """
+        forecast = self.fetch_weather_forecast(n)
+        HistoryStore.append_forecast(self.API_NAME, self.get_location_key(), forecast)
+        return forecast
+
+    def load_weather_hourly(self, hours: int) -> ForecastSeries:
+        """
+        Fetches an hourly forecast bypassing the cache and stores it in the history
+
+        :param hours:   number of predicted hours
+        :return:        ForecastSeries object with an entry per hour
+
+        :raises:
+            NotCompatibleAPIException   the API has no hourly forecast
+        """
+        forecast = self.fetch_weather_hourly(hours)
+        HistoryStore.append_forecast(self.API_NAME, self.get_location_key(), forecast)
+        return forecast
+
+    async def get_weather_current_async(self) -> Weather:
+        """
+        Asynchronous variant of get_weather_current
+
+        :return: Weather object with the corresponding information
+        """
+        return await AsyncLoop.run_blocking(self.get_weather_current)
+
+    async def get_weather_forecast_async(self, n: int) -> ForecastSeries:
+        """
+        Asynchronous variant of get_weather_forecast
+
+        :param n:   number of predicted days
+        :return:    ForecastSeries object with the corresponding information
+        """
+        return await AsyncLoop.run_blocking(self.get_weather_forecast, n)
+
+    async def get_weather_hourly_async(self, hours: int) -> ForecastSeries:
+        """
+        Asynchronous variant of get_weather_hourly
+
+        :param hours:   number of predicted hours
+        :return:        ForecastSeries object with an entry per hour
+        """
+        return await AsyncLoop.run_blocking(self.get_weather_hourly, hours)
+
+    @classmethod
+    def get_weather_group(cls, cities: List[City]) -> List[Optional[Weather]]:
+        """
+        Gets the current weather of many cities in batched API calls
+        Supported by the handlers with GROUP_SIZE greater than one,
+        the others do not batch the calls and return no results
+
+        :param cities: City objects
+        :return: Weather objects in the same order,
+                 None for the cities that cannot be requested in a group
+        """
+        return [None] * len(cities)
+
+    @classmethod
+    async def get_weather_group_async(cls, cities: List[City]) -> List[Optional[Weather]]:
+        """
+        Asynchronous variant of get_weather_group
+
+        :param cities: City objects
+        :return: Weather objects in the same order
+        """
+        return await AsyncLoop.run_blocking(cls.get_weather_group, cities)
 
     @abstractmethod
     def ping(self) -> bool:
@@ -37,11 +217,21 @@ class BaseWeatherHandler(ABC):
         pass
 
     @abstractmethod
-    def get_weather_current(self) -> Weather:
+    def fetch_weather_current(self) -> Weather:
         """Gets the current weather from the API"""
         pass
 
     @abstractmethod
-    def get_weather_forecast(self, n: int) -> List[Weather]:
+    def fetch_weather_forecast(self, n: int) -> ForecastSeries:
         """Gets a forecast from the API"""
         pass
+
+    def fetch_weather_hourly(self, hours: int) -> ForecastSeries:
+        """
+        Gets an hourly forecast from the API
+        Implemented by the handlers of the APIs with hourly forecasts
+
+        :raises:
+            NotCompatibleAPIException   the API has no hourly forecast
+        """
+        raise NotCompatibleAPIException(self.API_NAME, "No hourly forecast")
@@ -0,0 +1,106 @@
+import logging
+
+from handlers.city import City
+from handlers.failover import FailoverExecutor
+from handlers.forecast_series import ForecastSeries
+from handlers.weather import Weather
+from handlers.weather_handlers.base_weather_handler import BaseWeatherHandler
+from handlers.weather_handlers.open_weather_handler import OpenWeatherHandler
+from handlers.weather_handlers.accuweather_handler import AccuWeatherHandler
+from handlers.weather_handlers.meta_weather_handler import MetaWeatherHandler
+
+
+class FailoverWeatherHandler(BaseWeatherHandler):
+    """
+    Composite weather handler backed by several weather APIs
+    Requests the healthiest compatible API, fails over to the others
+    and hedges slow calls (see FailoverExecutor)
+    Results are stored in the history by the provider that answered,
+    the providers not compatible with the city (for example given the woeid of another API) are skipped
+    Attributes:
+        city           city object instance
+        handlers       handlers of all the providers
+        logger
+    Constants:
+        API_NAME       short API name
+        PROVIDERS      weather handler classes in the preferred order
+    """
+
+    API_NAME = "Auto (failover)"
+    PROVIDERS = (OpenWeatherHandler, AccuWeatherHandler, MetaWeatherHandler)
+
+    def __init__(self, city: City, hours: int = 0):
+        super().__init__(city, hours)
+        self.handlers = [provider(city, hours) for provider in self.PROVIDERS]
+        self.logger = logging.getLogger("fo_wthr")
+
+    def ping(self) -> bool:
+        """
+        Tests connection to the providers
+
+        :return: whether any of the providers is reachable
+        """
+        return any(handler.ping() for handler in self.handlers)
+
+    def get_url_current(self) -> str:
+        """Gets the current weather url of the first provider"""
+        return self.handlers[0].get_url_current()
+
+    def get_url_forecast(self) -> str:
+        """Gets the forecast url of the first provider"""
+        return self.handlers[0].get_url_forecast()
+
+    def fetch_weather_current(self) -> Weather:
+        """
+        Gets the current weather from the healthiest provider
+
+        :return: Weather object with the corresponding information
+
+        :raises:
+            WeatherAppException     all the providers failed or the budget is spent
+        """
+        return FailoverExecutor.call("weather", "current weather", [
+            (handler.API_NAME, handler.load_weather_current) for handler in self.handlers
+        ])
+
+    def fetch_weather_forecast(self, n: int) -> ForecastSeries:
+        """
+        Gets a forecast from the healthiest provider
+
+        :param n:   number of predicted days
+        :return:    ForecastSeries object with the corresponding information
+
+        :raises:
+            WeatherAppException     all the providers failed or the budget is spent
+        """
+        return FailoverExecutor.call("weather", "forecast", [
+            (handler.API_NAME, lambda handler=handler: handler.load_weather_forecast(n))
+            for handler in self.handlers
+        ])
+
+    def fetch_weather_hourly(self, hours: int) -> ForecastSeries:
+        """
+        Gets an hourly forecast from the healthiest provider that has one
+
+        :param hours:   number of predicted hours
+        :return:        ForecastSeries object with an entry per hour
+
+        :raises:
+            WeatherAppException     all the providers failed or the budget is spent
+        """
+        return FailoverExecutor.call("weather", "hourly forecast", [
+            (handler.API_NAME, lambda handler=handler: handler.load_weather_hourly(hours))
+            for handler in self.handlers
+        ])
+
+    def load_weather_current(self) -> Weather:
+        """Fetches the current weather, the provider stores it in the history"""
+        return self.fetch_weather_current()
+
+    def load_weather_forecast(self, n: int) -> ForecastSeries:
+        """Fetches a forecast, the provider stores it in the history"""
+        return self.fetch_weather_forecast(n)
+
+    def load_weather_hourly(self, hours: int) -> ForecastSeries:
+        """Fetches an hourly forecast, the provider stores it in the history"""
+        return self.fetch_weather_hourly(hours)
@@ -1,14 +1,16 @@
-from typing import List
-
 import requests
 import logging
 import datetime
 
 from handlers.city import City
+from handlers.health_monitor import HealthMonitor
+from handlers.request_coalescer import RequestCoalescer
 from handlers.weather_handlers.base_weather_handler import BaseWeatherHandler
 from handlers.weather import Weather
+from handlers.forecast_series import ForecastSeries
 from handlers.errors import NoAPIConnectionException, BadWeatherException, NotCompatibleAPIException, \
     ServiceUnavailableException
+from handlers.tracing import traced
 
 
 class MetaWeatherHandler(BaseWeatherHandler):
@@ -21,6 +23,7 @@ class MetaWeatherHandler(BaseWeatherHandler):
     Constants:
         API_NAME       short API name
         STATUS_TABLE   Weather object and API weather status mapping
+        CURRENT_TTL    how long the current weather is considered fresh in seconds
     """
 
     STATUS_TABLE = {
@@ -37,42 +40,37 @@ class MetaWeatherHandler(BaseWeatherHandler):
     }
 
     API_NAME = "MetaWeather"
+    CURRENT_TTL = 30 * 60
 
-    def __init__(self, city: City):
-        super().__init__(city)
+    def __init__(self, city: City, hours: int = 0):
+        super().__init__(city, hours)
         self.logger = logging.getLogger("mw_wthr")
 
     def ping(self) -> bool:
         """
         MetaWeather API connection test
-        Tries the connection for one second
+        Answers from the health learned from the real API calls, makes no calls
 
-        :return: whether the call was successful
+        :return: whether the API is considered available
         """
-        try:
-            self.logger.debug(f"Trying to ping {self.API_NAME}")
-            timeout = 1
-            requests.get("https://www.metaweather.com/api/", timeout=timeout)
-            self.logger.info(f"Ping to {self.API_NAME} successful")
-            return True
-        except (requests.ConnectionError, requests.Timeout):
-            self.logger.warning(f"Cant ping {self.API_NAME} city")
-            return False
+        available = HealthMonitor.is_available(self.API_NAME)
+        self.logger.debug(f"{self.API_NAME} available: {available}")
+        return available
 
     def get_url_current(self) -> str:
         """
         Gets MetaWeather API url to get the current weather
-        To have a successful call, AccuWeather API requires city woeid
-        if not provided in the City object raises the corresponding message
+        To have a successful call, AccuWeather API requires city woeid found by the same API
+        given by the MetaWeather geolocation, if not provided in the City object raises the corresponding message
 
         :return: URL that can be visited to get a forecast
         :raises:
             NotCompatibleAPIException   if the api is not compatible with the city object
         """
 
-        if self.city.woeid:
+        if self.get_woeid():
             url = f"https://www.metaweather.com/api/location/" \
-                  f"{self.city.woeid}/"
+                  f"{self.get_woeid()}/"
             self.logger.debug(f"Created current url for {self.API_NAME}: {url}")
             return url
         else:
@@ -82,8 +80,8 @@ class MetaWeatherHandler(BaseWeatherHandler):
     def get_url_forecast(self) -> str:
         """
         Gets OpenWeather API url to get a forecast
-        To have a successful call, AccuWeather API requires city woeid
-        if not provided in the City object, raises the corresponding message
+        To have a successful call, AccuWeather API requires city woeid found by the same API
+        given by the MetaWeather geolocation, if not provided in the City object, raises the corresponding message
         The url for the current weather and a forecast is the same
 
         :return: URL that can be visited to get a forecast
@@ -94,7 +92,8 @@ class MetaWeatherHandler(BaseWeatherHandler):
         self.logger.debug("Creating forecast url (calling current url)")
         return self.get_url_current()
 
-    def get_weather_current(self) -> Weather:
+    @traced("current")
+    def fetch_weather_current(self) -> Weather:
         """
         Gets the current weather from the AccuWeather API
 
@@ -107,7 +106,7 @@ class MetaWeatherHandler(BaseWeatherHandler):
         """
 
         try:
-            response = requests.get(self.get_url_current())
+            response = RequestCoalescer.get(self.API_NAME, "current", self.get_url_current())
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
 
@@ -135,13 +134,14 @@ class MetaWeatherHandler(BaseWeatherHandler):
             self.logger.warning(f"Error connecting {self.API_NAME}")
             raise NoAPIConnectionException(self.API_NAME, "current weather")
 
-    def get_weather_forecast(self, n: int) -> List[Weather]:
+    @traced("forecast")
+    def fetch_weather_forecast(self, n: int) -> ForecastSeries:
         """
         Gets a forecast from the MetaWeather API
 
         :param n:   number of predicted days
 
-        :return:   Weather object list with the corresponding information
+        :return:   ForecastSeries object with the corresponding information
 
         :raises:
             BadWeatherException             API response is not parsable
@@ -150,13 +150,13 @@ class MetaWeatherHandler(BaseWeatherHandler):
         """
 
         try:
-            response = requests.get(self.get_url_forecast())
+            response = RequestCoalescer.get(self.API_NAME, "forecast", self.get_url_forecast())
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
 
             self.logger.info(f"Got forecast weather request from {self.API_NAME}")
             results = response.json()
-            forecast = []
+            forecast = ForecastSeries(self.city.name)
 
             date = datetime.datetime.fromisoformat(results["time"])
             time_zone = date.utcoffset() / datetime.timedelta(seconds=1)
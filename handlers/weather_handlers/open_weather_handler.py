@@ -1,13 +1,23 @@
-from typing import List
+from itertools import islice
+from typing import Dict, List, Optional
 
 import requests
 import logging
 
 from handlers.city import City
+from handlers.city_cache import CityCache
+from handlers.health_monitor import HealthMonitor
+from handlers.http_session import SessionRegistry
+from handlers.json_stream import JSONStreamParser
+from handlers.request_coalescer import RequestCoalescer
+from handlers.history_store import HistoryStore
+from handlers.weather_cache import WeatherCache
 from handlers.weather_handlers.base_weather_handler import BaseWeatherHandler
 from handlers.weather import Weather
+from handlers.forecast_series import ForecastSeries
 from handlers.errors import NoAPIConnectionException, BadWeatherException, NotCompatibleAPIException, \
     ServiceUnavailableException
+from handlers.tracing import traced
 
 from config import Config
 
@@ -19,11 +29,14 @@ class OpenWeatherHandler(BaseWeatherHandler):
     API key should be set in Config as OPEN_WEATHER_API_KEY
     url: https://openweathermap.org/api
     Attributes:
-        city           city object instance
+        city                city object instance
         logger
     Constants:
-        API_NAME       short API name
-        STATUS_TABLE   Weather object and API weather status mapping
+        API_NAME            short API name
+        STATUS_TABLE        Weather object and API weather status mapping
+        GROUP_SIZE          maximum number of cities in a group call
+    OpenWeather city ids are learned from the current weather responses
+    and kept in the CityCache by the location key
     """
     STATUS_TABLE = {
         "Thunderstorm": Weather.THUNDERSTORM,
@@ -43,27 +56,22 @@ class OpenWeatherHandler(BaseWeatherHandler):
         "Clouds": Weather.CLOUDY
     }
     API_NAME = "OpenWeather"
+    GROUP_SIZE = 20
 
-    def __init__(self, city: City):
-        super().__init__(city)
+    def __init__(self, city: City, hours: int = 0):
+        super().__init__(city, hours)
         self.logger = logging.getLogger("ow_wthr")
 
     def ping(self) -> bool:
         """
         OpenWeather API connection test
-        Tries to connect to the API for one second
+        Answers from the health learned from the real API calls, makes no calls
 
-        :return: whether the call was successful
+        :return: whether the API is considered available
         """
-        try:
-            self.logger.debug(f"Trying to ping {self.API_NAME}")
-            timeout = 1
-            requests.get("http://api.openweathermap.org", timeout=timeout)
-            self.logger.info(f"Ping to {self.API_NAME} successful")
-            return True
-        except (requests.ConnectionError, requests.Timeout):
-            self.logger.warning(f"Cant ping {self.API_NAME} city")
-            return False
+        available = HealthMonitor.is_available(self.API_NAME)
+        self.logger.debug(f"{self.API_NAME} available: {available}")
+        return available
 
     def get_url_current(self) -> str:
         """
@@ -85,19 +93,24 @@ class OpenWeatherHandler(BaseWeatherHandler):
             self.logger.warning(f"Not compatible {self.API_NAME}")
             raise NotCompatibleAPIException(self.API_NAME)
 
-    def get_url_forecast(self):
+    def get_url_forecast(self, hourly: bool = False) -> str:
         """
-        Gets OpenWeather API url to get a forecast
+        Gets OpenWeather One Call API url to get the daily forecast
+        Excludes the current weather, the minutely forecast, the alerts
+        and the hourly forecast unless it is requested in the same call (see _get_one_call)
         To have a successful call, OpenWeather API requires city longitude and latitude
         if not provided in the City object, raises the corresponding message
 
+        :param hourly: whether the hourly forecast is included
         :return: URL that can be visited to get a forecast
         :raises:
             NotCompatibleAPIException   if the api is not compatible with the city object
         """
         if self.city.longitude and self.city.latitude:
+            exclude = "current,minutely,alerts" if hourly else "current,minutely,hourly,alerts"
             url = f"https://api.openweathermap.org/data/2.5/onecall" \
                   f"?lat={self.city.latitude}&lon={self.city.longitude}" \
+                  f"&exclude={exclude}" \
                   f"&appid={Config.OPEN_WEATHER_API_KEY}"
             self.logger.debug(f"Created forecast url for {self.API_NAME}: {url}")
             return url
@@ -105,7 +118,8 @@ class OpenWeatherHandler(BaseWeatherHandler):
             self.logger.warning(f"Not compatible {self.API_NAME}")
             raise NotCompatibleAPIException(self.API_NAME)
 
-    def get_weather_current(self) -> Weather:
+    @traced("current")
+    def fetch_weather_current(self) -> Weather:
         """
         Gets the current weather from the OpenWeather API
 
@@ -117,22 +131,14 @@ class OpenWeatherHandler(BaseWeatherHandler):
             ServiceUnavailableException     API returned bad a response
         """
         try:
-            response = requests.get(self.get_url_current())
+            response = RequestCoalescer.get(self.API_NAME, "current", self.get_url_current())
             if response.status_code >= 400:
                 raise ServiceUnavailableException(self.API_NAME)
             self.logger.info(f"Got current weather request from {self.API_NAME}")
             weather_dict = response.json()
-            return Weather(
-                location_name=weather_dict["name"],
-                status=self.STATUS_TABLE[weather_dict["weather"][0]["main"]],
-                temperature=weather_dict["main"]["temp"] - 273.15,
-                pressure=weather_dict["main"]["pressure"],
-                humidity=weather_dict["main"]["humidity"],
-                wind_speed=weather_dict["wind"]["speed"],
-                wind_direction=weather_dict["wind"]["deg"],
-                time=weather_dict["dt"],
-                time_zone=weather_dict["timezone"]
-            )
+            if "id" in weather_dict:
+                CityCache.put_id(self.API_NAME, self.get_location_key(), weather_dict["id"])
+            return self._parse_current(weather_dict, weather_dict["name"])
         except KeyError:
             self.logger.warning(f"Bad weather response {self.API_NAME}")
             raise BadWeatherException(self.API_NAME)
@@ -140,13 +146,101 @@ class OpenWeatherHandler(BaseWeatherHandler):
             self.logger.warning(f"Error connecting {self.API_NAME}")
             raise NoAPIConnectionException(self.API_NAME, "current weather")
 
-    def get_weather_forecast(self, n: int) -> List[Weather]:
+    @classmethod
+    def get_url_group(cls, city_ids: List[int]) -> str:
+        """
+        Gets OpenWeather API url to get the current weather of many cities
+
+        :param city_ids: OpenWeather city ids
+        :return: URL that can be visited to get the weather information
+        """
+        ids = ",".join(str(city_id) for city_id in city_ids)
+        return f"https://api.openweathermap.org/data/2.5/group" \
+               f"?id={ids}&appid={Config.OPEN_WEATHER_API_KEY}"
+
+    @classmethod
+    @traced("group")
+    def get_weather_group(cls, cities: List[City]) -> List[Optional[Weather]]:
+        """
+        Gets the current weather of many cities with the group API calls
+        Only the cities with known OpenWeather ids can be requested in a group,
+        the ids are learned when the current weather of the city is requested
+        and stored in the CityCache, so they are known from the start of the next run
+        The results are also stored in the weather cache
+
+        :param cities: City objects
+        :return: Weather objects in the same order,
+                 None for the cities that cannot be requested in a group
+
+        :raises:
+            BadWeatherException             API response is not parsable
+            NoAPIConnectionException        API is not accessible
+            ServiceUnavailableException     API returned bad a response
+        """
+        logger = logging.getLogger("ow_wthr")
+        handlers = [cls(city) for city in cities]
+        results = [None] * len(cities)
+        city_ids = CityCache.get_ids(cls.API_NAME, [handler.get_location_key() for handler in handlers])
+        known = [
+            (index, handler, city_ids[handler.get_location_key()])
+            for index, handler in enumerate(handlers)
+            if handler.get_location_key() in city_ids
+        ]
+
+        try:
+            for start in range(0, len(known), cls.GROUP_SIZE):
+                group = known[start:start + cls.GROUP_SIZE]
+                url = cls.get_url_group([city_id for *_, city_id in group])
+                response = RequestCoalescer.get(cls.API_NAME, "current", url)
+                if response.status_code >= 400:
+                    raise ServiceUnavailableException(cls.API_NAME)
+                logger.info(f"Got group weather request of {len(group)} cities from {cls.API_NAME}")
+
+                weather_dicts = {weather_dict["id"]: weather_dict for weather_dict in response.json()["list"]}
+                for index, handler, city_id in group:
+                    if city_id in weather_dicts:
+                        weather = cls._parse_current(weather_dicts[city_id], handler.city.name)
+                        location_key = handler.get_location_key()
+                        WeatherCache.put((cls.API_NAME, location_key, "current"), weather, cls.CURRENT_TTL)
+                        HistoryStore.append_observation(cls.API_NAME, location_key, weather)
+                        results[index] = weather
+            return results
+        except KeyError:
+            logger.warning(f"Bad weather response {cls.API_NAME}")
+            raise BadWeatherException(cls.API_NAME)
+        except (requests.ConnectionError, requests.Timeout):
+            logger.warning(f"Error connecting {cls.API_NAME}")
+            raise NoAPIConnectionException(cls.API_NAME, "group weather")
+
+    @classmethod
+    def _parse_current(cls, weather_dict: dict, location_name: str) -> Weather:
+        """Creates a Weather object from the current weather response"""
+        if "timezone" in weather_dict:
+            time_zone = weather_dict["timezone"]
+        else:
+            time_zone = weather_dict["sys"]["timezone"]
+        return Weather(
+            location_name=location_name,
+            status=cls.STATUS_TABLE[weather_dict["weather"][0]["main"]],
+            temperature=weather_dict["main"]["temp"] - 273.15,
+            pressure=weather_dict["main"]["pressure"],
+            humidity=weather_dict["main"]["humidity"],
+            wind_speed=weather_dict["wind"]["speed"],
+            wind_direction=weather_dict["wind"]["deg"],
+            time=weather_dict["dt"],
+            time_zone=time_zone
+        )
+
+    @traced("forecast")
+    def fetch_weather_forecast(self, n: int) -> ForecastSeries:
         """
         Gets a forecast from the OpenWeather API
+        The One Call response is shared with the hourly forecast if it is requested as well,
+        otherwise the call excludes the hourly forecast and stops after the predicted days
 
         :param n:   number of predicted days
 
-        :return:   Weather object list with the corresponding information
+        :return:   ForecastSeries object with the corresponding information
 
         :raises:
             BadWeatherException             API response is not parsable
@@ -154,30 +248,116 @@ class OpenWeatherHandler(BaseWeatherHandler):
             ServiceUnavailableException     API returned bad a response
         """
         try:
-            response = requests.get(self.get_url_forecast())
-            if response.status_code >= 400:
-                raise ServiceUnavailableException(self.API_NAME)
-
+            if self.hours:
+                forecasts = self._get_one_call(self.hours)
+            else:
+                forecasts = self._read_one_call(self.get_url_forecast(), {"daily": n + 1})
             self.logger.info(f"Got forecast weather request from {self.API_NAME}")
-            results = response.json()
-            forecast = []
-            for day_info in results["daily"]:
-                weather = Weather(
-                    location_name=self.city.name,
-                    status=self.STATUS_TABLE[day_info["weather"][0]["main"]],
-                    temperature=day_info["temp"]["day"] - 273.15,
-                    pressure=day_info["pressure"],
-                    humidity=day_info["humidity"],
-                    wind_speed=day_info["wind_speed"],
-                    wind_direction=day_info["wind_deg"],
-                    time=day_info["dt"],
-                    time_zone=results["timezone_offset"]
-                )
-                forecast.append(weather)
-            return forecast[1:n + 1]
-        except (KeyError, IndexError):
+            return forecasts["daily"][1:n + 1]
+        except (KeyError, IndexError, ValueError):
             self.logger.warning(f"Bad weather response {self.API_NAME}")
             raise BadWeatherException(self.API_NAME)
-        except (requests.ConnectionError, requests.Timeout):
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+            self.logger.warning(f"Error connecting {self.API_NAME}")
+            raise NoAPIConnectionException(self.API_NAME, "forecast")
+
+    @traced("hourly")
+    def fetch_weather_hourly(self, hours: int) -> ForecastSeries:
+        """
+        Gets an hourly forecast from the OpenWeather API
+        The API predicts 48 hours, the One Call response is shared with the daily forecast
+
+        :param hours:   number of predicted hours
+
+        :return:   ForecastSeries object with an entry per hour
+
+        :raises:
+            BadWeatherException             API response is not parsable
+            NoAPIConnectionException        API is not accessible
+            ServiceUnavailableException     API returned bad a response
+        """
+        try:
+            forecasts = self._get_one_call(hours)
+            self.logger.info(f"Got hourly forecast request from {self.API_NAME}")
+            return forecasts["hourly"]
+        except (KeyError, IndexError, ValueError):
+            self.logger.warning(f"Bad weather response {self.API_NAME}")
+            raise BadWeatherException(self.API_NAME)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
             self.logger.warning(f"Error connecting {self.API_NAME}")
-            raise NoAPIConnectionException
+            raise NoAPIConnectionException(self.API_NAME, "hourly forecast")
+
+    def _get_one_call(self, hours: int) -> Dict[str, ForecastSeries]:
+        """
+        Gets the daily and the hourly forecasts from the cache, reads them if they are outdated
+        The daily and the hourly forecasts requested at the same time share a single call
+
+        :param hours: number of predicted hours
+        :return: all the predicted days and the predicted hours by the block name
+        """
+        key = self.API_NAME, self.get_location_key(), f"one_call_{hours}"
+        return WeatherCache.get(
+            key, lambda: self._read_one_call(self.get_url_forecast(hourly=True), {"hourly": hours, "daily": None}),
+            self.HOURLY_TTL
+        )
+
+    def _read_one_call(self, url: str, counts: Dict[str, Optional[int]]) -> Dict[str, ForecastSeries]:
+        """
+        Streams the One Call API response
+        Reads the time zone and the first entries of the requested blocks,
+        stops downloading as soon as the last block has enough entries
+
+        :param url: One Call API url
+        :param counts: number of the read entries by the block name, None to read the whole block
+        :return: ForecastSeries objects by the block name
+
+        :raises:
+            KeyError                        time zone offset or a block is not in the response
+            ValueError                      API response is not a valid JSON
+            ServiceUnavailableException     API returned bad a response
+        """
+        response = SessionRegistry.get(self.API_NAME, url, stream=True)
+        try:
+            if response.status_code >= 400:
+                raise ServiceUnavailableException(self.API_NAME)
+
+            parser = JSONStreamParser(response.iter_content(Config.STREAM_CHUNK_SIZE))
+            time_zone = None
+            blocks = {}
+            for key in parser.iter_object():
+                if key == "timezone_offset":
+                    time_zone = parser.read_value()
+                elif key in counts and len(blocks) == len(counts) - 1:
+                    blocks[key] = list(islice(parser.iter_array(), counts[key]))
+                    break
+                elif key in counts:
+                    blocks[key] = parser.read_array(counts[key])
+                else:
+                    parser.read_value()
+        finally:
+            response.close()
+
+        if time_zone is None:
+            raise KeyError("timezone_offset")
+        return {key: self._parse_block(entries, time_zone) for key, entries in blocks.items()}
+
+    def _parse_block(self, entries: List[dict], time_zone: float) -> ForecastSeries:
+        """Creates a ForecastSeries object from the daily or the hourly One Call entries"""
+        forecast = ForecastSeries(self.city.name)
+        for entry in entries:
+            temperature = entry["temp"]
+            # the daily entries have a temperature per part of the day
+            if isinstance(temperature, dict):
+                temperature = temperature["day"]
+            forecast.append(Weather(
+                location_name=self.city.name,
+                status=self.STATUS_TABLE[entry["weather"][0]["main"]],
+                temperature=temperature - 273.15,
+                pressure=entry["pressure"],
+                humidity=entry["humidity"],
+                wind_speed=entry["wind_speed"],
+                wind_direction=entry["wind_deg"],
+                time=entry["dt"],
+                time_zone=time_zone
+            ))
+        return forecast
@@ -0,0 +1,223 @@
+import logging
+import math
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Optional, Tuple
+
+from handlers.city import City
+from handlers.forecast_series import ForecastSeries
+from handlers.sun_info import SunInfo
+from handlers.weather import Weather
+from handlers.weather_fetcher import WeatherReport
+
+from config import Config
+
+
+class WeatherSnapshot:
+    """
+    Keeps the last successful weather report in a compact binary file
+    Restored on startup to show the last known weather before the first API call is made
+    Layout (little-endian):
+        header      magic, version, saved epoch time
+        strings     requested location name, city name, city state, weather location name,
+                    city woeid, city source
+        city        longitude, latitude, whether the woeid is a number
+        weather     status code and the numeric columns of ForecastSeries
+        sun info    sunrise, sunset, dusk
+        forecast    number of rows, status codes, then every numeric column
+        hourly      hourly forecast in the same layout as the forecast
+    Missing numbers are stored as NaN, missing strings with the NONE_LENGTH length
+    The woeid is stored as a string, the AccuWeather location keys are not numbers
+
+    Class attributes:
+        logger
+
+    Constants:
+        MAGIC, VERSION
+        HEADER, STRING, CITY, WEATHER, SUN, COUNT   binary record formats
+        STRINGS                                     number of the stored strings
+        NONE_LENGTH                                 string length marking None
+
+    Configuration (Config):
+        SNAPSHOT_FILE   path of the snapshot
+    """
+
+    MAGIC = b"WSNP"
+    VERSION = 2
+
+    HEADER = struct.Struct("<4sBd")
+    STRING = struct.Struct("<H")
+    CITY = struct.Struct("<dd?")
+    WEATHER = struct.Struct(f"<B{len(ForecastSeries.COLUMNS)}d")
+    SUN = struct.Struct("<3d")
+    COUNT = struct.Struct("<I")
+
+    STRINGS = 6
+    NONE_LENGTH = 0xFFFF
+
+    logger = logging.getLogger("snapshot")
+
+    @classmethod
+    def save(cls, city_name: str, report: WeatherReport) -> None:
+        """
+        Stores the report, replaces the previous one
+        The file is written aside and renamed, so a crash never leaves a partial snapshot
+
+        :param city_name: requested location name
+        :param report: WeatherReport object
+        :return: None
+        """
+        city, weather, sun_info = report.city, report.weather, report.sun_info
+        forecast = report.forecast if isinstance(report.forecast, ForecastSeries) \
+            else ForecastSeries.from_weathers(report.forecast, weather.city_name)
+        woeid = None if city.woeid is None else str(city.woeid)
+
+        data = bytearray(cls.HEADER.pack(cls.MAGIC, cls.VERSION, time.time()))
+        for text in (city_name, city.name, city.state, weather.city_name, woeid, city.source):
+            data += cls._pack_string(text)
+        data += cls.CITY.pack(
+            cls._to_float(city.longitude), cls._to_float(city.latitude), isinstance(city.woeid, int)
+        )
+        data += cls.WEATHER.pack(
+            Weather.STATUS_CODES.index(weather.status),
+            *(cls._to_float(getattr(weather, column)) for column in ForecastSeries.COLUMNS)
+        )
+        data += cls.SUN.pack(
+            cls._to_float(sun_info.sunrise), cls._to_float(sun_info.sunset), cls._to_float(sun_info.dusk)
+        )
+        data += cls._pack_series(forecast)
+        data += cls._pack_series(report.hourly)
+
+        temporary = f"{Config.SNAPSHOT_FILE}.tmp"
+        try:
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, Config.SNAPSHOT_FILE)
+        except OSError as e:
+            cls.logger.warning(f"Snapshot is not saved: {e}")
+            return
+        cls.logger.debug(f"Saved the snapshot of {city_name} ({len(data)} bytes)")
+
+    @classmethod
+    def load(cls) -> Optional[Tuple[str, float, WeatherReport]]:
+        """
+        Restores the last stored report
+        The weather state (image and colors) is updated for the current time
+
+        :return: requested location name, saved epoch time and WeatherReport object,
+                 None if there is no valid snapshot
+        """
+        try:
+            with open(Config.SNAPSHOT_FILE, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            magic, version, saved = cls.HEADER.unpack_from(data)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                cls.logger.info("Snapshot of another version is ignored")
+                return None
+            offset = cls.HEADER.size
+
+            strings = []
+            for _ in range(cls.STRINGS):
+                text, offset = cls._unpack_string(data, offset)
+                strings.append(text)
+            city_name, name, state, location_name, woeid, source = strings
+
+            longitude, latitude, numeric_woeid = cls.CITY.unpack_from(data, offset)
+            offset += cls.CITY.size
+            city = City(
+                name, longitude=cls._from_float(longitude), latitude=cls._from_float(latitude),
+                woeid=int(woeid) if woeid is not None and numeric_woeid else woeid, state=state, source=source
+            )
+
+            status, *values = cls.WEATHER.unpack_from(data, offset)
+            offset += cls.WEATHER.size
+            weather = Weather(
+                location_name=location_name, status=Weather.STATUS_CODES[status],
+                **{column: cls._from_float(value) for column, value in zip(ForecastSeries.COLUMNS, values)}
+            )
+
+            sunrise, sunset, dusk = cls.SUN.unpack_from(data, offset)
+            offset += cls.SUN.size
+            sun_info = SunInfo(cls._from_float(sunrise), cls._from_float(sunset), cls._from_float(dusk))
+
+            forecast, offset = cls._unpack_series(data, offset, location_name)
+            hourly, offset = cls._unpack_series(data, offset, location_name)
+        except (struct.error, ValueError, IndexError, UnicodeDecodeError) as e:
+            cls.logger.warning(f"Snapshot is corrupted: {e}")
+            return None
+
+        weather.update_state(sun_info, time.time())
+        return city_name, saved, WeatherReport(
+            city=city, sun_info=sun_info, weather=weather, forecast=forecast, hourly=hourly
+        )
+
+    @classmethod
+    def _pack_series(cls, series: ForecastSeries) -> bytes:
+        """Packs the number of rows, the status codes and the numeric columns"""
+        data = bytearray(cls.COUNT.pack(len(series)))
+        data += series.status.tobytes()
+        for column in ForecastSeries.COLUMNS:
+            data += cls._to_little_endian(getattr(series, column)).tobytes()
+        return data
+
+    @classmethod
+    def _unpack_series(cls, data: bytes, offset: int, location_name: str) -> Tuple[ForecastSeries, int]:
+        """Unpacks the series, returns it with the offset of the next value"""
+        count, = cls.COUNT.unpack_from(data, offset)
+        offset += cls.COUNT.size
+        series = ForecastSeries(location_name)
+        series.status.frombytes(data[offset:offset + count])
+        offset += count
+        for column in ForecastSeries.COLUMNS:
+            values = array("d")
+            values.frombytes(data[offset:offset + count * values.itemsize])
+            offset += count * values.itemsize
+            setattr(series, column, cls._to_little_endian(values))
+        if len(series.status) != count or any(len(getattr(series, column)) != count
+                                              for column in ForecastSeries.COLUMNS):
+            raise ValueError("truncated forecast")
+        return series, offset
+
+    @classmethod
+    def _pack_string(cls, text: Optional[str]) -> bytes:
+        """Packs the string with its length"""
+        if text is None:
+            return cls.STRING.pack(cls.NONE_LENGTH)
+        encoded = str(text).encode("utf-8")[:cls.NONE_LENGTH - 1]
+        return cls.STRING.pack(len(encoded)) + encoded
+
+    @classmethod
+    def _unpack_string(cls, data: bytes, offset: int) -> Tuple[Optional[str], int]:
+        """Unpacks the string, returns it with the offset of the next value"""
+        length, = cls.STRING.unpack_from(data, offset)
+        offset += cls.STRING.size
+        if length == cls.NONE_LENGTH:
+            return None, offset
+        if offset + length > len(data):
+            raise ValueError("truncated string")
+        return data[offset:offset + length].decode("utf-8"), offset + length
+
+    @staticmethod
+    def _to_float(value) -> float:
+        """Converts the optional number to a float, None to NaN"""
+        return math.nan if value is None else float(value)
+
+    @staticmethod
+    def _from_float(value: float) -> Optional[float]:
+        """Converts NaN back to None"""
+        return None if math.isnan(value) else value
+
+    @staticmethod
+    def _to_little_endian(values: array) -> array:
+        """Swaps the bytes of the array on big-endian machines (the swap is its own inverse)"""
+        if sys.byteorder == "big":
+            values = array(values.typecode, values)
+            values.byteswap()
+        return values
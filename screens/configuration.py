@@ -23,30 +23,36 @@ class ConfigurationScreen(Screen):
 
     Methods:
         load_preferences
+        show_preferences
         save_preferences
-        save_defaults
     """
 
+    def on_pre_enter(self, *args) -> None:
+        """Shows the current settings when the screen is opened"""
+        self.show_preferences()
+
     def load_preferences(self) -> None:
         """
         Loads settings from the preferences.json file
-        Sets root application object accordingly
+        Sets root application object accordingly (see WeatherApp.load_preferences)
         Sets buttons and entries
-        Loads all the settings listed above in one go
         :return: None
         """
-        app = App.get_running_app()
+        App.get_running_app().load_preferences()
+        self.show_preferences()
 
-        with open(Config.PREFERENCES_FILE, "r") as f:
-            preferences = json.load(f)
+    def show_preferences(self) -> None:
+        """
+        Sets buttons and entries from the settings of the root application object
+        :return: None
+        """
+        app = App.get_running_app()
 
-        app.time_format = preferences["time_format"]
         if app.time_format == 24:
             self.ids.toggle_time_24.state = "down"
         else:
             self.ids.toggle_time_12.state = "down"
 
-        app.temp_format = preferences["temp_format"]
         if app.temp_format == "C":
             self.ids.toggle_temp_cels.state = "down"
         else:
@@ -56,17 +62,10 @@ class ConfigurationScreen(Screen):
         self.ids.api_weather_selection.values = [api for api in app.weather_handlers]
         self.ids.api_sun_selection.values = [api for api in app.sun_handlers]
 
-        app.selected_city_handler = preferences["city_api"]
-        app.selected_weather_handler = preferences["weather_api"]
-        app.selected_sun_handler = preferences["sun_api"]
-
         self.ids.api_geo_selection.text = app.selected_city_handler
         self.ids.api_sun_selection.text = app.selected_sun_handler
         self.ids.api_weather_selection.text = app.selected_weather_handler
 
-        app.preferred_city_to_load = preferences["preferred_city_to_load"]
-        app.preferred_city = preferences["preferred_city"]
-
         if app.preferred_city_to_load:
             self.ids.auto_city_on_toggle.state = "down"
             self.ids.auto_city_off_toggle.state = "normal"
@@ -75,11 +74,6 @@ class ConfigurationScreen(Screen):
             self.ids.auto_city_off_toggle.state = "down"
             self.ids.auto_city_on_toggle.state = "normal"
             self.ids.auto_city_input.text = ""
-            app.preferred_city = ""
-
-        app.city_handler_class = app.city_handlers[app.selected_city_handler]
-        app.sun_handler_class = app.sun_handlers[app.selected_sun_handler]
-        app.weather_handler_class = app.weather_handlers[app.selected_weather_handler]
 
     def save_preferences(self) -> None:
         """
@@ -128,23 +122,6 @@ class ConfigurationScreen(Screen):
 
         self.load_preferences()
 
-    def save_defaults(self) -> None:
-        """
-        Saves the default configuration in the preferences.json file
-        :return:
-        """
-        defaults = {
-            "time_format": 24,
-            "temp_format": "C",
-            "city_api": list(self.city_handlers)[0],
-            "weather_api": list(self.weather_handlers)[0],
-            "sun_api": list(self.sun_handlers)[0],
-            "preferred_city_to_load": False,
-            "preferred_city": ""
-        }
-        with open(Config.PREFERENCES_FILE, "w") as f:
-            json.dump(defaults, f, indent=2)
-
 
 class APIOption(SpinnerOption):
     """API Spinner option class"""
@@ -0,0 +1,184 @@
+import json
+import logging
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.properties import StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.screenmanager import Screen
+
+from handlers.async_loop import AsyncLoop
+from handlers.dashboard_refresher import DashboardRefresher
+from handlers.errors import WeatherAppException
+from handlers.load_coordinator import LoadCoordinator
+from handlers.refresh_policy import RefreshPolicy
+
+from config import Config
+
+
+class DashboardRow(BoxLayout):
+    """Row of the dashboard list, reused by the recycle view"""
+    city_name = StringProperty()
+    status_text = StringProperty()
+    temp_text = StringProperty()
+    image_source = StringProperty(Config.ERROR_IMAGE)
+
+
+class DashboardScreen(Screen):
+    """
+    Dashboard screen to display the current weather of many cities
+    Uses watchlist.json file to store the watched locations
+    All the cities are refreshed at once with the batched calls,
+    refreshes are repeated automatically while the screen is shown
+    A refresh requested while another one is running is queued
+    and started when the running one is finished
+    Overrides the kivy screen object
+
+    Attributes:
+        watchlist       names of the watched locations
+        refresh_event   scheduled automatic refresh
+        loads           LoadCoordinator running the refreshes on the event loop
+        rerun           whether a refresh was requested while another one was running
+        logger
+    Methods:
+        load_watchlist
+        save_watchlist
+        add_city
+        remove_city
+        refresh
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.watchlist = None
+        self.refresh_event = None
+        self.loads = LoadCoordinator(1, lambda function: Clock.schedule_once(lambda *args: function()))
+        self.rerun = False
+        self.logger = logging.getLogger("dashbrd")
+
+    def on_pre_enter(self, *args) -> None:
+        """Loads the watchlist on the first visit and refreshes the weather"""
+        if self.watchlist is None:
+            self.load_watchlist()
+        self.refresh()
+
+    def on_leave(self, *args) -> None:
+        """Stops the automatic refresh when the screen is hidden"""
+        if self.refresh_event:
+            self.refresh_event.cancel()
+
+    def load_watchlist(self) -> None:
+        """
+        Loads the watched locations from the watchlist.json file
+        Starts with an empty list if the file does not exist
+        :return: None
+        """
+        try:
+            with open(Config.WATCHLIST_FILE, "r") as f:
+                self.watchlist = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.watchlist = []
+
+    def save_watchlist(self) -> None:
+        """
+        Saves the watched locations to the watchlist.json file
+        :return: None
+        """
+        with open(Config.WATCHLIST_FILE, "w") as f:
+            json.dump(self.watchlist, f, indent=2)
+
+    def add_city(self) -> None:
+        """
+        Adds the location from the entry to the watchlist
+        :return: None
+        """
+        city_name = self.ids.dashboard_city_input.text.strip()
+        self.ids.dashboard_city_input.text = ""
+        if city_name and city_name not in self.watchlist:
+            self.watchlist.append(city_name)
+            self.save_watchlist()
+            self.refresh()
+
+    def remove_city(self, city_name: str) -> None:
+        """
+        Removes the location from the watchlist
+        :param city_name: name of the location
+        :return: None
+        """
+        if city_name in self.watchlist:
+            self.watchlist.remove(city_name)
+            self.save_watchlist()
+            self.ids.dashboard_list.data = [
+                row for row in self.ids.dashboard_list.data if row["city_name"] != city_name
+            ]
+
+    def refresh(self) -> None:
+        """
+        Refreshes the weather of all the watched cities on the event loop
+        Queues another refresh if the refresh is already running,
+        so the cities added in the meantime are not missed
+        :return: None
+        """
+        if self.loads.is_busy():
+            self.rerun = True
+            return
+        self.rerun = False
+
+        app = App.get_running_app()
+        city_handler_class, weather_handler_class = app.city_handler_class, app.weather_handler_class
+        city_names = list(self.watchlist)
+
+        async def fetch() -> list:
+            return await AsyncLoop.run_blocking(
+                DashboardRefresher.refresh, city_handler_class, weather_handler_class, city_names
+            )
+
+        self.loads.submit(fetch, self._set_entries, self._set_error)
+
+    def _set_error(self, error: WeatherAppException) -> None:
+        """Keeps the shown rows after a failed refresh, the refresh is repeated as usual"""
+        self.logger.warning(f"Dashboard refresh failed: {error.message}")
+        self._finish_refresh()
+
+    def _finish_refresh(self) -> None:
+        """Starts the queued refresh or schedules the next automatic one"""
+        if self.rerun:
+            self.refresh()
+        else:
+            self._schedule_refresh()
+
+    def _schedule_refresh(self) -> None:
+        """Schedules the next automatic refresh while the screen is shown"""
+        if self.refresh_event:
+            self.refresh_event.cancel()
+        if self.manager.current != self.name:
+            return
+        app = App.get_running_app()
+        interval = RefreshPolicy.get_interval(app.weather_handler_class)
+        self.refresh_event = Clock.schedule_once(lambda *args: self.refresh(), interval)
+
+    def _set_entries(self, entries: list) -> None:
+        """Fills the list with the refreshed cities"""
+        app = App.get_running_app()
+        rows = []
+        for entry in entries:
+            if entry.weather:
+                temperature = entry.weather.temperature
+                if app.temp_format != "C":
+                    # C to F conversion rate is t * 9/5 + 32
+                    temperature = temperature * 9 / 5 + 32
+                rows.append({
+                    "city_name": entry.name,
+                    "status_text": entry.weather.status.capitalize(),
+                    "temp_text": f"{round(temperature)}°{app.temp_format}",
+                    "image_source": entry.weather.image
+                })
+            else:
+                rows.append({
+                    "city_name": entry.name,
+                    "status_text": entry.error or "Error",
+                    "temp_text": "",
+                    "image_source": Config.ERROR_IMAGE
+                })
+        self.ids.dashboard_list.data = rows
+        self._finish_refresh()
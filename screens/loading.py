@@ -17,6 +17,11 @@ class LoadingScreen(Screen):
         super().__init__(**kw)
         self.animation = None
 
+    def on_pre_enter(self, *args) -> None:
+        """Starts the animation when the screen is shown for the first time"""
+        if not self.animation:
+            self.animation_start()
+
     def animation_stop(self) -> None:
         """
         Stops the animation
@@ -1,46 +1,132 @@
-from threading import Thread
+from typing import List
 
 from kivy.app import App
 from kivy.clock import Clock
+from kivy.properties import NumericProperty
+from kivy.uix.button import Button
+from kivy.uix.dropdown import DropDown
 from kivy.uix.screenmanager import Screen, SlideTransition
 
+from handlers.city import City
+from handlers.city_cache import CityCache
+from handlers.load_coordinator import LoadCoordinator
+
+from config import Config
+
+
+class SuggestionRow(Button):
+    """Row of the suggestion list"""
+    index = NumericProperty()
+
 
 class SearchScreen(Screen):
     """
     Search screen is based on the location entry and search button
     After the location is entered loads weather information by calling
     the corresponding method of the status screen
+    While the location is typed suggests the matching cities,
+    a picked city is loaded without the location lookup
     Overrides the kivy screen object
 
+    Attributes:
+        suggestions         cities shown in the suggestion list
+        suggestion_list     drop down with the suggestions
+        suggest_event       scheduled suggestion request
+        suggestion_loads    LoadCoordinator of the suggestion requests
+        picked_name         name of the picked city put into the entry
     Methods:
         load_city
+        suggest
+        pick_suggestion
     """
 
-    def load_city(self, city_name: str = None) -> None:
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.suggestions = []
+        self.suggestion_list = DropDown()
+        self.suggest_event = None
+        self.suggestion_loads = LoadCoordinator(
+            1, lambda function: Clock.schedule_once(lambda *args: function())
+        )
+        self.picked_name = None
+
+    def load_city(self, city_name: str = None, suggestion: City = None) -> None:
         """
         Gets the location name and makes an API call
-        Uses the similar internal method to make a call on a different thread
+        The load is made by the status screen on the event loop,
+        a new search supersedes the one still running
         :param city_name:
+        :param suggestion: picked suggested city
         :return: None
         """
         app = App.get_running_app()
-        Thread(target=self._load_weather, args=(city_name,)).start()
+
+        if not city_name:
+            city_name = self.ids.city_input.text
+        self._stop_suggestions()
+        app.status_screen.load_weather(city_name, on_done=self._set_screen_status, city=suggestion)
         app.screen_manager.transition = SlideTransition(direction="left")
         app.screen_manager.current = "loading"
 
+    def suggest(self, text: str) -> None:
+        """
+        Requests the suggestions when the typing pauses
+        Replaces the previously scheduled request
+        :param text: entered location name
+        :return: None
+        """
+        if self.suggest_event:
+            self.suggest_event.cancel()
+        if text == self.picked_name:
+            return
+        self.picked_name = None
+        if len(CityCache.normalize(text)) < Config.SUGGESTION_MIN_LENGTH:
+            self._stop_suggestions()
+            return
+        self.suggest_event = Clock.schedule_once(lambda *args: self._request_suggestions(text), Config.SUGGESTION_DELAY)
+
+    def pick_suggestion(self, index: int) -> None:
+        """
+        Loads the weather of the picked suggested city
+        :param index: index of the city in the suggestion list
+        :return: None
+        """
+        city = self.suggestions[index]
+        self.picked_name = city.name
+        self.ids.city_input.text = city.name
+        self.load_city(city.name, city)
+
+    def _request_suggestions(self, text: str) -> None:
+        """Gets the suggestions on the event loop, supersedes the running request"""
+        app = App.get_running_app()
+        self.suggestion_loads.submit(
+            lambda: app.city_handler_class(text).get_suggestions_async(),
+            self._set_suggestions,
+            lambda error: self._set_suggestions([])
+        )
+
+    def _set_suggestions(self, cities: List[City]) -> None:
+        """Fills the suggestion list, opens it under the entry if there is anything to suggest"""
+        self.suggestions = cities
+        self.suggestion_list.clear_widgets()
+        for index, city in enumerate(cities):
+            row = SuggestionRow(text=f"{city.name}, {city.state}" if city.state else city.name, index=index)
+            row.bind(on_release=lambda row: self.pick_suggestion(row.index))
+            self.suggestion_list.add_widget(row)
+
+        if not cities:
+            self.suggestion_list.dismiss()
+        elif self.suggestion_list.attach_to is None and self.manager.current == self.name:
+            self.suggestion_list.open(self.ids.city_input)
+
+    def _stop_suggestions(self) -> None:
+        """Cancels the scheduled and running requests, hides the suggestion list"""
+        if self.suggest_event:
+            self.suggest_event.cancel()
+        self.suggestion_loads.cancel()
+        self._set_suggestions([])
+
     def _set_screen_status(self, *args):
         app = App.get_running_app()
         app.screen_manager.transition = SlideTransition(direction="left")
         app.screen_manager.current = "status"
-
-    def _load_weather(self, city_name):
-        app = App.get_running_app()
-
-        if not city_name:
-            city_name = self.ids.city_input.text
-        app.status_screen.set_weather(city_name)
-        app.status_screen.update_weather()
-        # considering that the kivy framework does not allow
-        # to change graphics on the different thread
-        # a clock object is used
-        Clock.schedule_once(self._set_screen_status)
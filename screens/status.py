@@ -1,17 +1,35 @@
+import math
 import time
 from datetime import datetime
-from threading import Thread
+from threading import Lock
+from typing import Callable
 
 from kivy.animation import Animation
 from kivy.app import App
-from kivy.properties import Clock
+from kivy.properties import Clock, BooleanProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.screenmanager import Screen
 
+from handlers.async_loop import AsyncLoop
+from handlers.city import City
 from handlers.errors import WeatherAppException
+from handlers.forecast_scorer import ForecastScorer
+from handlers.load_coordinator import LoadCoordinator
+from handlers.weather_fetcher import WeatherFetcher, WeatherReport
+from handlers.refresh_policy import RefreshPolicy
+from handlers.status_view import StatusView
+from handlers.weather_snapshot import WeatherSnapshot
 
 from config import Config
 
 
+class TimelineCell(BoxLayout):
+    """Hour of the hourly timeline, reused by the recycle view"""
+    hour_text = StringProperty()
+    temp_text = StringProperty()
+    image_source = StringProperty(Config.ERROR_IMAGE)
+
+
 class StatusScreen(Screen):
     """
         Status screen to display the current weather conditions and a forecast
@@ -19,28 +37,75 @@ class StatusScreen(Screen):
         Attributes:
             city        City object to store the current city
             weather     Weather object to store the current weather conditions
-            forecast    Weather list to store the forecast
+            forecast    ForecastSeries object to store the forecast
+            hourly      ForecastSeries object with the hourly forecast shown in the timeline
+            sun_info    SunInfo object of the current city
+            last_city_name  name of the last requested location
+            failures    number of the refreshes failed in a row
             loading_animation
+            refresh_event   scheduled automatic refresh
+            time_event      scheduled clock update
+            loads           LoadCoordinator applying only the newest load
+            shown_view      StatusView object applied to the widgets
+            pending_view    StatusView object waiting for the next frame
+            render_lock     guards pending_view
+            stale           whether the shown weather is restored from the snapshot
+                            and not refreshed yet
             app
         Methods:
             set_city
-            set_weather
+            restore_report
+            load_weather
+            fetch_report
+            apply_report
+            apply_error
             refresh_weather
-            convert_temp
+            schedule_refresh
             update_weather
+            render
             update_time
-            set_background
             set_error
         """
 
+    stale = BooleanProperty(False)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
         self.city = None
         self.weather = None
         self.forecast = None
+        self.hourly = None
+        self.sun_info = None
+        self.last_city_name = None
+        self.failures = 0
         self.loading_animation = None
 
+        self.refresh_event = None
+        self.time_event = None
+
+        self.shown_view = None
+        self.pending_view = None
+        self.render_lock = Lock()
+        self.loads = LoadCoordinator(
+            Config.LOAD_MAX_CONCURRENT,
+            lambda function: Clock.schedule_once(lambda *args: function())
+        )
+
+    def on_enter(self, *args) -> None:
+        """Starts the clock updates when the screen is shown"""
+        self._schedule_time_update()
+
+    def on_leave(self, *args) -> None:
+        """
+        Stops the clock updates when the screen is hidden
+        Stops the automatic refresh when returning to the search
+        """
+        if self.time_event:
+            self.time_event.cancel()
+        if self.manager.current == "search" and self.refresh_event:
+            self.refresh_event.cancel()
+
     def set_city(self, city_name: str) -> None:
         """
         Gets city information with a handler
@@ -50,37 +115,174 @@ class StatusScreen(Screen):
         app = App.get_running_app()
         self.city = app.city_handler_class(city_name).get_city()
 
-    def set_weather(self, city_name: str) -> None:
+    def restore_report(self, city_name: str, report: WeatherReport) -> None:
+        """
+        Shows the report restored from the snapshot marked as stale
+        and refreshes it in the background
+        Should be called on the main thread
+        :param city_name: requested location name
+        :param report: WeatherReport object
+        :return: None
+        """
+        self.last_city_name = city_name
+        self.apply_report(report)
+        self.stale = True
+        self._refresh_animation_start()
+        self._refresh(on_done=self._refresh_animation_stop)
+
+    def load_weather(self, city_name: str, on_done: Callable = None, city: City = None,
+                     on_superseded: Callable = None) -> None:
         """
-        Gets the current weather report from the handler
-        Sets the internal weather attribute
-        If the exception occurs resets the city, the weather and the forecast
-        and sets the application theme and status screen
-        by calling set_error method
+        Loads the weather report of the location on the event loop
+        Supersedes the running load, only the newest report is applied
         :param city_name: name of the location
+        :param on_done: called on the main thread after the report or the error is applied
+        :param city: picked suggested city or the shown city, skips the location lookup
+        :param on_superseded: called on the main thread if a newer load replaces this one
         :return: None
         """
-        try:
-            self.set_city(city_name)
-            app = App.get_running_app()
-            sun_info = app.sun_handler_class(self.city).get_sun_info()
-            weather_handler = app.weather_handler_class(self.city)
-            self.weather = weather_handler.get_weather_current()
-            self.forecast = weather_handler.get_weather_forecast(4)
-            self.weather.update_state(sun_info)
-        except WeatherAppException as e:
-            self.city = None
-            self.weather = None
-            self.forecast = None
-            self.set_error(e.message)
+        self.last_city_name = city_name
+
+        async def fetch() -> tuple:
+            report = await self.fetch_report(city_name, city)
+            return report, self._make_view(report)
+
+        def apply(result: tuple) -> None:
+            self.apply_report(*result)
+            if on_done:
+                on_done()
+
+        def fail(error: WeatherAppException) -> None:
+            self.apply_error(error.message)
+            if on_done:
+                on_done()
+
+        self.loads.submit(fetch, apply, fail, on_superseded)
+
+    async def fetch_report(self, city_name: str, city: City = None) -> WeatherReport:
+        """
+        Gets the current weather report from the handlers
+        The sun information, the current weather and the forecast
+        are requested in parallel after the city is found
+        Does not change the screen, can be run on any thread
+        :param city_name: name of the location
+        :param city: picked suggested city or the shown city, completed instead of looking up the name
+        :return: WeatherReport object
+
+        :raises:
+            WeatherAppException     any of the handlers failed
+        """
+        app = App.get_running_app()
+        if city:
+            city = await app.city_handler_class(city_name).select_city_async(city)
+        report = await WeatherFetcher.fetch_async(
+            app.city_handler_class,
+            app.sun_handler_class,
+            app.weather_handler_class,
+            city_name, 4, Config.HOURLY_FORECAST_HOURS, city
+        )
+        # the cached weather may have been observed before the theme transition
+        report.weather.update_state(report.sun_info, time.time())
+        await AsyncLoop.run_blocking(WeatherSnapshot.save, city_name, report)
+        ForecastScorer.schedule(report.city)
+        return report
+
+    def apply_report(self, report: WeatherReport, view: StatusView = None) -> None:
+        """
+        Sets the internal weather attributes and updates the labels
+        Should be called on the main thread
+        :param report: WeatherReport object
+        :param view: StatusView object of the report, computed if not provided
+        :return: None
+        """
+        self.city = report.city
+        self.weather = report.weather
+        self.forecast = report.forecast
+        self.hourly = report.hourly
+        self.sun_info = report.sun_info
+        self.failures = 0
+        self.stale = False
+        self.render(view or self._make_view(report))
+        Clock.schedule_once(self.schedule_refresh)
+
+    def apply_error(self, message: str) -> None:
+        """
+        Resets the city, the weather and the forecast
+        and sets the application theme and status screen by calling set_error method
+        The weather restored from the snapshot is kept until a refresh succeeds
+        Should be called on the main thread
+        :param message: error message
+        :return: None
+        """
+        if self.stale:
+            self.failures += 1
+            self.schedule_refresh()
+            return
+        self.city = None
+        self.weather = None
+        self.forecast = None
+        self.hourly = None
+        self.sun_info = None
+        self.failures += 1
+        self.set_error(message)
+        self.schedule_refresh()
 
     def refresh_weather(self) -> None:
         """
-        Updates the weather and forecast
-        Calls internal method, uses a different thread
+        Updates the weather and forecast with the spinner animation
+        Does nothing if the weather is already loading
+        :return: None
+        """
+        if self.loads.is_busy() or not self.last_city_name:
+            return
+        self._refresh_animation_start()
+        self._refresh(on_done=self._refresh_animation_stop)
+
+    def schedule_refresh(self, *args) -> None:
+        """
+        Schedules the next automatic refresh of the last requested location
+        The interval depends on the provider, the time the weather was fetched,
+        the upcoming theme transitions and the failed refreshes
+        Replaces the previously scheduled refresh
         :return: None
         """
-        Thread(target=self._update_weather_animated).start()
+        if self.refresh_event:
+            self.refresh_event.cancel()
+        if not self.last_city_name:
+            return
+
+        app = App.get_running_app()
+        fetched = app.weather_handler_class(self.city).get_fetched_time() if self.city else None
+        interval = RefreshPolicy.get_interval(
+            app.weather_handler_class, fetched, self.sun_info, self.failures
+        )
+        self.refresh_event = Clock.schedule_once(self._auto_refresh, interval)
+
+    def _auto_refresh(self, *args) -> None:
+        """
+        Refreshes the weather in the background unless it is already loading
+        Only changes the theme at a sunrise or sunset transition while the weather is not expired,
+        fetches the expired weather again instead of accepting the stale cached one
+        """
+        if self.loads.is_busy():
+            return
+        app = App.get_running_app()
+        if self.city and self.weather and not self.failures and not self.stale:
+            weather_handler = app.weather_handler_class(self.city)
+            if not RefreshPolicy.is_expired(app.weather_handler_class, weather_handler.get_fetched_time()):
+                self.weather.update_state(self.sun_info, time.time())
+                self.update_weather()
+                self.schedule_refresh()
+                return
+            weather_handler.invalidate_weather_current()
+        self._refresh()
+
+    def _refresh(self, on_done: Callable = None) -> None:
+        """
+        Loads the weather of the shown city, looks the location up again if the last load failed
+        on_done is called even if a new search replaces the refresh, so the spinner always stops
+        """
+        self.load_weather(self.last_city_name, on_done, self.city, on_done)
 
     def _refresh_animation_stop(self):
         """Stops the rotating spinner animation"""
@@ -95,64 +297,63 @@ class StatusScreen(Screen):
         self.loading_animation.repeat = True
         self.loading_animation.start(self.ids.refresh_button_image)
 
-    def convert_temp(self, temp: float, verbose: bool = False) -> str:
+    def update_weather(self) -> None:
         """
-        Converts the numeric temperature value from Celsius to Fahrenheit
-        Returns a printable string with or without the temperature units name
-        :param temp:        numeric temperature value in Celsius
-        :param verbose:     whether the sting should contain a unit name
-        :return:            prinable string
+        Updates the labels with the last received weather
+        in the current temperature units and time format
+        Does nothing if there is no weather
+        :return: None
         """
-        app = App.get_running_app()
-        if app.temp_format == "C":
-            temp_text = f"{round(temp)}°"
-        else:
-            # C to F conversion rate is t * 9/5 + 32
-            temp_text = f"{round(self.weather.temperature * 9/5 + 32)}°"
-        if verbose:
-            temp_text += app.temp_format
-        return temp_text
+        if self.city and self.weather and self.forecast is not None:
+            self.render(self._make_view(WeatherReport(
+                self.city, self.sun_info, self.weather, self.forecast, self.hourly
+            )))
 
-    def update_weather(self) -> None:
+    def render(self, view: StatusView) -> None:
         """
-        Updates all the labels with the weather and forecast information
-        If the AttributeException is raised does nothing
-        :return:
+        Applies the view on the main thread in one batch on the next frame
+        Only the newest view is applied if several are rendered before it
+        Can be called on any thread
+        :param view: StatusView object
+        :return: None
         """
-        try:
-            self.set_weather(self.city.name)
-            # if the city name is too long, truncates it
-            if len(self.city.name) > 13:
-                self.ids.city_name.text = f"{self.city.name[:10]}..."
-            else:
-                self.ids.city_name.text = self.city.name
-
-            if self.weather:
-                self.ids.weather_status.text = self.weather.status.capitalize()
-                self.ids.weather_temp.text = self.convert_temp(self.weather.temperature, verbose=True)
-                self.ids.weather_image.source = self.weather.image
-
-                self.ids.forecast_day_1.text = datetime.fromtimestamp(self.forecast[0].time).strftime('%a')
-                self.ids.forecast_temp_1.text = self.convert_temp(self.forecast[0].temperature)
-
-                self.ids.forecast_day_2.text = datetime.fromtimestamp(self.forecast[1].time).strftime('%a')
-                self.ids.forecast_temp_2.text = self.convert_temp(self.forecast[1].temperature)
-
-                self.ids.forecast_day_3.text = datetime.fromtimestamp(self.forecast[2].time).strftime('%a')
-                self.ids.forecast_temp_3.text = self.convert_temp(self.forecast[2].temperature)
-
-                self.ids.forecast_day_4.text = datetime.fromtimestamp(self.forecast[3].time).strftime('%a')
-                self.ids.forecast_temp_4.text = self.convert_temp(self.forecast[3].temperature)
+        with self.render_lock:
+            scheduled = self.pending_view is not None
+            self.pending_view = view
+        if not scheduled:
+            Clock.schedule_once(self._apply_view)
+
+    def _apply_view(self, *args) -> None:
+        """Sets only the widget properties that differ from the shown view"""
+        with self.render_lock:
+            view, self.pending_view = self.pending_view, None
+
+        for (widget_id, name), value in view.get_changes(self.shown_view).items():
+            setattr(self.ids[widget_id], name, value)
+        # the recycle view creates the cells of the visible hours only and reuses them while scrolling
+        if self.shown_view is None or view.timeline != self.shown_view.timeline:
+            self.ids.hourly_timeline.data = view.timeline
+            self.ids.hourly_timeline.scroll_x = 0
+        if self.shown_view is None or view.background != self.shown_view.background:
+            app = App.get_running_app()
+            app.bg_start, app.bg_end = view.background[0], view.background[1]
+        self.shown_view = view
 
-                Clock.schedule_once(self.set_background)
-        except AttributeError:
-            pass
+    def _make_view(self, report: WeatherReport) -> StatusView:
+        """Computes the display values of the report with the application settings"""
+        app = App.get_running_app()
+        return StatusView.from_report(report, app.temp_format, app.time_format)
 
-    def _update_weather_animated(self) -> None:
-        """Updates the weather with the spinner animation"""
-        self._refresh_animation_start()
-        self.update_weather()
-        self._refresh_animation_stop()
+    def _schedule_time_update(self, *args) -> None:
+        """
+        Updates the time and schedules the next update
+        when the displayed minute or the colon blink changes
+        """
+        self.update_time()
+        now = time.time()
+        next_blink = math.floor(now + 0.5) + 0.5
+        next_minute = (math.floor(now / 60) + 1) * 60
+        self.time_event = Clock.schedule_once(self._schedule_time_update, min(next_blink, next_minute) - now)
 
     def update_time(self, *args) -> None:
         """
@@ -183,12 +384,6 @@ class StatusScreen(Screen):
         else:
             self.ids.city_time.text = time_text.replace(":", " ")
 
-    def set_background(self, *args) -> None:
-        """Sets the application theme"""
-        app = App.get_running_app()
-        app.bg_start = self.weather.color[0]
-        app.bg_end = self.weather.color[1]
-
     def set_error(self, message: str) -> None:
         """
         Prints the error message on the screen
@@ -197,24 +392,4 @@ class StatusScreen(Screen):
         :param message: Error message
         :return: None
         """
-        self.ids.city_name.text = "Error"
-
-        self.ids.weather_status.text = message
-        self.ids.weather_temp.text = ""
-        self.ids.weather_image.source = Config.ERROR_IMAGE
-
-        self.ids.forecast_day_1.text = ""
-        self.ids.forecast_temp_1.text = ""
-
-        self.ids.forecast_day_2.text = ""
-        self.ids.forecast_temp_2.text = ""
-
-        self.ids.forecast_day_3.text = ""
-        self.ids.forecast_temp_3.text = ""
-
-        self.ids.forecast_day_4.text = ""
-        self.ids.forecast_temp_4.text = ""
-
-        app = App.get_running_app()
-        app.bg_start = Config.ERROR_COLOR[0]
-        app.bg_end = Config.ERROR_COLOR[1]
+        self.render(StatusView.from_error(message))
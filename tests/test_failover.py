@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from handlers.city import City
+from handlers.city_handlers.failover_city_handler import FailoverCityHandler
+from handlers.errors import NoAPIConnectionException, NotCompatibleAPIException, ServiceUnavailableException
+from handlers.failover import FailoverExecutor
+from handlers.provider_stats import ProviderStats
+from handlers.weather_handlers.accuweather_handler import AccuWeatherHandler
+from handlers.weather_handlers.meta_weather_handler import MetaWeatherHandler
+from handlers.weather_handlers.open_weather_handler import OpenWeatherHandler
+
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(ProviderStats, "registry", {})
+
+
+def fail(api_name):
+    def call():
+        raise ServiceUnavailableException(api_name)
+    return call
+
+
+def test_failed_provider_is_replaced_by_the_next_one():
+    result = FailoverExecutor.call("weather", "current weather", [
+        ("First", fail("First")), ("Second", lambda: "second")
+    ])
+
+    assert result == "second"
+    assert ProviderStats.get("weather", "First").outcomes[-1] is False
+    assert ProviderStats.get("weather", "Second").outcomes[-1] is True
+
+
+def test_last_error_is_raised_when_all_the_providers_fail():
+    with pytest.raises(ServiceUnavailableException) as error:
+        FailoverExecutor.call("weather", "current weather", [("First", fail("First")), ("Second", fail("Second"))])
+    assert error.value.api_name in ("First", "Second")
+
+
+def test_incompatible_provider_is_not_recorded_as_unhealthy():
+    def incompatible():
+        raise NotCompatibleAPIException("First")
+
+    assert FailoverExecutor.call("weather", "forecast", [("First", incompatible), ("Second", lambda: 2)]) == 2
+    assert not ProviderStats.get("weather", "First").outcomes
+
+
+def test_slow_provider_is_hedged_with_the_next_one():
+    for _ in range(Config.PROVIDER_STATS_MIN_SAMPLES):
+        ProviderStats.get("weather", "Slow").record(0.01, True)
+        ProviderStats.get("weather", "Fast").record(0.05, True)
+    released = threading.Event()
+    called = []
+
+    def slow():
+        called.append("Slow")
+        released.wait(5)
+        return "slow"
+
+    def fast():
+        called.append("Fast")
+        return "fast"
+
+    started = time.monotonic()
+    try:
+        result = FailoverExecutor.call("weather", "current weather", [("Fast", fast), ("Slow", slow)])
+    finally:
+        released.set()
+    assert result == "fast"
+    assert called == ["Slow", "Fast"]
+    assert time.monotonic() - started < 1
+
+
+def test_call_gives_up_when_the_budget_is_spent(monkeypatch):
+    monkeypatch.setattr(Config, "FAILOVER_BUDGET", 0.1)
+    released = threading.Event()
+
+    try:
+        with pytest.raises(NoAPIConnectionException):
+            FailoverExecutor.call("weather", "current weather", [("Stuck", lambda: released.wait(5))])
+    finally:
+        released.set()
+
+
+def test_woeid_is_only_sent_to_the_api_that_gave_it():
+    city = City("London", longitude=-0.1276, latitude=51.5073, woeid=44418, source="MetaWeather")
+
+    assert "/44418/" in MetaWeatherHandler(city).get_url_current()
+    with pytest.raises(NotCompatibleAPIException):
+        AccuWeatherHandler(city).get_url_current()
+    assert "lat=51.5073" in OpenWeatherHandler(city).get_url_current()
+
+
+def test_location_key_does_not_mix_the_woeids_of_different_apis():
+    accuweather = City("London", woeid="328328", source="AccuWeather")
+    meta_weather = City("London", woeid="328328", source="MetaWeather")
+    located = City("London", longitude=-0.1276, latitude=51.5073, woeid="328328", source="AccuWeather")
+
+    assert OpenWeatherHandler(accuweather).get_location_key() != OpenWeatherHandler(meta_weather).get_location_key()
+    assert OpenWeatherHandler(located).get_location_key() == AccuWeatherHandler(located).get_location_key()
+
+
+def test_suggestion_is_completed_by_the_api_that_suggested_it():
+    handler = FailoverCityHandler("London")
+    completed = []
+    for city_handler in handler.handlers:
+        city_handler.complete_city = lambda city, name=city_handler.API_NAME: completed.append(name) or city
+
+    handler.complete_city(City("London", woeid=44418, source="MetaWeather"))
+    assert completed == ["MetaWeather"]
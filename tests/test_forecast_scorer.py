@@ -0,0 +1,123 @@
+import math
+import time
+
+import pytest
+
+from handlers.city import City
+from handlers.forecast_scorer import ForecastScorer
+from handlers.forecast_series import ForecastSeries
+from handlers.history_store import HistoryStore
+from handlers.weather import Weather
+
+from config import Config
+
+
+DAY = 24 * 60 * 60
+HOUR = 60 * 60
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(HistoryStore, "compacted", HistoryStore._get_day(time.time()))
+
+
+@pytest.fixture
+def day():
+    """Start of the UTC day two days ago"""
+    return (time.time() // DAY - 2) * DAY
+
+
+def make_weather(epoch, temperature, wind_direction=180.0):
+    return Weather(
+        location_name="Kyiv", status=Weather.CLEAR, temperature=temperature, pressure=1013,
+        humidity=40, wind_speed=3.0, wind_direction=wind_direction, time=epoch, time_zone=7200
+    )
+
+
+def observe(api_name, day, hours=12, temperature=10.0, wind_direction=10.0):
+    for hour in range(hours):
+        HistoryStore.append_observation(api_name, "kyiv", make_weather(day + hour * HOUR, temperature, wind_direction))
+
+
+def forecast(api_name, day, issued, hours=12, temperature=12.0, wind_direction=350.0, offset=600):
+    series = ForecastSeries.from_weathers(
+        make_weather(day + hour * HOUR + offset, temperature, wind_direction) for hour in range(hours)
+    )
+    HistoryStore.append_forecast(api_name, "kyiv", series, issued)
+
+
+def test_forecasts_scored_against_other_providers(day):
+    observe("A", day)
+    forecast("B", day, issued=day - HOUR)
+
+    scores = ForecastScorer.score(["A", "B"], day, day + DAY)
+    assert scores["B"].get_mae("temperature") == pytest.approx(2.0)
+    assert list(scores["B"].bias["temperature"]) == pytest.approx([2.0])
+    assert list(scores["B"].counts["temperature"]) == [12]
+    assert scores["A"].get_mae("temperature") is None
+
+
+def test_circular_errors_wrap_around(day):
+    observe("A", day)
+    forecast("B", day, issued=day - HOUR)
+
+    score = ForecastScorer.score(["A", "B"], day, day + DAY)["B"]
+    assert score.get_mae("wind_direction") == pytest.approx(20.0)
+    assert list(score.bias["wind_direction"]) == pytest.approx([-20.0])
+
+
+def test_errors_by_lead_time(day):
+    observe("A", day)
+    forecast("B", day, issued=day - 2 * DAY)
+
+    score = ForecastScorer.score(["A", "B"], day, day + DAY)["B"]
+    assert list(score.leads) == [0, 24, 48]
+    assert list(score.counts["temperature"]) == [0, 0, 12]
+    assert math.isnan(score.mae["temperature"][0])
+
+
+def test_unmatched_forecasts_not_scored(day):
+    observe("A", day)
+    forecast("B", day, issued=day - HOUR, offset=14 * HOUR)
+
+    score = ForecastScorer.score(["A", "B"], day, day + DAY)["B"]
+    assert sum(score.counts["temperature"]) == 0
+
+
+def test_too_few_samples(day):
+    observe("A", day)
+    forecast("B", day, issued=day - HOUR, hours=Config.ACCURACY_MIN_SAMPLES - 1)
+
+    assert ForecastScorer.score(["A", "B"], day, day + DAY)["B"].get_mae("temperature") is None
+
+
+@pytest.mark.parametrize("recording", [False, True])
+def test_recording_gated_by_config(monkeypatch, recording):
+    recorded, updated = [], []
+    monkeypatch.setattr(Config, "ACCURACY_RECORDING", recording)
+    monkeypatch.setattr(ForecastScorer, "record", classmethod(lambda cls, city: recorded.append(city)))
+    monkeypatch.setattr(ForecastScorer, "update", classmethod(lambda cls: updated.append(True)))
+
+    city = City("Kyiv", latitude=50.45, longitude=30.52)
+    ForecastScorer._run(city)
+    assert recorded == ([city] if recording else [])
+    assert updated == [True]
+
+
+def test_recording_off_by_default():
+    assert Config.ACCURACY_RECORDING is False
+
+
+def test_schedule_compacts_the_store_in_the_background(monkeypatch):
+    compacted = []
+    monkeypatch.setattr(HistoryStore, "compacted", None)
+    monkeypatch.setattr(HistoryStore, "compact", classmethod(lambda cls, now=None: compacted.append(True)))
+    monkeypatch.setattr(ForecastScorer, "_run", classmethod(lambda cls, city: None))
+    monkeypatch.setattr(ForecastScorer, "recorded", {})
+
+    city = City("Kyiv", latitude=50.45, longitude=30.52)
+    ForecastScorer.schedule(city)
+    ForecastScorer.schedule(city)
+    ForecastScorer.executor.submit(lambda: None).result(5)
+    assert compacted == [True]
@@ -0,0 +1,88 @@
+import pytest
+
+from handlers.gazetteer import Gazetteer
+
+from config import Config
+
+
+CITIES = [
+    # name, ASCII name, latitude, longitude, country, population
+    ("Stockholm", "Stockholm", 59.3293, 18.0686, "SE", 975551),
+    ("Sydney", "Sydney", -33.8688, 151.2093, "AU", 4627345),
+    ("London", "London", 51.5085, -0.1257, "GB", 8961989),
+    ("London", "London", 42.9834, -81.2330, "CA", 346765),
+    ("Łódź", "Lodz", 51.7592, 19.4560, "PL", 768755),
+    ("Kyiv", "Kyiv", 50.4547, 30.5238, "UA", 2797553),
+    ("Sanaa", "Sanaa", 15.3547, 44.2066, "YE", 1937451),
+]
+
+
+def write_dump(path, cities):
+    """Writes the cities in the GeoNames tab separated format"""
+    with open(path, "w", encoding="utf-8") as f:
+        for number, (name, ascii_name, latitude, longitude, country, population) in enumerate(cities):
+            columns = [""] * 19
+            columns[:6] = str(number), name, ascii_name, "", str(latitude), str(longitude)
+            columns[8], columns[14] = country, str(population)
+            f.write("\t".join(columns) + "\n")
+
+
+@pytest.fixture
+def gazetteer(tmp_path, monkeypatch):
+    def build(cities):
+        write_dump(tmp_path / "cities.txt", cities)
+        monkeypatch.setattr(Config, "GAZETTEER_FILE", str(tmp_path / "gazetteer.idx"))
+        Gazetteer.build(str(tmp_path / "cities.txt"))
+        return Gazetteer
+
+    monkeypatch.setattr(Gazetteer, "index", None)
+    yield build
+    if Gazetteer.index:
+        Gazetteer.index.close()
+
+
+def test_find_exact_name(gazetteer):
+    assert gazetteer(CITIES).find("stockholm").state == "SE"
+
+
+def test_find_prefers_country(gazetteer):
+    assert gazetteer(CITIES).find("London").state == "GB"
+    assert gazetteer(CITIES).find("London, ca").state == "CA"
+
+
+def test_find_ascii_name(gazetteer):
+    assert gazetteer(CITIES).find("Lodz").name == "Łódź"
+
+
+def test_find_misspelled_name(gazetteer):
+    assert gazetteer(CITIES).find("Stokholm").name == "Stockholm"
+    assert gazetteer(CITIES).find("Kyyiv").name == "Kyiv"
+
+
+def test_find_unmatched_name(gazetteer):
+    assert gazetteer(CITIES).find("Sidnee") is None
+    assert gazetteer(CITIES).find("Stuttgart") is None
+    assert gazetteer(CITIES).find("Xyz") is None
+
+
+def test_search_by_population(gazetteer):
+    cities = gazetteer(CITIES).search("Lo", 8)
+    assert [(city.name, city.state) for city in cities] == [("London", "GB"), ("Łódź", "PL"), ("London", "CA")]
+    assert [city.name for city in gazetteer(CITIES).search("Łó", 8)] == ["Łódź"]
+
+
+def test_search_visits_every_name_with_the_prefix(gazetteer):
+    towns = [(f"Sa{number:04}", f"Sa{number:04}", 10.0, 10.0, "XX", 100) for number in range(1500)]
+    assert [city.name for city in gazetteer(CITIES + towns).search("Sa", 1)] == ["Sanaa"]
+
+
+def test_search_takes_more_records_when_the_names_repeat(gazetteer):
+    springfields = [("Springfield", "Springfield", 40.0, -90.0 + number, "US", 200000 - number) for number in range(5)]
+    spring = [("Spring", "Spring", 30.0, -95.0, "US", 60000)]
+    cities = gazetteer(springfields + spring).search("Spr", 2)
+    assert [(city.name, city.longitude) for city in cities] == [("Springfield", -90.0), ("Spring", -95.0)]
+
+
+def test_nearest(gazetteer):
+    assert gazetteer(CITIES).nearest(59.0, 18.5).name == "Stockholm"
+    assert gazetteer(CITIES).nearest(-30.0, 150.0).name == "Sydney"
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+import handlers.health_monitor
+from handlers.health_monitor import HealthMonitor
+
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Monotonic time of the monitor, moved by the tests"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(handlers.health_monitor, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(HealthMonitor, "providers", {})
+    monkeypatch.setattr(Config, "CIRCUIT_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(Config, "CIRCUIT_COOLDOWN", 30)
+    return clock
+
+
+def fail(times):
+    for _ in range(times):
+        HealthMonitor.record("Test", False, 1.0)
+
+
+def test_breaker_opens_after_the_failures_in_a_row():
+    fail(2)
+    HealthMonitor.record("Test", True, 0.1)
+    fail(2)
+    assert HealthMonitor.allow_request("Test") and HealthMonitor.is_available("Test")
+
+    fail(1)
+    assert not HealthMonitor.allow_request("Test")
+    assert not HealthMonitor.is_available("Test")
+    assert HealthMonitor.get_state("Test")["circuit_open"]
+
+
+def test_single_trial_call_after_the_cool_down(clock):
+    fail(3)
+    clock.now += Config.CIRCUIT_COOLDOWN
+
+    assert HealthMonitor.is_available("Test")
+    assert HealthMonitor.allow_request("Test")
+    assert not HealthMonitor.allow_request("Test")
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    fail(3)
+    clock.now += Config.CIRCUIT_COOLDOWN
+    HealthMonitor.allow_request("Test")
+    HealthMonitor.record("Test", True, 0.1)
+
+    assert HealthMonitor.allow_request("Test") and HealthMonitor.allow_request("Test")
+    assert HealthMonitor.get_state("Test")["consecutive_failures"] == 0
+
+
+def test_failed_trial_opens_the_breaker_again(clock):
+    fail(3)
+    clock.now += Config.CIRCUIT_COOLDOWN
+    HealthMonitor.allow_request("Test")
+    fail(1)
+
+    assert not HealthMonitor.allow_request("Test")
+    clock.now += Config.CIRCUIT_COOLDOWN
+    assert HealthMonitor.allow_request("Test")
+
+
+def test_ended_trial_lets_the_next_one_through(clock):
+    fail(3)
+    clock.now += Config.CIRCUIT_COOLDOWN
+    HealthMonitor.allow_request("Test")
+    HealthMonitor.end_trial("Test")
+
+    assert HealthMonitor.allow_request("Test")
+
+
+def test_decayed_success_rate_and_latency(monkeypatch):
+    monkeypatch.setattr(Config, "HEALTH_DECAY", 0.5)
+    HealthMonitor.record("Test", True, 1.0)
+    HealthMonitor.record("Test", False, 3.0)
+
+    state = HealthMonitor.get_state("Test")
+    assert state["success_rate"] == 0.5 and state["latency"] == 2.0
+    assert not state["circuit_open"]
@@ -0,0 +1,119 @@
+import math
+import os
+import time
+
+import pytest
+
+from handlers.forecast_series import ForecastSeries
+from handlers.history_store import HistoryChunk, HistoryStore
+from handlers.weather import Weather
+
+from config import Config
+
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(HistoryStore, "compacted", None)
+
+
+@pytest.fixture
+def day():
+    """Start of the UTC day two days ago, a closed day within the retention"""
+    return (time.time() // DAY - 2) * DAY
+
+
+def make_weather(epoch, temperature=20.0, status=Weather.CLEAR):
+    return Weather(
+        location_name="Kyiv", status=status, temperature=temperature, pressure=1013,
+        humidity=40, wind_speed=3.0, wind_direction=180, time=epoch, time_zone=7200
+    )
+
+
+def test_chunk_append_and_read(tmp_path):
+    chunk = HistoryChunk(str(tmp_path / "day.chunk"), ("time", "temperature"), capacity=2)
+    chunk.append([{"status": 1, "time": 1.0, "temperature": 5.0}])
+    chunk.append([{"status": 2, "time": 2.0}, {"status": 3, "time": 3.0, "temperature": 7.5}])
+
+    reopened = HistoryChunk(str(tmp_path / "day.chunk"))
+    data = reopened.read()
+    assert reopened.capacity == 4 and reopened.count == 3
+    assert list(data["status"]) == [1, 2, 3]
+    assert list(data["time"]) == [1.0, 2.0, 3.0]
+    assert data["temperature"][0] == 5.0 and math.isnan(data["temperature"][1])
+    assert reopened.read_last("time") == 3.0
+    assert reopened.read_last("temperature") == 7.5
+
+
+def test_chunk_read_last_of_empty_chunk(tmp_path):
+    assert math.isnan(HistoryChunk(str(tmp_path / "day.chunk"), ("time",)).read_last("time"))
+
+
+def test_missing_chunk_without_columns(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        HistoryChunk(str(tmp_path / "missing.chunk"))
+
+
+def test_observation_stored_once(day):
+    for epoch in (day + 600, day + 600, day + 1200):
+        HistoryStore.append_observation("OpenWeather", "50.45,30.52", make_weather(epoch))
+
+    observed = HistoryStore.query("OpenWeather", "50.45,30.52")
+    assert list(observed["time"]) == [day + 600, day + 1200]
+    assert HistoryStore.get_locations("OpenWeather") == ["50.45_30.52"]
+
+
+def test_query_range(day):
+    for hour in range(6):
+        HistoryStore.append_observation("OpenWeather", "kyiv", make_weather(day + hour * 3600, hour))
+
+    observed = HistoryStore.query("OpenWeather", "kyiv", start=day + 3600, end=day + 3 * 3600)
+    assert list(observed["temperature"]) == [1.0, 2.0]
+    assert list(observed["status"]) == [Weather.STATUS_CODES.index(Weather.CLEAR)] * 2
+
+
+def test_forecast_rows_by_day(day):
+    forecast = ForecastSeries.from_weathers([make_weather(day + offset * DAY, offset) for offset in range(3)])
+    HistoryStore.append_forecast("AccuWeather", "kyiv", forecast, issued=day - DAY)
+
+    stored = HistoryStore.query("AccuWeather", "kyiv", "forecast")
+    assert list(stored["temperature"]) == [0.0, 1.0, 2.0]
+    assert set(stored["issued"]) == {day - DAY}
+    assert len(os.listdir(os.path.join(Config.HISTORY_DIR, "AccuWeather", "kyiv", "forecast"))) == 3
+
+
+def test_rollups(day):
+    for minute, temperature in ((0, 10.0), (30, 14.0), (90, 20.0)):
+        HistoryStore.append_observation("OpenWeather", "kyiv", make_weather(day + minute * 60, temperature))
+    HistoryStore.compact(day + 2 * DAY)
+    HistoryStore.compact(day + 2 * DAY)
+
+    hourly = HistoryStore.query("OpenWeather", "kyiv", resolution="hour")
+    assert list(hourly["time"]) == [day, day + 3600]
+    assert list(hourly["temperature"]) == [12.0, 20.0]
+    assert list(hourly["temperature_min"]) == [10.0, 20.0]
+    assert list(hourly["count"]) == [2.0, 1.0]
+
+    daily = HistoryStore.query("OpenWeather", "kyiv", resolution="day")
+    assert list(daily["time"]) == [day]
+    assert daily["temperature_max"][0] == 20.0
+
+
+def test_expired_chunks_removed(day):
+    HistoryStore.append_observation("OpenWeather", "kyiv", make_weather(day))
+    HistoryStore.compact(day + (Config.HISTORY_RAW_DAYS + 2) * DAY)
+    assert len(HistoryStore.query("OpenWeather", "kyiv")["time"]) == 0
+    assert len(HistoryStore.query("OpenWeather", "kyiv", resolution="hour")["time"]) == 1
+
+
+def test_appends_leave_the_compaction_to_the_background(day):
+    HistoryStore.append_observation("OpenWeather", "kyiv", make_weather(day))
+    assert HistoryStore.compacted is None
+    assert len(HistoryStore.query("OpenWeather", "kyiv", resolution="hour")["time"]) == 0
+
+    HistoryStore.compact_daily()
+    assert HistoryStore.compacted == HistoryStore._get_day(time.time())
+    assert len(HistoryStore.query("OpenWeather", "kyiv", resolution="hour")["time"]) == 1
@@ -0,0 +1,71 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from handlers.http_timing import TimedConnectionMixin, TimedHTTPAdapter
+from handlers.tracing import Tracer
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answers every GET with a small JSON body on a kept-alive connection"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    session = requests.Session()
+    session.mount("http://", TimedHTTPAdapter())
+    yield session
+    session.close()
+
+
+def get(session, url):
+    with Tracer.span("http") as span:
+        assert session.get(url, timeout=5).json() == {"ok": True}
+    return span.attributes
+
+
+def test_new_connection_sets_the_phases(session, url):
+    attributes = get(session, url)
+
+    assert attributes["reused"] is False
+    assert {"dns_ms", "connect_ms", "first_byte_ms"} <= set(attributes)
+    assert all(attributes[phase] >= 0 for phase in ("dns_ms", "connect_ms", "first_byte_ms"))
+
+
+def test_reused_connection_sets_only_the_first_byte(session, url):
+    get(session, url)
+    assert set(get(session, url)) == {"first_byte_ms"}
+
+
+def test_connect_is_timed_as_a_whole_without_the_private_hook(session, url, monkeypatch):
+    # urllib3 versions without _new_conn never call the override
+    monkeypatch.delattr(TimedConnectionMixin, "_new_conn")
+    attributes = get(session, url)
+
+    assert attributes["reused"] is False and attributes["connect_ms"] >= 0
+    assert "dns_ms" not in attributes and "tls_ms" not in attributes
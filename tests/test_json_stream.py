@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from handlers.json_stream import JSONStreamParser
+
+
+DOCUMENT = {
+    "name": "Kyïv ☀",
+    "offset": 7200,
+    "hourly": [{"dt": hour, "temp": 273.15 + hour / 10} for hour in range(12)],
+    "empty": [],
+    "nested": {"a": [1, 2, {"b": None}], "c": True},
+    "daily": [-1.5e3, 12345678, 0.25]
+}
+
+
+def chunked(document, size):
+    data = json.dumps(document, ensure_ascii=False).encode("utf-8")
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def read_document(parser):
+    """Walks the top-level object reading the arrays element by element"""
+    document = {}
+    for key in parser.iter_object():
+        if key in ("hourly", "empty", "daily"):
+            document[key] = list(parser.iter_array())
+        else:
+            document[key] = parser.read_value()
+    return document
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1024])
+def test_document_is_read_across_the_chunks(size):
+    # the single byte chunks split the multibyte characters and the numbers
+    assert read_document(JSONStreamParser(chunked(DOCUMENT, size))) == DOCUMENT
+
+
+def test_empty_containers():
+    parser = JSONStreamParser([b'{ "a" : [ ] , "b" : { } }'])
+    keys = []
+    for key in parser.iter_object():
+        keys.append(key)
+        value = list(parser.iter_array()) if key == "a" else list(parser.iter_object())
+        assert value == []
+    assert keys == ["a", "b"]
+
+
+def test_read_array_keeps_the_first_elements_and_skips_the_rest():
+    parser = JSONStreamParser(chunked(DOCUMENT, 5))
+    document = {}
+    for key in parser.iter_object():
+        if key == "hourly":
+            document[key] = parser.read_array(3)
+        else:
+            document[key] = parser.read_value()
+
+    assert document["hourly"] == DOCUMENT["hourly"][:3]
+    assert document["daily"] == DOCUMENT["daily"]
+    assert JSONStreamParser([b"[1, 2]"]).read_array() == [1, 2]
+
+
+def test_reading_stops_early():
+    chunks = chunked(DOCUMENT, 16)
+    read = []
+
+    def counted():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+
+    parser = JSONStreamParser(counted())
+    for key in parser.iter_object():
+        if key == "offset":
+            assert parser.read_value() == 7200
+            break
+        parser.read_value()
+    assert len(read) < len(chunks) // 4
+
+
+@pytest.mark.parametrize("data", [b'{"a" 1}', b'{"a": [1, 2}', b'["unterminated', b'{"a": tru}'])
+def test_invalid_document_raises_value_error(data):
+    with pytest.raises(ValueError):
+        read_document(JSONStreamParser([data]))
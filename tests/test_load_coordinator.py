@@ -0,0 +1,109 @@
+import asyncio
+import queue
+
+import pytest
+
+from handlers.errors import BadCityNameException, WeatherAppException
+from handlers.load_coordinator import LoadCoordinator
+
+
+class Delivered:
+    """Records the callbacks called by the coordinator, dispatched on the main thread stand-in"""
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def dispatch(self, function):
+        function()
+
+    def callbacks(self, name):
+        return (
+            lambda result: self.calls.put((name, "result", result)),
+            lambda error: self.calls.put((name, "error", error)),
+            lambda: self.calls.put((name, "superseded", None))
+        )
+
+    def next(self):
+        return self.calls.get(timeout=5)
+
+
+@pytest.fixture
+def delivered():
+    return Delivered()
+
+
+def load(value, delay=0.0):
+    async def run():
+        await asyncio.sleep(delay)
+        return value
+    return run
+
+
+def test_result_is_delivered(delivered):
+    loads = LoadCoordinator(2, delivered.dispatch)
+    generation = loads.submit(load(42), *delivered.callbacks("first"))
+
+    assert delivered.next() == ("first", "result", 42)
+    assert loads.is_current(generation) and not loads.is_busy()
+
+
+def test_newer_load_supersedes_the_running_one(delivered):
+    loads = LoadCoordinator(2, delivered.dispatch)
+    loads.submit(load("old", delay=0.2), *delivered.callbacks("old"))
+    loads.submit(load("new"), *delivered.callbacks("new"))
+
+    assert sorted([delivered.next(), delivered.next()]) == [("new", "result", "new"), ("old", "superseded", None)]
+
+
+def test_cancelled_load_calls_only_the_superseded_callback(delivered):
+    loads = LoadCoordinator(1, delivered.dispatch)
+    loads.submit(load("slow", delay=0.2), *delivered.callbacks("slow"))
+    loads.cancel()
+
+    assert delivered.next() == ("slow", "superseded", None)
+    assert delivered.calls.empty()
+
+
+def test_load_superseded_while_waiting_does_not_run(delivered):
+    loads = LoadCoordinator(1, delivered.dispatch)
+    ran = []
+
+    def tracked(name):
+        async def run():
+            ran.append(name)
+            return name
+        return run
+
+    async def stubborn():
+        # keeps the only slot for a while after it is cancelled
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.2)
+            raise
+
+    loads.submit(stubborn, *delivered.callbacks("first"))
+    loads.submit(tracked("second"), *delivered.callbacks("second"))
+    loads.submit(tracked("third"), *delivered.callbacks("third"))
+    results = sorted(delivered.next() for _ in range(3))
+
+    assert results == [("first", "superseded", None), ("second", "superseded", None), ("third", "result", "third")]
+    assert ran == ["third"]
+
+
+def test_errors_are_delivered_as_weather_app_exceptions(delivered):
+    loads = LoadCoordinator(2, delivered.dispatch)
+
+    async def bad_city():
+        raise BadCityNameException("Atlantis")
+
+    async def broken():
+        raise RuntimeError("bug")
+
+    loads.submit(bad_city, *delivered.callbacks("city"))
+    name, kind, error = delivered.next()
+    assert (kind, type(error)) == ("error", BadCityNameException)
+
+    loads.submit(broken, *delivered.callbacks("bug"))
+    name, kind, error = delivered.next()
+    assert kind == "error" and type(error) is WeatherAppException
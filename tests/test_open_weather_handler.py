@@ -0,0 +1,171 @@
+import json
+from collections import OrderedDict
+
+import pytest
+
+from handlers.city import City
+from handlers.city_cache import CityCache
+from handlers.http_session import SessionRegistry
+from handlers.request_coalescer import RequestCoalescer
+from handlers.weather_cache import WeatherCache
+from handlers.weather_handlers.open_weather_handler import OpenWeatherHandler
+
+from config import Config
+
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+def make_entry(epoch, temperature):
+    return {
+        "dt": epoch, "temp": temperature, "pressure": 1013, "humidity": 40,
+        "wind_speed": 3.0, "wind_deg": 180, "weather": [{"main": "Clear"}]
+    }
+
+
+def make_one_call(hourly=True):
+    one_call = {"lat": 50.45, "lon": 30.52, "timezone_offset": 7200}
+    if hourly:
+        one_call["hourly"] = [make_entry(hour * HOUR, 283.15 + hour) for hour in range(48)]
+    one_call["daily"] = [make_entry(day * DAY, {"day": 273.15 + day, "night": 270.0}) for day in range(8)]
+    one_call["alerts"] = []
+    return json.dumps(one_call).encode("utf-8")
+
+
+class FakeResponse:
+    """Streamed response counting the chunks that were downloaded"""
+
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+        self.read = 0
+
+    def iter_content(self, size):
+        for start in range(0, len(self.body), size):
+            self.read += 1
+            yield self.body[start:start + size]
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def responses(tmp_path, monkeypatch):
+    """Answers the One Call urls, the hourly block is included unless it is excluded"""
+    monkeypatch.setattr(Config, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(Config, "STREAM_CHUNK_SIZE", 256)
+    WeatherCache.clear()
+    answered = []
+
+    def get(api_name, url, **kwargs):
+        response = FakeResponse(make_one_call(hourly="hourly" not in url))
+        answered.append((url, response))
+        return response
+
+    monkeypatch.setattr(SessionRegistry, "get", get)
+    yield answered
+    WeatherCache.clear()
+
+
+@pytest.fixture
+def city():
+    return City("Kyiv", longitude=30.52, latitude=50.45)
+
+
+def test_daily_forecast_excludes_the_hourly_block(responses, city):
+    forecast = OpenWeatherHandler(city).fetch_weather_forecast(2)
+
+    assert [weather.time for weather in forecast] == [DAY, 2 * DAY]
+    assert forecast[0].temperature == pytest.approx(1.0)
+    assert forecast[0].time_zone == 7200
+    (url, response), = responses
+    assert "exclude=current,minutely,hourly,alerts" in url
+    # the download stops after the third day
+    assert response.read < len(response.body) // Config.STREAM_CHUNK_SIZE
+
+
+def test_daily_and_hourly_forecasts_share_one_call(responses, city):
+    handler = OpenWeatherHandler(city, hours=6)
+    forecast = handler.fetch_weather_forecast(3)
+    hourly = handler.fetch_weather_hourly(6)
+
+    assert len(forecast) == 3 and forecast[2].time == 3 * DAY
+    assert [weather.time for weather in hourly] == [hour * HOUR for hour in range(6)]
+    assert hourly[5].temperature == pytest.approx(15.0)
+    (url, _), = responses
+    assert "exclude=current,minutely,alerts" in url
+
+
+def test_shared_call_keeps_only_the_requested_hours(responses, city):
+    OpenWeatherHandler(city, hours=6).fetch_weather_hourly(6)
+
+    forecasts, _, _ = WeatherCache.entries[OpenWeatherHandler.API_NAME, "50.45,30.52", "one_call_6"]
+    assert len(forecasts["hourly"]) == 6
+    assert len(forecasts["daily"]) == 8
+
+
+def make_current(city_id, name, temperature):
+    return {
+        "id": city_id, "name": name, "dt": 0, "timezone": 0, "weather": [{"main": "Clear"}],
+        "main": {"temp": temperature, "pressure": 1013, "humidity": 40}, "wind": {"speed": 3.0, "deg": 180}
+    }
+
+
+class FakeJSONResponse:
+    """Complete response of a JSON body"""
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, url, body):
+        self.url = url
+        self.content = json.dumps(body).encode("utf-8")
+
+
+@pytest.fixture
+def group_responses(tmp_path, monkeypatch):
+    """Answers the current weather urls by the coordinates and the group urls by the ids"""
+    monkeypatch.setattr(Config, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(Config, "CITY_CACHE_FILE", str(tmp_path / "cities.sqlite3"))
+    monkeypatch.setattr(CityCache, "connection", None)
+    monkeypatch.setattr(CityCache, "entries", OrderedDict())
+    monkeypatch.setattr(CityCache, "ids", {})
+    monkeypatch.setattr(RequestCoalescer, "pending", {})
+    WeatherCache.clear()
+    answered = []
+
+    def get(api_name, url, **kwargs):
+        answered.append(url)
+        if "/group" in url:
+            ids = url.split("id=")[1].split("&")[0].split(",")
+            body = {"cnt": len(ids), "list": [make_current(int(city_id), f"#{city_id}", 280.15) for city_id in ids]}
+        else:
+            latitude = float(url.split("lat=")[1].split("&")[0])
+            body = make_current(int(latitude), f"#{int(latitude)}", 290.15)
+        return FakeJSONResponse(url, body)
+
+    monkeypatch.setattr(SessionRegistry, "get", get)
+    yield answered
+    WeatherCache.clear()
+    CityCache.connection.close()
+
+
+def test_group_uses_the_ids_stored_by_an_earlier_run(group_responses, monkeypatch):
+    cities = [City(f"City {number}", longitude=float(number), latitude=float(number)) for number in (10, 20, 30)]
+    for city in cities[:2]:
+        OpenWeatherHandler(city).fetch_weather_current()
+
+    # a new run reads the ids from the database
+    CityCache.connection.close()
+    monkeypatch.setattr(CityCache, "connection", None)
+    monkeypatch.setattr(CityCache, "ids", {})
+    WeatherCache.clear()
+    group_responses.clear()
+
+    weathers = OpenWeatherHandler.get_weather_group(cities)
+    assert [weather and weather.city_name for weather in weathers] == ["City 10", "City 20", None]
+    assert weathers[0].temperature == pytest.approx(7.0)
+    url, = group_responses
+    assert "id=10,20&" in url
@@ -0,0 +1,84 @@
+import pytest
+
+from handlers.refresh_policy import RefreshPolicy
+from handlers.request_coalescer import RequestCoalescer
+from handlers.sun_info import SunInfo
+from handlers.weather import Weather
+
+from config import Config
+
+
+NOW = 1_700_000_000.0
+
+
+class Handler:
+    """Weather handler class stand-in"""
+    API_NAME = "Test"
+    CURRENT_TTL = 10 * 60
+
+
+@pytest.fixture(autouse=True)
+def max_ages(monkeypatch):
+    monkeypatch.setattr(RequestCoalescer, "max_ages", {})
+    return RequestCoalescer.max_ages
+
+
+def test_interval_is_counted_from_the_fetch_time():
+    assert RefreshPolicy.get_interval(Handler, fetched=NOW - 4 * 60, now=NOW) == 6 * 60
+    assert RefreshPolicy.get_interval(Handler, now=NOW) == 10 * 60
+
+
+def test_interval_follows_the_current_weather_max_age(max_ages):
+    max_ages[Handler.API_NAME, "current"] = 20 * 60
+    max_ages[Handler.API_NAME, "city"] = 24 * 60 * 60
+
+    assert RefreshPolicy.get_interval(Handler, fetched=NOW, now=NOW) == 20 * 60
+
+
+def test_interval_is_clamped():
+    assert RefreshPolicy.get_interval(Handler, fetched=NOW - 60 * 60, now=NOW) == Config.REFRESH_MIN_INTERVAL
+
+
+def test_interval_backs_off_after_failures():
+    intervals = [RefreshPolicy.get_interval(Handler, failures=failures, now=NOW) for failures in (1, 2, 3)]
+    assert intervals == [Config.REFRESH_MIN_INTERVAL * 2 ** power for power in range(3)]
+    assert RefreshPolicy.get_interval(Handler, failures=30, now=NOW) == Config.REFRESH_MAX_BACKOFF
+
+
+def test_interval_is_shortened_to_the_next_transition():
+    sun_info = SunInfo(sunrise=NOW - 6 * 60 * 60, sunset=NOW + Weather.DUSK_PERIOD + 5 * 60)
+
+    assert RefreshPolicy.get_next_transition(sun_info, NOW) == sun_info.sunset - Weather.DUSK_PERIOD
+    assert RefreshPolicy.get_interval(Handler, fetched=NOW, sun_info=sun_info, now=NOW) == 5 * 60
+
+
+def test_no_transition_after_the_last_one():
+    sun_info = SunInfo(sunrise=NOW - 20 * 60 * 60, sunset=NOW - 10 * 60 * 60)
+    assert RefreshPolicy.get_next_transition(sun_info, NOW) is None
+    assert RefreshPolicy.get_next_transition(None, NOW) is None
+
+
+def test_weather_expires_after_its_lifetime():
+    assert not RefreshPolicy.is_expired(Handler, NOW - 9 * 60, NOW)
+    assert RefreshPolicy.is_expired(Handler, NOW - 10 * 60, NOW)
+    assert RefreshPolicy.is_expired(Handler, None, NOW)
+
+
+def test_theme_is_updated_for_the_current_time():
+    sun_info = SunInfo(sunrise=NOW - 6 * 60 * 60, sunset=NOW + 60 * 60)
+    weather = Weather(location_name="Kyiv", status=Weather.CLEAR, temperature=20, time=NOW - 4 * 60 * 60)
+
+    weather.update_state(sun_info)
+    assert weather.color == Config.NOON_COLOR and weather.image == Weather.IMAGE_TABLE[Weather.CLEAR]
+
+    weather.update_state(sun_info, sun_info.sunset)
+    assert weather.color == Config.SUNSET_COLOR and weather.image == Weather.IMAGE_TABLE[Weather.SUNRISE]
+
+    weather.update_state(sun_info, sun_info.sunset + 3 * 60 * 60)
+    assert weather.color == Config.NIGHT_COLOR and weather.image == Weather.IMAGE_TABLE[Weather.NIGHT_CLEAR]
+
+
+def test_civil_dusk_is_the_last_transition():
+    sun_info = SunInfo(sunrise=NOW - 12 * 60 * 60, sunset=NOW - 60 * 60, dusk=NOW - 20 * 60)
+    assert RefreshPolicy.get_next_transition(sun_info, NOW - 25 * 60) == sun_info.dusk
+    assert RefreshPolicy.get_next_transition(sun_info, NOW) is None
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from handlers.http_session import SessionRegistry
+from handlers.request_coalescer import RequestCoalescer
+
+from config import Config
+
+
+URL = "https://api.example.com/weather?q=kyiv"
+
+
+class FakeResponse:
+    """Complete response of a JSON body"""
+
+    def __init__(self, url, status_code=200, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b'{"temp": 20}'
+
+
+class Transport:
+    """Stands in for the session registry, answers with the queued responses or errors"""
+
+    def __init__(self):
+        self.calls = 0
+        self.answers = []
+        self.released = threading.Event()
+        self.released.set()
+
+    def get(self, api_name, url, **kwargs):
+        self.calls += 1
+        self.released.wait(5)
+        answer = self.answers.pop(0) if self.answers else FakeResponse(url)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    transport = Transport()
+    monkeypatch.setattr(SessionRegistry, "get", transport.get)
+    monkeypatch.setattr(RequestCoalescer, "pending", {})
+    monkeypatch.setattr(RequestCoalescer, "max_ages", {})
+    monkeypatch.setattr(Config, "COALESCE_WINDOW", 60)
+    return transport
+
+
+def test_concurrent_requests_share_one_call(transport):
+    transport.released.clear()
+    responses = []
+    threads = [
+        threading.Thread(target=lambda: responses.append(RequestCoalescer.get("Test", "current", URL)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    transport.released.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert transport.calls == 1
+    assert len(responses) == 3 and all(response is responses[0] for response in responses)
+    assert responses[1].json() is responses[2].json()
+
+
+def test_finished_response_is_shared_within_the_window(transport, monkeypatch):
+    first = RequestCoalescer.get("Test", "current", URL)
+    assert RequestCoalescer.get("Test", "current", URL) is first
+    assert RequestCoalescer.get("Test", "current", URL + "&units=metric") is not first
+    assert transport.calls == 2
+
+    monkeypatch.setattr(Config, "COALESCE_WINDOW", 0)
+    assert RequestCoalescer.get("Test", "current", URL) is not first
+    assert transport.calls == 3
+
+
+def test_failed_request_is_not_shared(transport):
+    transport.answers = [requests.ConnectionError("down"), FakeResponse(URL, 503), FakeResponse(URL)]
+
+    with pytest.raises(requests.ConnectionError):
+        RequestCoalescer.get("Test", "current", URL)
+    assert RequestCoalescer.get("Test", "current", URL).status_code == 503
+    assert RequestCoalescer.get("Test", "current", URL).status_code == 200
+    assert transport.calls == 3
+
+
+def test_error_is_raised_to_every_waiter(transport):
+    transport.released.clear()
+    transport.answers = [requests.Timeout("slow")]
+    errors = []
+
+    def get():
+        try:
+            RequestCoalescer.get("Test", "current", URL)
+        except requests.Timeout as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    transport.released.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert transport.calls == 1
+
+
+def test_max_age_is_remembered_by_the_endpoint(transport):
+    transport.answers = [FakeResponse(URL, headers={"Cache-Control": "public, max-age=600"})]
+    RequestCoalescer.get("Test", "current", URL)
+
+    assert RequestCoalescer.max_ages == {("Test", "current"): 600}
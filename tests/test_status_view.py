@@ -0,0 +1,98 @@
+import pytest
+
+from handlers.city import City
+from handlers.forecast_series import ForecastSeries
+from handlers.sun_handlers.solar_sun_handler import SolarSunHandler
+from handlers.sun_info import SunInfo
+from handlers.weather import Weather
+from handlers.weather_fetcher import WeatherReport
+from handlers.status_view import StatusView
+
+from config import Config
+
+
+HOUR = 60 * 60
+# noon of the 2023-06-21 at the zero meridian
+NOON = 1_687_348_800.0
+
+
+def make_weather(epoch, temperature=20.0, status=Weather.CLEAR):
+    return Weather(
+        location_name="London", status=status, temperature=temperature, pressure=1013,
+        humidity=40, wind_speed=3.0, wind_direction=180, time=epoch, time_zone=0
+    )
+
+
+@pytest.fixture
+def report():
+    def make(city, hours=24):
+        weather = make_weather(NOON)
+        weather.update_state(SunInfo(NOON - 8 * HOUR, NOON + 8 * HOUR), NOON)
+        return WeatherReport(
+            city=city,
+            sun_info=SunInfo(NOON - 8 * HOUR, NOON + 8 * HOUR),
+            weather=weather,
+            forecast=ForecastSeries.from_weathers(make_weather(NOON + day * 24 * HOUR) for day in range(1, 5)),
+            hourly=ForecastSeries.from_weathers(make_weather(NOON + hour * HOUR) for hour in range(hours))
+        )
+    return make
+
+
+def test_timeline_hours_are_themed_by_their_own_day(report):
+    city = City("London", longitude=0.0, latitude=51.5)
+    view = StatusView.from_report(report(city), "C", 24)
+    sun_info = SolarSunHandler(city).get_sun_info_batch([NOON])[0]
+
+    images = [hour["image_source"] for hour in view.timeline]
+    assert images[0] == Weather.IMAGE_TABLE[Weather.CLEAR]
+    assert images[14] == Weather.IMAGE_TABLE[Weather.NIGHT_CLEAR]
+    # the next morning
+    assert images[22] == Weather.IMAGE_TABLE[Weather.CLEAR]
+    sunset_hour = round((sun_info.sunset - NOON) / HOUR)
+    assert images[sunset_hour] == Weather.IMAGE_TABLE[Weather.SUNRISE]
+
+
+def test_timeline_of_a_city_without_coordinates_keeps_the_status_images(report):
+    view = StatusView.from_report(report(City("London", woeid=44418, source="MetaWeather")), "C", 24)
+    assert {hour["image_source"] for hour in view.timeline} == {Weather.IMAGE_TABLE[Weather.CLEAR]}
+
+
+def test_dusk_ends_at_the_civil_dusk():
+    sun_info = SunInfo(NOON - 8 * HOUR, NOON + 8 * HOUR, dusk=NOON + 8 * HOUR + 40 * 60)
+    weather = make_weather(NOON)
+
+    weather.update_state(sun_info, NOON + 8 * HOUR + 35 * 60)
+    assert weather.color == Config.DUSK_COLOR
+    weather.update_state(sun_info, NOON + 8 * HOUR + 45 * 60)
+    assert weather.color == Config.NIGHT_COLOR and weather.image == Weather.IMAGE_TABLE[Weather.NIGHT_CLEAR]
+    weather.update_state(SunInfo(sun_info.sunrise, sun_info.sunset), NOON + 8 * HOUR + 45 * 60)
+    assert weather.color == Config.DUSK_COLOR
+
+
+def test_first_view_changes_every_property(report):
+    view = StatusView.from_report(report(City("London", longitude=0.0, latitude=51.5)), "C", 24)
+    changes = view.get_changes(None)
+
+    assert changes == view.properties and changes is not view.properties
+    assert changes["weather_temp", "text"] == "20°C"
+    assert changes["forecast_temp_4", "text"] == "20°"
+
+
+def test_only_the_changed_properties_are_applied(report):
+    city = City("London", longitude=0.0, latitude=51.5)
+    view = StatusView.from_report(report(city), "C", 24)
+
+    assert StatusView.from_report(report(city), "C", 24).get_changes(view) == {}
+    fahrenheit = StatusView.from_report(report(city), "F", 24)
+    assert set(fahrenheit.get_changes(view)) == {("weather_temp", "text")} | {
+        (f"forecast_temp_{slot}", "text") for slot in range(1, 5)
+    }
+
+
+def test_error_view_blanks_the_weather(report):
+    view = StatusView.from_report(report(City("London", longitude=0.0, latitude=51.5)), "C", 24)
+    changes = StatusView.from_error("No connection").get_changes(view)
+
+    assert changes["city_name", "text"] == "Error" and changes["weather_status", "text"] == "No connection"
+    assert changes["weather_image", "source"] == Config.ERROR_IMAGE
+    assert all(changes[f"forecast_day_{slot}", "text"] == "" for slot in range(1, 5))
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+
+import pytest
+
+from handlers.city import City
+from handlers.city_cache import CityCache
+from handlers.city_handlers.accuweather_city_handler import AccuWeatherCityHandler
+from handlers.city_handlers.open_weather_city_handler import OpenWeatherCityHandler
+from handlers.request_coalescer import RequestCoalescer
+from handlers.suggestion_trie import SuggestionTrie
+
+from config import Config
+
+
+@pytest.fixture(autouse=True)
+def empty_trie():
+    SuggestionTrie.roots.clear()
+    yield
+    SuggestionTrie.roots.clear()
+
+
+def names(cities):
+    return [city.name for city in cities]
+
+
+def test_unknown_prefix_calls_the_api():
+    assert SuggestionTrie.lookup("AccuWeather", "Lo") is None
+
+
+def test_requested_prefix_is_answered_locally():
+    SuggestionTrie.insert("AccuWeather", "Lo", [City("London"), City("Lodz")], False)
+    assert names(SuggestionTrie.lookup("AccuWeather", " lo ")) == ["London", "Lodz"]
+
+
+def test_complete_prefix_answers_longer_prefixes():
+    SuggestionTrie.insert("AccuWeather", "Lo", [City("London"), City("Lodz")], True)
+    assert names(SuggestionTrie.lookup("AccuWeather", "Lon")) == ["London"]
+    assert SuggestionTrie.lookup("AccuWeather", "Lox") == []
+
+
+def test_incomplete_prefix_does_not_answer_longer_prefixes():
+    SuggestionTrie.insert("AccuWeather", "Lo", [City("London"), City("Lodz")], False)
+    assert SuggestionTrie.lookup("AccuWeather", "Lon") is None
+    assert SuggestionTrie.lookup("AccuWeather", "Lox") is None
+
+
+def test_tries_are_separate_per_api():
+    SuggestionTrie.insert("AccuWeather", "Lo", [City("London")], True)
+    assert SuggestionTrie.lookup("OpenWeather", "Lo") is None
+
+
+class ExactMatchHandler(OpenWeatherCityHandler):
+    """OpenWeather geocoder answering with the cities named exactly like the name"""
+
+    known = [City("Lo"), City("London")]
+    calls = []
+
+    def fetch_suggestions(self):
+        self.calls.append(self.name)
+        return [city for city in self.known if city.name.casefold() == self.name.casefold()]
+
+
+class PrefixMatchHandler(AccuWeatherCityHandler):
+    """AccuWeather autocomplete answering with the cities whose names start with the name"""
+
+    known = [City("Lo"), City("London")]
+    calls = []
+
+    def fetch_suggestions(self):
+        self.calls.append(self.name)
+        return [city for city in self.known if city.name.casefold().startswith(self.name.casefold())]
+
+
+def test_exact_match_results_do_not_answer_longer_names():
+    ExactMatchHandler.calls.clear()
+    assert names(ExactMatchHandler("Lo").get_suggestions()) == ["Lo"]
+    assert names(ExactMatchHandler("London").get_suggestions()) == ["London"]
+    assert ExactMatchHandler.calls == ["Lo", "London"]
+
+
+def test_prefix_match_results_answer_longer_names():
+    PrefixMatchHandler.calls.clear()
+    assert names(PrefixMatchHandler("Lo").get_suggestions()) == ["Lo", "London"]
+    assert names(PrefixMatchHandler("Lond").get_suggestions()) == ["London"]
+    assert PrefixMatchHandler.calls == ["Lo"]
+
+
+class LocationResponse:
+    status_code = 200
+
+    def json(self):
+        return {"GeoPosition": {"Latitude": 33.66, "Longitude": -95.56}}
+
+
+@pytest.fixture
+def city_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CITY_CACHE_FILE", str(tmp_path / "cities.sqlite3"))
+    monkeypatch.setattr(CityCache, "connection", None)
+    monkeypatch.setattr(CityCache, "entries", OrderedDict())
+    monkeypatch.setattr(CityCache, "ids", {})
+    monkeypatch.setattr(CityCache, "touched", {})
+    yield
+    CityCache.connection.close()
+
+
+def test_picked_suggestion_does_not_replace_the_city_of_the_name(city_cache, monkeypatch):
+    locations = []
+
+    def get(api_name, endpoint, url):
+        locations.append(url)
+        return LocationResponse()
+
+    monkeypatch.setattr(RequestCoalescer, "get", get)
+    paris = City("Paris", longitude=2.35, latitude=48.86, woeid="623", state="France")
+    paris_texas = City("Paris", woeid="351", state="United States")
+    CityCache.put("AccuWeather", "Paris", paris)
+    SuggestionTrie.insert("AccuWeather", "Paris", [paris, paris_texas], True)
+
+    selected = AccuWeatherCityHandler("Paris").select_city(paris_texas)
+    assert (selected.woeid, selected.latitude) == ("351", 33.66)
+    assert AccuWeatherCityHandler("Paris").get_city().woeid == "623"
+
+    # the suggestion in the trie is not completed in place, the completed city is cached by its key
+    assert SuggestionTrie.lookup("AccuWeather", "Paris")[1].latitude is None
+    assert AccuWeatherCityHandler("Paris").select_city(paris_texas).latitude == 33.66
+    assert len(locations) == 1
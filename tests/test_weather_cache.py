@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+import handlers.weather_cache
+from handlers.errors import ServiceUnavailableException
+from handlers.weather_cache import WeatherCache
+
+from config import Config
+
+
+NOW = 1_700_000_000.0
+TTL = 60
+KEY = "Test", "kyiv", "current"
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Time of the cache, moved by the tests"""
+    clock = SimpleNamespace(now=NOW)
+    monkeypatch.setattr(handlers.weather_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    monkeypatch.setattr(WeatherCache, "entries", OrderedDict())
+    monkeypatch.setattr(WeatherCache, "refreshing", set())
+    monkeypatch.setattr(WeatherCache, "loading", {})
+    WeatherCache.clear()
+    return clock
+
+
+class Loader:
+    """Counts the loads and returns the next value, raises if the value is an exception"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        value = self.values[min(self.calls, len(self.values) - 1)]
+        self.calls += 1
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+
+def wait_for_refresh(key):
+    deadline = time.monotonic() + 5
+    while key in WeatherCache.refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fresh_entry_is_a_copy_loaded_once():
+    loader = Loader({"temperature": 20})
+    WeatherCache.get(KEY, loader, TTL)["temperature"] = 30
+
+    assert WeatherCache.get(KEY, loader, TTL) == {"temperature": 20}
+    assert loader.calls == 1
+    assert WeatherCache.get_counters()["hits"] == 1
+
+
+def test_stale_entry_is_returned_while_refreshed(clock):
+    loader = Loader("old", "new")
+    WeatherCache.get(KEY, loader, TTL)
+    clock.now += TTL + 1
+
+    assert WeatherCache.get(KEY, loader, TTL) == "old"
+    wait_for_refresh(KEY)
+    assert WeatherCache.get(KEY, loader, TTL) == "new"
+    assert loader.calls == 2 and WeatherCache.get_counters()["stale"] == 1
+
+
+def test_failed_refresh_keeps_the_stale_entry(clock):
+    loader = Loader("old", ServiceUnavailableException("Test"))
+    WeatherCache.get(KEY, loader, TTL)
+    clock.now += TTL + 1
+
+    assert WeatherCache.get(KEY, loader, TTL) == "old"
+    wait_for_refresh(KEY)
+    assert loader.calls == 2
+    assert WeatherCache.entries[KEY][0] == "old"
+
+
+def test_entry_past_the_stale_period_is_loaded_by_the_caller(clock):
+    loader = Loader("old", "new")
+    WeatherCache.get(KEY, loader, TTL)
+    clock.now += TTL + Config.WEATHER_STALE_PERIOD + 1
+
+    assert WeatherCache.get(KEY, loader, TTL) == "new"
+    assert WeatherCache.get_counters()["misses"] == 2
+
+
+def test_invalidated_entry_is_loaded_again():
+    loader = Loader("old", "new")
+    WeatherCache.get(KEY, loader, TTL)
+    WeatherCache.invalidate(KEY)
+
+    assert WeatherCache.get(KEY, loader, TTL) == "new"
+    assert WeatherCache.get_stored(KEY) == NOW
+
+
+def test_concurrent_misses_share_one_load():
+    started, released = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(True)
+        started.set()
+        released.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(WeatherCache.get(KEY, slow, TTL))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # the others find the first load in progress and wait for its future
+    time.sleep(0.1)
+    released.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["value"] * 4
+    assert calls == [True]
+    assert not WeatherCache.loading
+
+
+def test_failed_load_is_not_cached():
+    loader = Loader(ServiceUnavailableException("Test"))
+    with pytest.raises(ServiceUnavailableException):
+        WeatherCache.get(KEY, loader, TTL)
+    assert not WeatherCache.loading and WeatherCache.get_stored(KEY) is None
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(Config, "WEATHER_CACHE_SIZE", 2)
+    for key in ("a", "b"):
+        WeatherCache.put(key, key, TTL)
+    WeatherCache.get("a", Loader("reloaded"), TTL)
+    WeatherCache.put("c", "c", TTL)
+
+    assert list(WeatherCache.entries) == ["a", "c"]
+    assert WeatherCache.get_counters()["evicted"] == 1
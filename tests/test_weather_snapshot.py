@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from handlers.city import City
+from handlers.forecast_series import ForecastSeries
+from handlers.sun_info import SunInfo
+from handlers.weather import Weather
+from handlers.weather_fetcher import WeatherReport
+from handlers.weather_snapshot import WeatherSnapshot
+
+from config import Config
+
+
+NOW = 1_700_000_000.0
+HOUR = 60 * 60
+
+
+@pytest.fixture(autouse=True)
+def snapshot_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "SNAPSHOT_FILE", str(tmp_path / "snapshot.bin"))
+    return tmp_path / "snapshot.bin"
+
+
+def make_weather(epoch, temperature=20.0, status=Weather.CLEAR):
+    return Weather(
+        location_name="London", status=status, temperature=temperature, pressure=1013,
+        humidity=None, wind_speed=3.0, wind_direction=180, time=epoch, time_zone=0
+    )
+
+
+def make_report(woeid, source="AccuWeather"):
+    return WeatherReport(
+        city=City("London", longitude=-0.1276, latitude=51.5073, woeid=woeid, state=None, source=source),
+        sun_info=SunInfo(NOW - 6 * HOUR, NOW + 6 * HOUR),
+        weather=make_weather(NOW),
+        forecast=ForecastSeries.from_weathers(make_weather(NOW + day * 24 * HOUR, 15.0 + day) for day in range(4)),
+        hourly=ForecastSeries.from_weathers(
+            make_weather(NOW + hour * HOUR, 10.0 + hour, Weather.RAIN) for hour in range(48)
+        )
+    )
+
+
+def test_report_round_trip():
+    WeatherSnapshot.save("london", make_report("328328"))
+
+    city_name, saved, report = WeatherSnapshot.load()
+    assert city_name == "london"
+    assert report.city.woeid == "328328" and report.city.source == "AccuWeather"
+    assert (report.city.name, report.city.state, report.city.latitude) == ("London", None, 51.5073)
+    assert report.weather.temperature == 20.0 and report.weather.humidity is None
+    assert report.sun_info.dusk is None
+    assert [weather.temperature for weather in report.forecast] == [15.0, 16.0, 17.0, 18.0]
+    assert math.isnan(report.forecast.humidity[0])
+    assert len(report.hourly) == 48
+    assert report.hourly[47].temperature == 57.0 and report.hourly[47].status == Weather.RAIN
+
+
+@pytest.mark.parametrize("woeid", [44418, "328328", "a1b2", None])
+def test_woeid_keeps_its_type(woeid):
+    WeatherSnapshot.save("london", make_report(woeid, "MetaWeather"))
+    assert WeatherSnapshot.load()[2].city.woeid == woeid
+
+
+def test_missing_snapshot():
+    assert WeatherSnapshot.load() is None
+
+
+def test_truncated_snapshot_is_ignored(snapshot_file):
+    WeatherSnapshot.save("london", make_report("328328"))
+    snapshot_file.write_bytes(snapshot_file.read_bytes()[:-10])
+    assert WeatherSnapshot.load() is None
+
+
+def test_snapshot_of_another_version_is_ignored(snapshot_file):
+    WeatherSnapshot.save("london", make_report("328328"))
+    data = bytearray(snapshot_file.read_bytes())
+    data[4] = WeatherSnapshot.VERSION + 1
+    snapshot_file.write_bytes(bytes(data))
+    assert WeatherSnapshot.load() is None
@@ -1,30 +1,21 @@
-from os import listdir
+import importlib
+import json
+import sys
 
 from kivy.lang import Builder
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.image import Image
-from kivy.uix.screenmanager import ScreenManager, FallOutTransition, SlideTransition, RiseInTransition, NoTransition
+from kivy.uix.screenmanager import ScreenManager, Screen, FallOutTransition, SlideTransition, RiseInTransition, \
+    NoTransition
 from kivy.config import Config
 from kivy.app import App
 from kivy.core.window import Window
-from kivy.clock import Clock
 from kivy.properties import StringProperty, NumericProperty, ObjectProperty
 
-from screens.status import StatusScreen
-from screens.loading import LoadingScreen
-from screens.search import SearchScreen
-from screens.configuration import ConfigurationScreen
-
-from handlers.city_handlers.open_weather_city_handler import OpenWeatherCityHandler
-from handlers.city_handlers.accuweather_city_handler import AccuWeatherCityHandler
-from handlers.city_handlers.meta_weather_city_handler import MetaWeatherCityHandler
-
-from handlers.sun_handlers.sunrise_sunset_sun_handler import SunriseSunsetSunHandler
-from handlers.sun_handlers.open_weather_sun_handler import OpenWeatherSunHandler
-
-from handlers.weather_handlers.open_weather_handler import OpenWeatherHandler
-from handlers.weather_handlers.accuweather_handler import AccuWeatherHandler
-from handlers.weather_handlers.meta_weather_handler import MetaWeatherHandler
+from handlers.handler_registry import HandlerRegistry
+from handlers.tracing import Tracer
+from handlers.trace_exporters import JsonLinesExporter, PrometheusExporter
+from handlers.weather_snapshot import WeatherSnapshot
 
 from config import Config as AppConfig
 
@@ -41,6 +32,35 @@ class GradientBackground(BoxLayout):
     pass
 
 
+class LazyScreenManager(ScreenManager):
+    """
+    Screen manager building the screens on the first navigation
+    The screen module is imported and its layout is compiled
+    only when the screen is requested for the first time
+
+    Attributes:
+        factories   (module name, class name, layout file) by the screen name
+    """
+
+    def __init__(self, factories: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.factories = factories
+
+    def get_screen(self, name: str) -> Screen:
+        """
+        Gets the screen by the name, builds it if it is not built yet
+        Overrides kivy screen manager method
+        :param name: screen name
+        :return: screen object
+        """
+        if name in self.factories and not self.has_screen(name):
+            module_name, class_name, kv_file = self.factories[name]
+            screen_class = getattr(importlib.import_module(module_name), class_name)
+            Builder.load_file(kv_file)
+            self.add_widget(screen_class(name=name))
+        return super().get_screen(name)
+
+
 class WeatherApp(App):
     """
     Weather application main class
@@ -52,6 +72,7 @@ class WeatherApp(App):
         Loading screen with the animated spinner
         Status screen to show both the weather and forecast report
         Configuration screen to set the application preferences
+        Dashboard screen with the current weather of many watched cities
 
     Entirely based on the kivy framework
 
@@ -66,9 +87,9 @@ class WeatherApp(App):
         preferred_city          selected location to load automatically
         preferred_city_to_load  whether to load the location automatically
 
-        weather_handlers    list of all available weather APIS
-        city_handlers       list of all available geolocation APIS
-        sun_handlers        list of all available sun information APIS
+        weather_handlers    list of all available weather API names
+        city_handlers       list of all available geolocation API names
+        sun_handlers        list of all available sun information API names
 
         selected_weather_handler    selected weather API
         selected_city_handler       selected geolocation API
@@ -76,6 +97,9 @@ class WeatherApp(App):
 
         screen_manager
         last_screen
+
+    Constants:
+        SCREENS     (module name, class name, layout file) of the lazily built screens by the name
     """
     bg_start = StringProperty(AppConfig.BG_COLOR_PRIMARY[0])
     bg_end = StringProperty(AppConfig.BG_COLOR_PRIMARY[1])
@@ -97,14 +121,17 @@ class WeatherApp(App):
     screen_manager = ObjectProperty()
     last_screen = ObjectProperty()
 
+    SCREENS = {
+        "search": ("screens.search", "SearchScreen", "layouts/search.kv"),
+        "loading": ("screens.loading", "LoadingScreen", "layouts/loading.kv"),
+        "status": ("screens.status", "StatusScreen", "layouts/status.kv"),
+        "configuration": ("screens.configuration", "ConfigurationScreen", "layouts/configuration.kv"),
+        "dashboard": ("screens.dashboard", "DashboardScreen", "layouts/dashboard.kv")
+    }
+
     def __init__(self, **kwargs: dict):
         super().__init__(**kwargs)
-        self.status_screen = None
-        self.search_screen = None
-        self.loading_screen = None
-
         self.screen_manager = None
-        self.configuration_screen = None
 
         self.time_format = None
         self.temp_format = None
@@ -112,24 +139,9 @@ class WeatherApp(App):
         self.preferred_city = None
         self.preferred_city_to_load = None
 
-        self.city_handler_class = None
-        self.sun_handler_class = None
-        self.weather_handler_class = None
-
-        self.weather_handlers = {
-            OpenWeatherHandler.API_NAME: OpenWeatherHandler,
-            AccuWeatherHandler.API_NAME: AccuWeatherHandler,
-            MetaWeatherHandler.API_NAME: MetaWeatherHandler
-        }
-        self.city_handlers = {
-            OpenWeatherCityHandler.API_NAME: OpenWeatherCityHandler,
-            AccuWeatherCityHandler.API_NAME: AccuWeatherCityHandler,
-            MetaWeatherCityHandler.API_NAME: MetaWeatherCityHandler
-        }
-        self.sun_handlers = {
-            SunriseSunsetSunHandler.API_NAME: SunriseSunsetSunHandler,
-            OpenWeatherSunHandler.API_NAME: OpenWeatherSunHandler
-        }
+        self.weather_handlers = HandlerRegistry.get_names("weather")
+        self.city_handlers = HandlerRegistry.get_names("city")
+        self.sun_handlers = HandlerRegistry.get_names("sun")
 
         self.selected_weather_handler = None
         self.selected_city_handler = None
@@ -137,10 +149,51 @@ class WeatherApp(App):
 
         self.last_screen = None
 
+    @property
+    def weather_handler_class(self):
+        """Selected weather handler class, its module is imported on the first use"""
+        return HandlerRegistry.get("weather", self.selected_weather_handler)
+
+    @property
+    def city_handler_class(self):
+        """Selected city handler class, its module is imported on the first use"""
+        return HandlerRegistry.get("city", self.selected_city_handler)
+
+    @property
+    def sun_handler_class(self):
+        """Selected sun handler class, its module is imported on the first use"""
+        return HandlerRegistry.get("sun", self.selected_sun_handler)
+
+    @property
+    def search_screen(self) -> Screen:
+        """Search screen, built on the first use"""
+        return self.screen_manager.get_screen("search")
+
+    @property
+    def loading_screen(self) -> Screen:
+        """Loading screen, built on the first use"""
+        return self.screen_manager.get_screen("loading")
+
+    @property
+    def status_screen(self) -> Screen:
+        """Status screen, built on the first use"""
+        return self.screen_manager.get_screen("status")
+
+    @property
+    def configuration_screen(self) -> Screen:
+        """Configuration screen, built on the first use"""
+        return self.screen_manager.get_screen("configuration")
+
+    @property
+    def dashboard_screen(self) -> Screen:
+        """Dashboard screen, built on the first use"""
+        return self.screen_manager.get_screen("dashboard")
+
     def build(self) -> ScreenManager:
         """
         Builds the application layout
-        Loads all of the layouts stored in 'layouts/' folder
+        Only the first screen is built, the others are built
+        with their layouts on the first navigation (see LazyScreenManager)
         Sets the following configuration:
             No multitouch emulation
             No resizable screen
@@ -151,49 +204,94 @@ class WeatherApp(App):
             Loading screen with the animated spinner
             Status screen to show both the weather and forecast report
             Configuration screen to set the application preferences
+            Dashboard screen to show the weather of the watched cities
         """
-        kv_path = "layouts/"
-        for kv in listdir(kv_path):
-            if kv.endswith(".kv"):
-                Builder.load_file(kv_path + kv)
-
         Config.set('input', 'mouse', 'mouse, multitouch_on_demand')
         Config.set('graphics', 'resizable', False)
         Window.borderless = True
 
-        self.screen_manager = ScreenManager()
-
-        self.status_screen = StatusScreen(name="status")
+        self.screen_manager = LazyScreenManager(self.SCREENS)
 
-        self.loading_screen = LoadingScreen(name="loading")
-        self.search_screen = SearchScreen(name="search")
-        self.configuration_screen = ConfigurationScreen(name="configuration")
-
-        self.loading_screen.animation_start()
-
-        self.screen_manager.add_widget(self.search_screen)
-        self.screen_manager.add_widget(self.loading_screen)
-        self.screen_manager.add_widget(self.status_screen)
-        self.screen_manager.add_widget(self.configuration_screen)
-
-        Clock.schedule_interval(self.status_screen.update_time, 0.5)
         Window.bind(on_keyboard=self._key_handler)
 
+        if AppConfig.TRACE_FILE:
+            Tracer.add_exporter(JsonLinesExporter(AppConfig.TRACE_FILE))
+
         try:
-            self.configuration_screen.load_preferences()
+            self.load_preferences()
         except (FileNotFoundError, KeyError):
-            self.configuration_screen.save_defaults()
-            self.configuration_screen.load_preferences()
+            self.save_defaults()
+            self.load_preferences()
 
         self.get_first_screen()
 
         return self.screen_manager
 
+    def load_preferences(self) -> None:
+        """
+        Loads settings from the preferences file
+        Handlers are selected by the name and imported when they are used
+        :return: None
+        """
+        with open(AppConfig.PREFERENCES_FILE, "r") as f:
+            preferences = json.load(f)
+
+        self.time_format = preferences["time_format"]
+        self.temp_format = preferences["temp_format"]
+
+        self.selected_city_handler = preferences["city_api"]
+        self.selected_weather_handler = preferences["weather_api"]
+        self.selected_sun_handler = preferences["sun_api"]
+
+        self.preferred_city_to_load = preferences["preferred_city_to_load"]
+        self.preferred_city = preferences["preferred_city"] if self.preferred_city_to_load else ""
+
+    def save_defaults(self) -> None:
+        """
+        Saves the default configuration in the preferences file
+        :return: None
+        """
+        defaults = {
+            "time_format": 24,
+            "temp_format": "C",
+            "city_api": self.city_handlers[0],
+            "weather_api": self.weather_handlers[0],
+            "sun_api": self.sun_handlers[0],
+            "preferred_city_to_load": False,
+            "preferred_city": ""
+        }
+        with open(AppConfig.PREFERENCES_FILE, "w") as f:
+            json.dump(defaults, f, indent=2)
+
+    def on_stop(self) -> None:
+        """
+        Closes the pooled API connections when the application stops
+        Stops the event loop, saves the pending city cache changes
+        and the latency histograms
+        The modules that were never imported have nothing to close
+        Overrides kivy application method
+        :return: None
+        """
+        if "handlers.http_session" in sys.modules:
+            sys.modules["handlers.http_session"].SessionRegistry.close()
+        if "handlers.async_loop" in sys.modules:
+            sys.modules["handlers.async_loop"].AsyncLoop.close()
+        if "handlers.city_cache" in sys.modules:
+            sys.modules["handlers.city_cache"].CityCache.flush()
+        if AppConfig.METRICS_FILE:
+            PrometheusExporter.write(AppConfig.METRICS_FILE)
+
+    def _is_focused(self, screen_name: str, input_id: str) -> bool:
+        """Checks whether the entry of the screen is focused, screens not built yet have no focus"""
+        return self.screen_manager.has_screen(screen_name) \
+            and self.screen_manager.get_screen(screen_name).ids[input_id].focus
+
     def _key_handler(self, instance, key, *args):
         """Binds various keys to events"""
         if not self.screen_manager.current == "loading":
             if key in (8, 27):
-                if not self.configuration_screen.ids.auto_city_input.focus:
+                if not self._is_focused("configuration", "auto_city_input") \
+                        and not self._is_focused("dashboard", "dashboard_city_input"):
                     self.set_previous_screen()
                     return True
             elif key == 9:
@@ -202,17 +300,21 @@ class WeatherApp(App):
             elif key == 13:
                 if self.screen_manager.current == "search":
                     self.search_screen.load_city()
+            elif key == 283:
+                if self.screen_manager.current in ("search", "status"):
+                    self.screen_manager.transition = SlideTransition(direction="left")
+                    self.screen_manager.current = "dashboard"
 
     def set_previous_screen(self) -> None:
         """
         Keeps track of the previous screens
-        Structures the app (search <- status <- configuration)
+        Structures the app (search <- status/dashboard <- configuration)
         :return: None
         """
         if self.screen_manager.current == "configuration":
             self.screen_manager.transition = FallOutTransition()
             self.screen_manager.current = self.last_screen
-        elif self.screen_manager.current == "status":
+        elif self.screen_manager.current in ("status", "dashboard"):
             self.screen_manager.transition = SlideTransition(direction="right")
             self.screen_manager.current = "search"
             self.last_screen = "search"
@@ -232,19 +334,25 @@ class WeatherApp(App):
     def get_first_screen(self) -> None:
         """
         Works out the screen to be the first one
-        Sets the loading screen screen if the preferred location is set
-        Sets the status screen otherwise
+        Sets the status screen with the last known weather if the preferred location is set
+        and its snapshot is stored, the weather is refreshed in the background
+        Sets the loading screen screen if the preferred location is set without a snapshot
+        Sets the search screen otherwise
         :return: None
         """
+        self.screen_manager.transition = NoTransition()
         if self.preferred_city_to_load:
-            self.screen_manager.transition = NoTransition()
-            self.screen_manager.current = "loading"
-            self.last_screen = self.screen_manager.current
-            self.search_screen.load_city(self.preferred_city)
+            snapshot = WeatherSnapshot.load()
+            if snapshot and snapshot[0].lower() == self.preferred_city.lower():
+                city_name, _, report = snapshot
+                self.screen_manager.current = "status"
+                self.status_screen.restore_report(city_name, report)
+            else:
+                self.screen_manager.current = "loading"
+                self.search_screen.load_city(self.preferred_city)
         else:
-            self.screen_manager.transition = NoTransition()
             self.screen_manager.current = "search"
-            self.last_screen = self.screen_manager.current
+        self.last_screen = self.screen_manager.current
 
 
 if __name__ == '__main__':